@@ -0,0 +1,139 @@
+"""
+Peak-memory benchmark of the chunk transformation chain (validate -> restrict -> normalize).
+
+A large fixture is generated by replicating the development GeoJSON fixture with shifted
+coordinates. The sequential chain of public functions (one intermediate GeoDataFrame per step)
+is compared with the staged chain used in the pipeline (transform_gdf_chunk). Peak memory is
+reported for each stage separately (tracemalloc peak reset between stages), so that the copies
+saved by each stage are visible, together with the peak of the whole chain.
+
+Usage:
+    python benchmarks/chunk_memory.py --copies 500
+"""
+
+import argparse
+import copy
+import time
+import tracemalloc
+import numpy as np
+from pathlib import Path
+from city_metrics.data.ingest.geojson_loader import load_json_from_path, geojson_to_gdf
+from city_metrics.validation.geometry import validate_gdf_linestrings, linestring_validity_mask, replace_repaired_geometries
+from city_metrics.data.normalize.cleaning import restrict_gdf, normalize_maxspeed_info, restriction_mask
+from city_metrics.services.pipeline import transform_gdf_chunk
+from city_metrics.utils.geometry import geodesic_lengths
+
+FIXTURE_PATH = Path(__file__).parent.parent / "tests" / "_fixtures" / "dev_geojson.geojson"
+
+def make_large_fixture(copies: int) -> dict:
+    """
+    Replicate fixture features (shifted by a small offset) to build a large FeatureCollection.
+    """
+
+    data = load_json_from_path(FIXTURE_PATH)
+    features = []
+
+    for i in range(copies):
+        offset = 0.01 * i
+        for feature in data["features"]:
+            feature = copy.deepcopy(feature)
+            geometry = feature["geometry"]
+            if geometry["type"] == "LineString":
+                geometry["coordinates"] = [[x + offset, y] for x, y in geometry["coordinates"]]
+            feature["properties"]["osm_id"] = f"{feature['properties'].get('osm_id')}-{i}"
+            features.append(feature)
+
+    return {"type": "FeatureCollection", "features": features}
+
+def sequential_stages(gdf) -> list:
+    """
+    Sequential chain of public functions, as (stage name, function of previous stage output).
+    """
+
+    def add_length(gdf):
+        gdf["segment_length"] = geodesic_lengths(gdf.geometry.values)
+        return gdf
+
+    return [
+        ("validate", lambda state: validate_gdf_linestrings(state)),
+        ("restrict", lambda state: restrict_gdf(state)),
+        ("normalize", lambda state: normalize_maxspeed_info(state)),
+        ("length", add_length)
+    ]
+
+def staged_stages(gdf) -> list:
+    """
+    Stages of transform_gdf_chunk (same calls), as (stage name, function of previous stage output).
+    """
+
+    def validity(mask):
+        mask, geoms, repaired = linestring_validity_mask(gdf, mask = mask)
+        return mask, geoms, repaired
+
+    def materialize(state):
+        mask, geoms, repaired = state
+        chunk = gdf.take(np.flatnonzero(mask))
+        if repaired:
+            replace_repaired_geometries(chunk, geoms[mask])
+        return chunk, geoms[mask]
+
+    def derive(state):
+        chunk, geoms = state
+        normalize_maxspeed_info(chunk, inplace = True)
+        chunk["segment_length"] = geodesic_lengths(geoms)
+        return chunk
+
+    return [
+        ("restriction mask", lambda state: restriction_mask(state)),
+        ("validity mask", validity),
+        ("materialize", materialize),
+        ("derived columns", derive)
+    ]
+
+def measure_stages(stages: list, gdf) -> tuple[list, float, float, int]:
+    """
+    Run stages in sequence and return peak traced memory (MB) of each stage, peak of the whole chain (MB),
+    elapsed time (s) and number of output rows.
+    """
+
+    peaks = []
+    chain_peak = 0.0
+    state = gdf
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for name, func in stages:
+        tracemalloc.reset_peak()
+        state = func(state)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append((name, peak / 1e6))
+        chain_peak = max(chain_peak, peak / 1e6)
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    return peaks, chain_peak, elapsed, len(state)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type = int, default = 500)
+    args = parser.parse_args()
+
+    geojson = make_large_fixture(args.copies)
+    gdf = geojson_to_gdf(geojson, chunk_size = len(geojson["features"]))[0]
+
+    print(f"Input chunk: {len(gdf)} rows x {len(gdf.columns)} columns")
+    for name, stages in (("sequential", sequential_stages(gdf)), ("staged", staged_stages(gdf))):
+        peaks, chain_peak, elapsed, rows = measure_stages(stages, gdf)
+        print(f"{name:>10} | peak = {chain_peak:8.2f} MB | time = {elapsed:6.3f} s | rows = {rows}")
+        for stage, peak in peaks:
+            print(f"{'':>10} |   {stage:<18} {peak:8.2f} MB")
+
+    # Total of pipeline function (same stages)
+    tracemalloc.start()
+    rows = len(transform_gdf_chunk(gdf))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'transform':>10} | peak = {peak / 1e6:8.2f} MB | rows = {rows}")
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ CREATE TABLE IF NOT EXISTS network_segments (
     
     -- segment data
     osm_id TEXT NOT NULL,
+    parent_osm_id TEXT, -- OSM way of segment (differs from osm_id if way is split at junctions)
     street_name TEXT,
     city_name TEXT,
     geom GEOMETRY(LineString, 4326) NOT NULL,
@@ -19,6 +20,7 @@ CREATE TABLE IF NOT EXISTS network_segments (
     
     -- numerical parameters
     maxspeed SMALLINT CHECK (maxspeed > 0),
+    gradient REAL CHECK (gradient >= 0), -- length-weighted gradient (percent) sampled from DEM (NULL if not available)
 
     --booleans
     is_oneway BOOLEAN DEFAULT FALSE,
@@ -28,15 +30,57 @@ CREATE TABLE IF NOT EXISTS network_segments (
     surface TEXT,
     highway TEXT,
 
+    -- attributes joined from local datasets (e.g., {"accident_count": 2}), by attribute name
+    enrichment JSONB,
+
+    -- values imputed from nearest segments (--impute), used where info is missing
+    -- (attribute columns above keep the observed state)
+    maxspeed_imputed SMALLINT CHECK (maxspeed_imputed > 0),
+    surface_imputed TEXT,
+    lit_imputed TEXT,
+
     -- enforce unique OSM ID for each city
     UNIQUE (city_name, osm_id)
 );
 
+-- columns added after table creation (databases initialized with an earlier schema)
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS parent_osm_id TEXT;
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS gradient REAL CHECK (gradient >= 0);
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS enrichment JSONB;
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS maxspeed_imputed SMALLINT CHECK (maxspeed_imputed > 0);
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS surface_imputed TEXT;
+ALTER TABLE network_segments ADD COLUMN IF NOT EXISTS lit_imputed TEXT;
+
 -- GIST index (only used by PostGIS for quick access)
 CREATE INDEX IF NOT EXISTS idx_network_segments_geom
     ON network_segments
     USING GIST (geom);
 
+-- indexes on scored attributes (selection of segments affected by config changes - partial recompute)
+-- expressions match the (lowercase) values used by the scoring engine
+CREATE INDEX IF NOT EXISTS idx_network_segments_bike_infra
+    ON network_segments (city_name, lower(bike_infra));
+
+CREATE INDEX IF NOT EXISTS idx_network_segments_surface
+    ON network_segments (city_name, lower(surface));
+
+CREATE INDEX IF NOT EXISTS idx_network_segments_maxspeed
+    ON network_segments (city_name, maxspeed);
+
+CREATE INDEX IF NOT EXISTS idx_network_segments_gradient
+    ON network_segments (city_name, gradient);
+
+-- imputed values (scored where the feature is missing)
+-- observed lighting and oneway are booleans (two values per city - not selective): not indexed
+CREATE INDEX IF NOT EXISTS idx_network_segments_surface_imputed
+    ON network_segments (city_name, lower(surface_imputed));
+
+CREATE INDEX IF NOT EXISTS idx_network_segments_maxspeed_imputed
+    ON network_segments (city_name, maxspeed_imputed);
+
+CREATE INDEX IF NOT EXISTS idx_network_segments_lit_imputed
+    ON network_segments (city_name, lower(lit_imputed));
+
 CREATE TABLE IF NOT EXISTS segment_metrics (
     id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
 
@@ -56,12 +100,29 @@ CREATE TABLE IF NOT EXISTS segment_metrics (
 
     -- scores of features of the given metric are stored in JSON format
     metric_features_scores JSONB NOT NULL,
-    -- metadata (for now empty)
+
+    -- group subscores (weighted sum of feature scores of each weight group - weights.yaml)
+    -- total_score = sum of group weight * group subscore: group weight changes are applied in SQL
+    infrastructure_score NUMERIC(5,4),
+    physical_score NUMERIC(5,4),
+    traffic_score NUMERIC(5,4),
+    regulation_score NUMERIC(5,4),
+
+    -- features imputed from nearest segments for given segment (missing_features keeps observed state)
+    imputed_features JSONB NOT NULL DEFAULT '{}'::jsonb,
+    -- metadata (e.g., flags of segments scored with fallback for unknown values)
     metadata JSONB,
 
     UNIQUE (segment_id, metric_name, metric_version)
 );
 
+-- columns added after table creation (databases initialized with an earlier schema)
+ALTER TABLE segment_metrics ADD COLUMN IF NOT EXISTS imputed_features JSONB NOT NULL DEFAULT '{}'::jsonb;
+ALTER TABLE segment_metrics ADD COLUMN IF NOT EXISTS infrastructure_score NUMERIC(5,4);
+ALTER TABLE segment_metrics ADD COLUMN IF NOT EXISTS physical_score NUMERIC(5,4);
+ALTER TABLE segment_metrics ADD COLUMN IF NOT EXISTS traffic_score NUMERIC(5,4);
+ALTER TABLE segment_metrics ADD COLUMN IF NOT EXISTS regulation_score NUMERIC(5,4);
+
 -- create table storing last polygon used to populate database
 -- used as authoritative definition of boundings for recomputations/refresh
 CREATE TABLE IF NOT EXISTS refresh_areas (
@@ -99,10 +160,262 @@ CREATE TABLE IF NOT EXISTS city_metrics (
     -- metric score uncertainty per feature in JSON format
     feature_uncertainty_contributions JSONB NOT NULL,
 
+    -- length-weighted group subscores in JSON format
+    group_scores JSONB,
+
     created_at TIMESTAMP DEFAULT NOW()
 
 );
 
+-- columns added after table creation (databases initialized with an earlier schema)
+ALTER TABLE city_metrics ADD COLUMN IF NOT EXISTS group_scores JSONB;
+
+-- create table storing confidence intervals of city metrics (one row per city and metric name)
+-- block bootstrap interval of city score and best/worst-case scores if missing features got lowest/highest scores
+CREATE TABLE IF NOT EXISTS city_metric_intervals (
+    city_name TEXT NOT NULL,
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+
+    -- spatial block bootstrap (confidence level, resamples, block size in meters and number of blocks)
+    confidence NUMERIC(4,3) NOT NULL,
+    ci_lower NUMERIC(5,4),
+    ci_upper NUMERIC(5,4),
+    bootstrap_std DOUBLE PRECISION,
+    n_resamples INTEGER NOT NULL,
+    block_size DOUBLE PRECISION NOT NULL,
+    n_blocks INTEGER NOT NULL,
+
+    -- analytic bounds from missing features
+    worst_case NUMERIC(5,4),
+    best_case NUMERIC(5,4),
+
+    created_at TIMESTAMP DEFAULT NOW(),
+
+    PRIMARY KEY (city_name, metric_name)
+);
+
+-- create table storing running aggregates of segment metrics per city and metric version
+-- maintained by triggers on segment_metrics and network_segments (see below), so that
+-- city_metrics can be refreshed without scanning all segments of the city
+CREATE TABLE IF NOT EXISTS city_metric_aggregates (
+    city_name TEXT NOT NULL,
+
+    -- metrics info
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+
+    -- number of scored segments, sum of lengths and sum of score * length
+    n_segments INTEGER NOT NULL DEFAULT 0,
+    total_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+    score_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    -- sum of lengths of segments with missing feature (missing_features flags)
+    missing_length_maxspeed DOUBLE PRECISION NOT NULL DEFAULT 0,
+    missing_length_surface DOUBLE PRECISION NOT NULL DEFAULT 0,
+    missing_length_lighting DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    -- sum of group subscore * length (length-weighted rollup of group subscores)
+    infrastructure_score_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+    physical_score_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+    traffic_score_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+    regulation_score_length DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    updated_at TIMESTAMP DEFAULT NOW(),
+
+    PRIMARY KEY (city_name, metric_name, metric_version)
+);
+
+-- columns added after table creation (databases initialized with an earlier schema)
+-- group sums of earlier segment metrics are 0 (no group subscores): rescore cities to fill them
+ALTER TABLE city_metric_aggregates ADD COLUMN IF NOT EXISTS infrastructure_score_length DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE city_metric_aggregates ADD COLUMN IF NOT EXISTS physical_score_length DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE city_metric_aggregates ADD COLUMN IF NOT EXISTS traffic_score_length DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE city_metric_aggregates ADD COLUMN IF NOT EXISTS regulation_score_length DOUBLE PRECISION NOT NULL DEFAULT 0;
+
+-- row-level aggregate triggers and function of earlier schemas (replaced by statement-level triggers below)
+DROP TRIGGER IF EXISTS trg_segment_metrics_aggregate ON segment_metrics;
+DROP TRIGGER IF EXISTS trg_network_segments_aggregate ON network_segments;
+DROP FUNCTION IF EXISTS apply_city_metric_aggregate(TEXT, DOUBLE PRECISION, TEXT, TEXT, NUMERIC, JSONB, NUMERIC[], INTEGER);
+
+-- create temporary table collecting signed contributions (sign = 1 added, sign = -1 removed) of segment
+-- metrics rows changed by a statement, applied at once to city aggregates by apply_city_metric_contributions
+-- rows deleted by cascade from network_segments have no segment anymore (city_name NULL): they are kept
+-- until the network_segments trigger of the same statement fills their city and length
+CREATE OR REPLACE FUNCTION prepare_city_metric_contributions() RETURNS VOID AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS tmp_city_metric_contributions (
+        segment_id INTEGER,
+        city_name TEXT,
+        segment_length DOUBLE PRECISION,
+        metric_name TEXT,
+        metric_version TEXT,
+        total_score NUMERIC(5,4),
+        missing_features JSONB,
+        infrastructure_score NUMERIC(5,4),
+        physical_score NUMERIC(5,4),
+        traffic_score NUMERIC(5,4),
+        regulation_score NUMERIC(5,4),
+        sign INTEGER
+    ) ON COMMIT DROP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- add collected contributions to city aggregates (one upsert per city and metric version)
+CREATE OR REPLACE FUNCTION apply_city_metric_contributions() RETURNS VOID AS $$
+BEGIN
+    INSERT INTO city_metric_aggregates AS cma (
+        city_name, metric_name, metric_version, n_segments, total_length, score_length,
+        missing_length_maxspeed, missing_length_surface, missing_length_lighting,
+        infrastructure_score_length, physical_score_length, traffic_score_length, regulation_score_length, updated_at
+    )
+    SELECT
+        city_name,
+        metric_name,
+        metric_version,
+        SUM(sign),
+        SUM(sign * COALESCE(segment_length, 0)),
+        SUM(sign * COALESCE(segment_length, 0) * COALESCE(total_score, 0)),
+        SUM(CASE WHEN COALESCE((missing_features->>'maxspeed')::boolean, FALSE) THEN sign * COALESCE(segment_length, 0) ELSE 0 END),
+        SUM(CASE WHEN COALESCE((missing_features->>'surface')::boolean, FALSE) THEN sign * COALESCE(segment_length, 0) ELSE 0 END),
+        SUM(CASE WHEN COALESCE((missing_features->>'lighting')::boolean, FALSE) THEN sign * COALESCE(segment_length, 0) ELSE 0 END),
+        SUM(sign * COALESCE(segment_length, 0) * COALESCE(infrastructure_score, 0)),
+        SUM(sign * COALESCE(segment_length, 0) * COALESCE(physical_score, 0)),
+        SUM(sign * COALESCE(segment_length, 0) * COALESCE(traffic_score, 0)),
+        SUM(sign * COALESCE(segment_length, 0) * COALESCE(regulation_score, 0)),
+        NOW()
+    FROM tmp_city_metric_contributions
+    WHERE city_name IS NOT NULL
+    GROUP BY city_name, metric_name, metric_version
+    ON CONFLICT (city_name, metric_name, metric_version)
+    DO UPDATE SET
+        n_segments = cma.n_segments + EXCLUDED.n_segments,
+        total_length = cma.total_length + EXCLUDED.total_length,
+        score_length = cma.score_length + EXCLUDED.score_length,
+        missing_length_maxspeed = cma.missing_length_maxspeed + EXCLUDED.missing_length_maxspeed,
+        missing_length_surface = cma.missing_length_surface + EXCLUDED.missing_length_surface,
+        missing_length_lighting = cma.missing_length_lighting + EXCLUDED.missing_length_lighting,
+        infrastructure_score_length = cma.infrastructure_score_length + EXCLUDED.infrastructure_score_length,
+        physical_score_length = cma.physical_score_length + EXCLUDED.physical_score_length,
+        traffic_score_length = cma.traffic_score_length + EXCLUDED.traffic_score_length,
+        regulation_score_length = cma.regulation_score_length + EXCLUDED.regulation_score_length,
+        updated_at = NOW();
+
+    DELETE FROM tmp_city_metric_contributions WHERE city_name IS NOT NULL;
+
+    -- drop empty aggregates (avoids accumulating floating point residuals)
+    DELETE FROM city_metric_aggregates WHERE n_segments <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+-- segment_metrics rows inserted, updated or deleted by a statement (transition tables new_rows / old_rows)
+-- (rows deleted by cascade have no parent segment anymore - completed by network_segments trigger)
+CREATE OR REPLACE FUNCTION segment_metrics_aggregate_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM prepare_city_metric_contributions();
+
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO tmp_city_metric_contributions
+        SELECT o.segment_id, ns.city_name, ns.segment_length, o.metric_name, o.metric_version, o.total_score,
+               o.missing_features, o.infrastructure_score, o.physical_score, o.traffic_score, o.regulation_score, -1
+        FROM old_rows o
+        LEFT JOIN network_segments ns ON ns.id = o.segment_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO tmp_city_metric_contributions
+        SELECT n.segment_id, ns.city_name, ns.segment_length, n.metric_name, n.metric_version, n.total_score,
+               n.missing_features, n.infrastructure_score, n.physical_score, n.traffic_score, n.regulation_score, 1
+        FROM new_rows n
+        JOIN network_segments ns ON ns.id = n.segment_id;
+    END IF;
+
+    PERFORM apply_city_metric_contributions();
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- transition tables require one event per trigger
+CREATE OR REPLACE TRIGGER trg_segment_metrics_aggregate_insert
+    AFTER INSERT ON segment_metrics
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION segment_metrics_aggregate_trigger();
+
+CREATE OR REPLACE TRIGGER trg_segment_metrics_aggregate_update
+    AFTER UPDATE ON segment_metrics
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION segment_metrics_aggregate_trigger();
+
+CREATE OR REPLACE TRIGGER trg_segment_metrics_aggregate_delete
+    AFTER DELETE ON segment_metrics
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION segment_metrics_aggregate_trigger();
+
+-- network_segments rows deleted or whose city/length changed by a statement
+-- (metrics of deleted rows were collected by the segment_metrics trigger of the cascade, which fires first)
+CREATE OR REPLACE FUNCTION network_segments_aggregate_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM prepare_city_metric_contributions();
+
+    IF TG_OP = 'DELETE' THEN
+        UPDATE tmp_city_metric_contributions c
+        SET city_name = o.city_name,
+            segment_length = o.segment_length
+        FROM old_segments o
+        WHERE c.segment_id = o.id
+        AND c.city_name IS NULL;
+    ELSE
+        -- transition tables cannot be used with a column list: keep rows whose city/length changed
+        INSERT INTO tmp_city_metric_contributions
+        SELECT sm.segment_id, c.city_name, c.segment_length, sm.metric_name, sm.metric_version, sm.total_score,
+               sm.missing_features, sm.infrastructure_score, sm.physical_score, sm.traffic_score,
+               sm.regulation_score, c.sign
+        FROM old_segments o
+        JOIN new_segments n ON n.id = o.id
+        CROSS JOIN LATERAL (VALUES (o.city_name, o.segment_length, -1),
+                                   (n.city_name, n.segment_length, 1)) AS c(city_name, segment_length, sign)
+        JOIN segment_metrics sm ON sm.segment_id = o.id
+        WHERE o.city_name IS DISTINCT FROM n.city_name
+        OR o.segment_length IS DISTINCT FROM n.segment_length;
+    END IF;
+
+    PERFORM apply_city_metric_contributions();
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_network_segments_aggregate_update
+    AFTER UPDATE ON network_segments
+    REFERENCING OLD TABLE AS old_segments NEW TABLE AS new_segments
+    FOR EACH STATEMENT EXECUTE FUNCTION network_segments_aggregate_trigger();
+
+CREATE OR REPLACE TRIGGER trg_network_segments_aggregate_delete
+    AFTER DELETE ON network_segments
+    REFERENCING OLD TABLE AS old_segments
+    FOR EACH STATEMENT EXECUTE FUNCTION network_segments_aggregate_trigger();
+
+-- create table storing configurations last used to score segment metrics of each city
+-- (compared to current configurations by partial recompute - only affected segments are rescored)
+-- dropped when a city is scored with mixed configurations (e.g., refresh with edited YAML files)
+CREATE TABLE IF NOT EXISTS metric_config_snapshots (
+    city_name TEXT NOT NULL,
+
+    -- metrics info
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+    weights_version TEXT NOT NULL,
+
+    -- parsed YAML configurations (without version field)
+    metrics_config JSONB NOT NULL,
+    weights_config JSONB NOT NULL,
+
+    updated_at TIMESTAMP DEFAULT NOW(),
+
+    PRIMARY KEY (city_name, metric_name)
+);
+
 -- create table storing group sensitivity curves for all cities in database 
 CREATE TABLE IF NOT EXISTS group_sensitivity (
     id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -127,8 +440,410 @@ CREATE TABLE IF NOT EXISTS group_sensitivity (
 
 );
 
+-- create table storing global sensitivity of city scores to group weights (one row per city and group)
+-- Sobol indices of group weights and city-level score/rank statistics over weight vectors sampled on the simplex
+-- (city-level statistics are repeated on the rows of each group of the city)
+CREATE TABLE IF NOT EXISTS global_sensitivity (
+    city_name TEXT NOT NULL,
+
+    -- metrics info
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+
+    -- sampling info (method, number of base samples, Dirichlet concentration - NULL for uniform sampling)
+    sampling TEXT NOT NULL,
+    n_samples INTEGER NOT NULL,
+    concentration DOUBLE PRECISION,
+
+    -- group info
+    target_group TEXT NOT NULL,
+    base_weight DOUBLE PRECISION NOT NULL,
+
+    -- first-order and total Sobol indices (NULL if city score does not vary with weights)
+    first_order_index DOUBLE PRECISION,
+    total_order_index DOUBLE PRECISION,
+
+    -- city score with base weights and distribution over sampled weights
+    baseline_score NUMERIC(5,4),
+    score_mean NUMERIC(5,4),
+    score_std DOUBLE PRECISION,
+    score_p05 NUMERIC(5,4),
+    score_p95 NUMERIC(5,4),
+
+    -- rank of city among analysed cities (1 = best) and probability of rank change
+    baseline_rank INTEGER,
+    rank_change_probability DOUBLE PRECISION CHECK (rank_change_probability >= 0 AND rank_change_probability <= 1),
+    rank_p05 INTEGER,
+    rank_p95 INTEGER,
+
+    created_at TIMESTAMP DEFAULT NOW(),
+
+    PRIMARY KEY (city_name, metric_name, target_group)
+);
+
+-- create table storing categorical values resolved by rules (learned mappings)
+-- used to review resolved values and to report resolution rate
+CREATE TABLE IF NOT EXISTS learned_mappings (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+
+    metric_name TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+
+    -- raw OSM value and known value it has been resolved to
+    raw_value TEXT NOT NULL,
+    resolved_value TEXT NOT NULL,
+    score NUMERIC(5,4) CHECK (score >= 0 AND score <= 1),
+
+    -- number of occurrences of raw value (cumulated over runs)
+    occurrences INTEGER DEFAULT 0,
+
+    updated_at TIMESTAMP DEFAULT NOW(),
+
+    UNIQUE (metric_name, feature_name, raw_value)
+);
+
+-- create table storing queue of categorical values missing from YAML mappings (non-interactive mode)
+-- values are scored with fallback score and associated segments are flagged for rescoring (segment_metrics.metadata)
+CREATE TABLE IF NOT EXISTS unknown_value_queue (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+
+    metric_name TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+    feature_value TEXT NOT NULL,
+
+    -- number of occurrences (cumulated over runs) and a few sample segments
+    occurrences INTEGER DEFAULT 0,
+    sample_osm_ids TEXT[],
+
+    first_seen TIMESTAMP DEFAULT NOW(),
+    last_seen TIMESTAMP DEFAULT NOW(),
+
+    UNIQUE (metric_name, feature_name, feature_value)
+);
+
+-- create tables storing compiled metrics configurations (published once per version - content is immutable)
+-- used by the in-database scoring engine (score_segment_metrics function below)
+CREATE TABLE IF NOT EXISTS metric_features (
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+
+    -- position of feature in YAML file, 'categorical' or 'continuous', and fallback score of missing/unknown values
+    feature_index INTEGER NOT NULL,
+    feature_type TEXT NOT NULL CHECK (feature_type IN ('categorical', 'continuous')),
+    fallback DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (metric_name, metric_version, feature_name)
+);
+
+-- categorical mappings (value -> score)
+CREATE TABLE IF NOT EXISTS metric_feature_mappings (
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+    feature_value TEXT NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (metric_name, metric_version, feature_name, feature_value)
+);
+
+-- continuous bins (bin upper bound -> score)
+CREATE TABLE IF NOT EXISTS metric_feature_bins (
+    metric_name TEXT NOT NULL,
+    metric_version TEXT NOT NULL,
+    feature_name TEXT NOT NULL,
+    bin_max DOUBLE PRECISION NOT NULL,
+    score DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (metric_name, metric_version, feature_name, bin_max)
+);
+
+-- weight groups (weights.yaml)
+CREATE TABLE IF NOT EXISTS metric_weights (
+    metric_name TEXT NOT NULL,
+    weights_version TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    group_weight DOUBLE PRECISION NOT NULL,
+    feature_name TEXT NOT NULL,
+    feature_weight DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (metric_name, weights_version, group_name, feature_name)
+);
+
+-- score all stored segments of a city with a published configuration (no data leaves the database)
+-- same rules as the Python engine (metrics/engine.py):
+--   - categorical: lowercase value looked up in mapping, then value it was resolved to (learned_mappings),
+--     else fallback score (segment flagged for rescoring and value queued - non-interactive scoring)
+--   - continuous: first bin whose max is greater or equal than value (last bin above), fallback if missing
+--   - missing maxspeed: score 1.0 for footways/cycleways and excellent bike infrastructure (score 1.0)
+-- observed state (missing_features) is kept from latest stored metrics of segments: missing lighting is scored
+-- as 'unknown', and stored imputed values (maxspeed_imputed, surface_imputed, lit_imputed) are scored where info is missing
+-- returns number of scored segments
+CREATE OR REPLACE FUNCTION score_segment_metrics(
+    p_city_name TEXT,
+    p_metric_name TEXT,
+    p_metric_version TEXT,
+    p_weights_version TEXT
+) RETURNS INTEGER AS $$
+DECLARE
+    n_scored INTEGER;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM metric_features
+                   WHERE metric_name = p_metric_name AND metric_version = p_metric_version) THEN
+        RAISE EXCEPTION 'Metrics configuration % (%) is not published', p_metric_name, p_metric_version;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM metric_weights
+                   WHERE metric_name = p_metric_name AND weights_version = p_weights_version) THEN
+        RAISE EXCEPTION 'Weights configuration % (%) is not published', p_metric_name, p_weights_version;
+    END IF;
+
+    CREATE TEMP TABLE IF NOT EXISTS tmp_scored_segment_metrics (
+        segment_id INTEGER,
+        osm_id TEXT,
+        total_score NUMERIC(5,4),
+        missing_features JSONB,
+        metric_features_scores JSONB,
+        infrastructure_score NUMERIC(5,4),
+        physical_score NUMERIC(5,4),
+        traffic_score NUMERIC(5,4),
+        regulation_score NUMERIC(5,4),
+        imputed_features JSONB,
+        unresolved JSONB
+    ) ON COMMIT DROP;
+    TRUNCATE tmp_scored_segment_metrics;
+
+    INSERT INTO tmp_scored_segment_metrics
+    WITH segments AS (
+        -- stored segments and observed/imputed state of their latest metrics
+        SELECT DISTINCT ON (ns.id)
+            ns.id AS segment_id,
+            ns.osm_id,
+            ns.highway,
+            ns.bike_infra,
+            ns.surface,
+            ns.maxspeed,
+            ns.gradient,
+            ns.is_lit,
+            ns.is_oneway,
+            ns.enrichment,
+            ns.maxspeed_imputed,
+            ns.surface_imputed,
+            ns.lit_imputed,
+            sm.missing_features,
+            sm.imputed_features
+        FROM network_segments ns
+        JOIN segment_metrics sm ON sm.segment_id = ns.id AND sm.metric_name = p_metric_name
+        WHERE ns.city_name = p_city_name
+        ORDER BY ns.id, sm.metric_version DESC
+    ),
+    feature_values AS (
+        -- value scored for each feature (same values as recompute pipeline - missing values as 'none',
+        -- imputed values where info is missing)
+        SELECT s.segment_id, v.feature_name, v.feature_value, v.numeric_value
+        FROM segments s
+        CROSS JOIN LATERAL (VALUES
+            ('bike_infrastructure', COALESCE(lower(s.bike_infra), 'none'), NULL::DOUBLE PRECISION),
+            ('surface', CASE
+                WHEN (s.missing_features->>'surface')::boolean AND s.surface_imputed IS NOT NULL THEN lower(s.surface_imputed)
+                ELSE COALESCE(lower(s.surface), 'none')
+            END, NULL),
+            ('lighting', CASE
+                WHEN (s.missing_features->>'lighting')::boolean AND s.lit_imputed IS NOT NULL THEN lower(s.lit_imputed)
+                WHEN (s.missing_features->>'lighting')::boolean THEN 'unknown'
+                WHEN s.is_lit THEN 'yes'
+                ELSE 'no'
+            END, NULL),
+            ('oneway', CASE WHEN s.is_oneway THEN 'yes' ELSE 'no' END, NULL),
+            ('maxspeed', NULL, CASE
+                WHEN (s.missing_features->>'maxspeed')::boolean AND s.maxspeed_imputed IS NOT NULL THEN s.maxspeed_imputed
+                ELSE s.maxspeed
+            END::DOUBLE PRECISION),
+            ('gradient', NULL, s.gradient::DOUBLE PRECISION)
+        ) AS v(feature_name, feature_value, numeric_value)
+        UNION ALL
+        -- features scored from enrichment attributes (missing attributes as 'none' / NULL)
+        SELECT
+            s.segment_id,
+            f.feature_name,
+            CASE WHEN f.feature_type = 'categorical' THEN COALESCE(lower(s.enrichment->>f.feature_name), 'none') END,
+            CASE WHEN f.feature_type = 'continuous' THEN (s.enrichment->>f.feature_name)::DOUBLE PRECISION END
+        FROM segments s
+        JOIN metric_features f
+            ON f.metric_name = p_metric_name AND f.metric_version = p_metric_version
+            AND f.feature_name NOT IN ('bike_infrastructure', 'surface', 'lighting', 'oneway', 'maxspeed', 'gradient')
+    ),
+    categorical AS (
+        SELECT
+            fv.segment_id,
+            f.feature_index,
+            fv.feature_name,
+            fv.feature_value,
+            COALESCE(m.score, rm.score, f.fallback) AS score,
+            (m.score IS NULL AND rm.score IS NULL) AS unresolved
+        FROM feature_values fv
+        JOIN metric_features f
+            ON f.metric_name = p_metric_name AND f.metric_version = p_metric_version
+            AND f.feature_name = fv.feature_name AND f.feature_type = 'categorical'
+        LEFT JOIN metric_feature_mappings m
+            ON m.metric_name = p_metric_name AND m.metric_version = p_metric_version
+            AND m.feature_name = fv.feature_name AND m.feature_value = fv.feature_value
+        LEFT JOIN learned_mappings lm
+            ON m.score IS NULL AND lm.metric_name = p_metric_name
+            AND lm.feature_name = fv.feature_name AND lm.raw_value = fv.feature_value
+        LEFT JOIN metric_feature_mappings rm
+            ON rm.metric_name = p_metric_name AND rm.metric_version = p_metric_version
+            AND rm.feature_name = fv.feature_name AND rm.feature_value = lm.resolved_value
+    ),
+    continuous AS (
+        SELECT
+            fv.segment_id,
+            f.feature_index,
+            fv.feature_name,
+            NULL::TEXT AS feature_value,
+            CASE
+                WHEN fv.numeric_value IS NULL THEN
+                    CASE
+                        WHEN fv.feature_name = 'maxspeed'
+                             AND (s.highway IN ('footway', 'cycleway')
+                                  OR (bi.score = 1.0 AND bi.feature_index < f.feature_index)) THEN 1.0
+                        ELSE f.fallback
+                    END
+                ELSE COALESCE(
+                    (SELECT b.score FROM metric_feature_bins b
+                     WHERE b.metric_name = p_metric_name AND b.metric_version = p_metric_version
+                     AND b.feature_name = fv.feature_name AND fv.numeric_value <= b.bin_max
+                     ORDER BY b.bin_max LIMIT 1),
+                    (SELECT b.score FROM metric_feature_bins b
+                     WHERE b.metric_name = p_metric_name AND b.metric_version = p_metric_version
+                     AND b.feature_name = fv.feature_name
+                     ORDER BY b.bin_max DESC LIMIT 1)
+                )
+            END AS score,
+            FALSE AS unresolved
+        FROM feature_values fv
+        JOIN segments s ON s.segment_id = fv.segment_id
+        JOIN metric_features f
+            ON f.metric_name = p_metric_name AND f.metric_version = p_metric_version
+            AND f.feature_name = fv.feature_name AND f.feature_type = 'continuous'
+        LEFT JOIN categorical bi ON bi.segment_id = fv.segment_id AND bi.feature_name = 'bike_infrastructure'
+    ),
+    feature_scores AS (
+        SELECT * FROM categorical
+        UNION ALL
+        SELECT * FROM continuous
+    ),
+    group_scores AS (
+        -- group subscore: weighted sum of feature scores within group
+        SELECT fs.segment_id, w.group_name, w.group_weight, SUM(w.feature_weight * fs.score) AS group_score
+        FROM feature_scores fs
+        JOIN metric_weights w
+            ON w.metric_name = p_metric_name AND w.weights_version = p_weights_version
+            AND w.feature_name = fs.feature_name
+        GROUP BY fs.segment_id, w.group_name, w.group_weight
+    ),
+    segment_groups AS (
+        SELECT
+            segment_id,
+            SUM(group_weight * group_score) AS total_score,
+            MAX(group_score) FILTER (WHERE group_name = 'infrastructure') AS infrastructure_score,
+            MAX(group_score) FILTER (WHERE group_name = 'physical') AS physical_score,
+            MAX(group_score) FILTER (WHERE group_name = 'traffic') AS traffic_score,
+            MAX(group_score) FILTER (WHERE group_name = 'regulation') AS regulation_score
+        FROM group_scores
+        GROUP BY segment_id
+    ),
+    segment_features AS (
+        SELECT
+            segment_id,
+            jsonb_object_agg(feature_name, score) AS metric_features_scores,
+            COALESCE(jsonb_object_agg(feature_name, feature_value) FILTER (WHERE unresolved), '{}'::jsonb) AS unresolved
+        FROM feature_scores
+        GROUP BY segment_id
+    )
+    SELECT
+        s.segment_id,
+        s.osm_id,
+        LEAST(GREATEST(ROUND(COALESCE(sg.total_score, 0)::NUMERIC, 4), 0), 1),
+        s.missing_features,
+        sf.metric_features_scores,
+        LEAST(GREATEST(ROUND(sg.infrastructure_score::NUMERIC, 4), 0), 1),
+        LEAST(GREATEST(ROUND(sg.physical_score::NUMERIC, 4), 0), 1),
+        LEAST(GREATEST(ROUND(sg.traffic_score::NUMERIC, 4), 0), 1),
+        LEAST(GREATEST(ROUND(sg.regulation_score::NUMERIC, 4), 0), 1),
+        -- features scored with stored imputed values (flags of earlier metrics are kept)
+        COALESCE(s.imputed_features, '{}'::jsonb) || jsonb_strip_nulls(jsonb_build_object(
+            'maxspeed', CASE WHEN (s.missing_features->>'maxspeed')::boolean AND s.maxspeed_imputed IS NOT NULL THEN TRUE END,
+            'surface', CASE WHEN (s.missing_features->>'surface')::boolean AND s.surface_imputed IS NOT NULL THEN TRUE END,
+            'lighting', CASE WHEN (s.missing_features->>'lighting')::boolean AND s.lit_imputed IS NOT NULL THEN TRUE END
+        )),
+        sf.unresolved
+    FROM segments s
+    JOIN segment_features sf ON sf.segment_id = s.segment_id
+    LEFT JOIN segment_groups sg ON sg.segment_id = s.segment_id;
+
+    -- replace metrics of city (running aggregates are maintained by triggers)
+    DELETE FROM segment_metrics sm
+    USING network_segments ns
+    WHERE sm.segment_id = ns.id
+    AND ns.city_name = p_city_name
+    AND sm.metric_name = p_metric_name;
+
+    INSERT INTO segment_metrics (segment_id, metric_name, metric_version, total_score, missing_features,
+                                 metric_features_scores, infrastructure_score, physical_score, traffic_score,
+                                 regulation_score, imputed_features, metadata)
+    SELECT
+        segment_id,
+        p_metric_name,
+        p_metric_version,
+        total_score,
+        missing_features,
+        metric_features_scores,
+        infrastructure_score,
+        physical_score,
+        traffic_score,
+        regulation_score,
+        imputed_features,
+        CASE
+            WHEN unresolved = '{}'::jsonb THEN '{}'::jsonb
+            ELSE jsonb_build_object('needs_rescoring', TRUE,
+                                    'unresolved_features', (SELECT jsonb_agg(key ORDER BY key) FROM jsonb_object_keys(unresolved) AS key))
+        END
+    FROM tmp_scored_segment_metrics;
+    GET DIAGNOSTICS n_scored = ROW_COUNT;
+
+    -- queue values scored with fallback (same as unknown_values_to_postgres)
+    INSERT INTO unknown_value_queue (metric_name, feature_name, feature_value, occurrences, sample_osm_ids)
+    SELECT
+        p_metric_name,
+        u.key,
+        u.value,
+        COUNT(*),
+        (ARRAY_AGG(t.osm_id ORDER BY t.osm_id))[1:5]
+    FROM tmp_scored_segment_metrics t
+    CROSS JOIN LATERAL jsonb_each_text(t.unresolved) AS u(key, value)
+    GROUP BY u.key, u.value
+    ON CONFLICT (metric_name, feature_name, feature_value)
+    DO UPDATE SET
+        occurrences = unknown_value_queue.occurrences + EXCLUDED.occurrences,
+        sample_osm_ids = (
+            SELECT ARRAY(
+                SELECT DISTINCT unnest(unknown_value_queue.sample_osm_ids || EXCLUDED.sample_osm_ids)
+                LIMIT 5
+            )
+        ),
+        last_seen = NOW();
+
+    TRUNCATE tmp_scored_segment_metrics;
+
+    RETURN n_scored;
+END;
+$$ LANGUAGE plpgsql;
+
 --- define virtual view table used to query cyclability data for frontend/API use
 --- select cyclability indeces from segment_metrics table (for now redundant, only metric available)
+-- view is dropped first: columns were added in the middle of the select list by later schemas
+-- (CREATE OR REPLACE VIEW can only append columns)
+DROP VIEW IF EXISTS v_cyclability_segment_detail;
 CREATE VIEW v_cyclability_segment_detail AS
 WITH latest_metric AS ( -- define helper table picking up latest metric data (using latest metric_version)
     SELECT DISTINCT ON (segment_id) -- distinct on: pick first row according to orderint law (i.e., the latest version)
@@ -136,7 +851,13 @@ WITH latest_metric AS ( -- define helper table picking up latest metric data (us
         total_score,
         missing_features,
         metric_features_scores,
-        metric_version
+        infrastructure_score,
+        physical_score,
+        traffic_score,
+        regulation_score,
+        imputed_features,
+        metric_version,
+        metadata
     FROM segment_metrics
     WHERE metric_name = 'cyclability' 
     ORDER BY segment_id, metric_version DESC -- order by version: 'v1.0.1-anysha' > 'v1.0.0-xyz'
@@ -144,19 +865,31 @@ WITH latest_metric AS ( -- define helper table picking up latest metric data (us
 SELECT
     ns.id,
     ns.osm_id,
+    ns.parent_osm_id,
     ns.street_name,
     ns.geom,
     ns.segment_length,
     ns.bike_infra,
     ns.maxspeed,
+    ns.gradient,
     ns.is_oneway,
     ns.is_lit,
     ns.surface,
     ns.highway,
+    ns.enrichment,
     ns.city_name,
     lm.total_score, -- use helper table here
     lm.missing_features,
     lm.metric_features_scores,
-    lm.metric_version
+    lm.infrastructure_score,
+    lm.physical_score,
+    lm.traffic_score,
+    lm.regulation_score,
+    lm.imputed_features,
+    lm.metric_version,
+    lm.metadata,
+    ns.maxspeed_imputed,
+    ns.surface_imputed,
+    ns.lit_imputed
 FROM network_segments ns
 JOIN latest_metric lm ON ns.id = lm.segment_id;
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.responses import HTMLResponse
 from .figures import create_city_metrics_scatter_plot, create_group_sensitivity_plot, create_group_sensitivity_heatmap
+from .figures import create_global_sensitivity_figure
 import io
 import base64
 import matplotlib.pyplot as plt
@@ -83,6 +84,52 @@ def serve_group_sensitivity_heatmap(metric_name: str = "cyclability"):
     </html>
     """)
 
+@app.get("/global_sensitivity", response_class=HTMLResponse)
+def serve_global_sensitivity(metric_name: str = "cyclability"):
+    """
+    Serve total Sobol indices of group weights and rank-change probabilities of all cities.
+    """
+
+    fig_module = create_global_sensitivity_figure(
+        metric_name = metric_name
+    )
+
+    buf = io.BytesIO()
+    fig_module.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+    plt.close(fig_module)
+    buf.seek(0)
+
+    img_base64 = base64.b64encode(buf.read()).decode("utf-8")
+    buf.close()
+
+    return HTMLResponse(f"""
+    <html>
+    <head>
+        <title>Global Weight Sensitivity</title>
+        <style>
+            body {{
+                margin: 0;
+                display: flex;
+                justify-content: center;
+                align-items: center;
+                height: 100vh;
+                background-color: #ffffff;
+            }}
+            img {{
+                max-width: 95vw;
+                max-height: 95vh;
+            }}
+        </style>
+    </head>
+    <body>
+        <img
+            src="data:image/png;base64,{img_base64}"
+            alt="Global Weight Sensitivity"
+        >
+    </body>
+    </html>
+    """)
+
 @app.get("/group_sensitivity/{city_name}", response_class=HTMLResponse)
 def serve_group_sensitivity_plot(city_name):
 
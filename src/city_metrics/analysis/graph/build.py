@@ -1,7 +1,7 @@
 import geopandas as gpd
 import networkx as nx
 from shapely.geometry import LineString
-from city_metrics.utils.geometry import geodesic_length
+from city_metrics.utils.geometry import geodesic_lengths
 
 
 def build_graph(gdf: gpd.GeoDataFrame,
@@ -10,17 +10,25 @@ def build_graph(gdf: gpd.GeoDataFrame,
     Build NetworkX graph based on GeoDataFrame information, segment lengths, and metric score
 
     Define cycling cost per segment as segment length / segment score
+
+    Each segment links its first and last vertices: the graph is topologically correct
+    only if segments are split at junctions (see data/normalize/segmentation.py).
     """
 
     G = nx.Graph()
 
-    for _, row in gdf.iterrows():
+    # Reuse stored segment lengths (meters) - compute them in bulk only if not available
+    if "segment_length" in gdf.columns:
+        lengths = gdf["segment_length"].to_numpy(dtype = float)
+    else:
+        lengths = geodesic_lengths(gdf.geometry.values)
+
+    for (_, row), length in zip(gdf.iterrows(), lengths):
 
         # geometry
         geom: LineString = row.geometry
         start = geom.coords[0]
-        end = geom.coords[1]
-        length = geodesic_length(geom) # length in meters
+        end = geom.coords[-1]
 
         # segment score
         score = max(row["total_score"], 1e-3) 
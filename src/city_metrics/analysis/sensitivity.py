@@ -1,14 +1,146 @@
+"""
+Sensitivity of the city score to group weights.
+
+The score of a segment is linear in the group weights (score = sum of group weight * group subscore, see
+metrics/engine.py), and so is the length-weighted city score:
+
+    city score = sum over groups of group weight * length-weighted mean of group subscore
+
+Group subscores do not depend on group weights: segments are scored once, the length-weighted group means
+of the city are computed once, and any set of weight vectors (one row per vector) is scored with a single
+matrix product - no rescoring of segments per weight variation.
+
+Two analyses are built on this decomposition:
+- one-at-a-time sweep of a single group weight (sweep_group_weight)
+- global sensitivity analysis (global_weight_sensitivity): thousands of weight vectors are sampled on the simplex
+  (Dirichlet distribution, drawn with NumPy or with a scrambled Sobol sequence), and the scores of all cities for
+  all samples are a single (samples x groups) @ (groups x cities) product. Variance of city scores is split into
+  first-order and total Sobol indices of group weights, and rank stability of cities is summarized by rank-change
+  probabilities
+"""
+
 import numpy as np
+import pandas as pd
 from geopandas import gpd
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
-from city_metrics.metrics.compute_metrics import define_augmented_geodataframe, compute_total_city_metrics
-from city_metrics.utils.geometry import geodesic_length
+from city_metrics.metrics.compute_metrics import define_augmented_geodataframe
+
+# Default number of base samples of global sensitivity analysis
+# (n_samples * (n_groups + 2) weight vectors are evaluated - Saltelli scheme)
+GLOBAL_SAMPLES = 4096
+
+# Sampling methods of weight vectors
+SAMPLING_METHODS = ("dirichlet", "sobol")
+
+# Minimum variance of city scores for Sobol indices (scores are in [0, 1])
+MIN_VARIANCE = 1e-12
+
+# Percentiles of city scores and ranks reported by global sensitivity analysis
+GLOBAL_PERCENTILES = (5, 95)
+
+
+def group_score_means(gdf: gpd.GeoDataFrame,
+                      group_names: list,
+                      metrics_name: str = "cyclability") -> np.ndarray:
+    """
+    Return length-weighted mean of each group subscore of scored segments.
+
+    Segments without subscore only contribute to total length (as in compute_total_city_metrics).
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        Scored segments with segment_length and "<metrics_name>_<group>_score" columns
+        (see define_multi_metrics_geodataframe)
+    group_names: list
+        Names of weight groups (order of returned means)
+    metrics_name: str
+        Metrics name (e.g., "cyclability")
+
+    Returns
+    -------
+    np.ndarray
+        Length-weighted mean subscore of each group
+    """
+
+    length = np.nan_to_num(gdf["segment_length"].to_numpy(dtype = float))
+    group_scores = np.nan_to_num(np.column_stack([
+        gdf[f"{metrics_name}_{group_name}_score"].to_numpy(dtype = float) for group_name in group_names
+    ]))
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        return (length @ group_scores) / length.sum()
+
+def score_weight_vectors(weights: np.ndarray,
+                         group_means: np.ndarray) -> np.ndarray:
+    """
+    Return city scores of weight vectors from length-weighted group means.
+
+    Parameters
+    ----------
+    weights: np.ndarray
+        Group weights (one row per weight vector, one column per group)
+    group_means: np.ndarray
+        Length-weighted mean subscore of each group (one row per city for several cities)
+
+    Returns
+    -------
+    np.ndarray
+        City score of each weight vector (one column per city for several cities)
+    """
 
+    return np.asarray(weights, dtype = float) @ np.asarray(group_means, dtype = float).T
+
+def sweep_weight_matrix(base_weights: np.ndarray,
+                        target_idx: int,
+                        eps: float,
+                        delta_range: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return normalized weight vectors of a sweep of one group weight.
+
+    Parameters
+    ----------
+    base_weights: np.ndarray
+        Base group weights
+    target_idx: int
+        Index of swept group
+    eps: float
+        Weight variation (e.g., 0.05)
+    delta_range: float
+        Max variation range of weight (e.g., 0.2)
+
+    Returns
+    -------
+    W: np.ndarray
+        Normalized weights (one row per step)
+    deltas: np.ndarray
+        Group weight variation of each step
+    """
+
+    # Number of steps to sweep
+    num_steps = int((delta_range * 2) / eps) + 1
+    deltas = np.linspace(-delta_range, delta_range, num_steps)
+
+    # Tile base weights num_steps times
+    W = np.tile(base_weights, (num_steps, 1)).astype(float) # Repeat base_weights num_steps rows x 1 col
+
+    # Add deltas to weights using broadcast (keep within [0, 1])
+    W[:, target_idx] = np.clip(
+        base_weights[target_idx] + deltas,
+        0.0,
+        1.0
+    )
+
+    # Normalize rows (sum should be always = 1)
+    row_sums = W.sum(axis = 1, keepdims = True)
+    W = np.divide(W, row_sums, out = W, where = row_sums > 0)
+
+    return W, deltas
 
 def sweep_group_weight(gdf: gpd.GeoDataFrame,
-                    target_group: str, 
+                    target_group: str,
                     eps: float,
                     delta_range: float,
                     weights_config: dict,
@@ -18,6 +150,9 @@ def sweep_group_weight(gdf: gpd.GeoDataFrame,
     """
     Perform sensitivity sweep of group weight.
 
+    Segments are scored once (base weights), and all weight variations are scored with a single
+    matrix product of normalized weights and length-weighted group means.
+
     Parameters
     ----------
     gdf: gpd.GeoDataFrame
@@ -29,12 +164,12 @@ def sweep_group_weight(gdf: gpd.GeoDataFrame,
     delta_range: float
         Max variation range of weight (e.g., 0.2)
     weights_config: dict
-        Dictionary storing weight YAML
+        Dictionary storing weight YAML (not modified)
     metrics_config: dict
         Dictionary storing metrics configuration info from YAML
     metrics_config_path: Path
         Path of metrics config YAML
-        excellent_bike_infra: dict
+    excellent_bike_infra: dict
         Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
 
     Returns
@@ -56,58 +191,224 @@ def sweep_group_weight(gdf: gpd.GeoDataFrame,
     # Get index of target group
     target_idx = group_names.index(target_group)
 
-    # Number of steps to sweep
-    num_steps = int((delta_range * 2) / eps) + 1
-    deltas = np.linspace(-delta_range, delta_range, num_steps)
-
-    ## Perform weight sweep
-    # Tile base weights num_steps times
-    W = np.tile(base_weights, (num_steps, 1)) # Repeat base_weights num_steps rows x 1 col
+    # Normalized weights of each step
+    W, deltas = sweep_weight_matrix(base_weights, target_idx, eps, delta_range)
 
-    # Add deltas to weights using broadcast (keep within [0, 1])
-    W[:, target_idx] = np.clip(
-        base_weights[target_idx] + deltas,
-        0.0,
-        1.0
+    # Score segments once - group subscores do not depend on group weights
+    # (segment_length is reused from PostGIS - no need to recompute geodesic lengths)
+    gdf_proc, _ = define_augmented_geodataframe(
+        gdf,
+        weights_config,
+        metrics_config,
+        metrics_config_path,
+        excellent_bike_infra,
     )
+    group_means = group_score_means(gdf_proc, group_names)
 
-    # Normalize rows (sum should be always = 1)
-    row_sums = W.sum(axis = 1, keepdims = True)
-    W = np.divide(W, row_sums, where = row_sums > 0)
-
-    # Perform actual sweep
-    sweep_city_score_result = []
-    for i, weights_row in enumerate(W):
-
-        for k, val in zip(group_names, weights_row):
-            weights_config["cyclability"][k]["weight"] = float(val)
+    # Score all weight variations at once
+    logging.info(f"COMPUTE CITY METRICS FOR {len(W)} {target_group} WEIGHT VARIATIONS")
+    sweep_city_score_result = score_weight_vectors(W, group_means)
 
+    for delta, weights_row, score in zip(deltas, W, sweep_city_score_result):
         logging.info(
-            f"Step Delta {deltas[i]:+.2f} | "
-            f"{target_group} weight: {weights_row[target_idx]:.4f}"
+            f"Step Delta {delta:+.2f} | "
+            f"{target_group} weight: {weights_row[target_idx]:.4f} | "
+            f"city score: {score:.4f}"
         )
 
-        # compute metrics
-        gdf_proc, _ = define_augmented_geodataframe(
-            gdf,
-            weights_config,
-            metrics_config,
-            metrics_config_path,
-            excellent_bike_infra,
-        )
+    return sweep_city_score_result.tolist(), deltas.tolist()
+
+def latent_weight_samples(n_samples: int,
+                          alpha: np.ndarray,
+                          method: str = "dirichlet",
+                          seed = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return two independent matrices of Gamma(alpha) variables (one row per sample, one column per group).
+
+    Normalized rows are Dirichlet(alpha) weight vectors. Sobol indices are defined with respect to these
+    independent variables (weights on the simplex are not independent, as they sum to 1).
+
+    Parameters
+    ----------
+    n_samples: int
+        Number of samples of each matrix
+    alpha: np.ndarray
+        Dirichlet parameter of each group
+    method: str
+        "dirichlet" (NumPy random generator) or "sobol" (scrambled Sobol sequence mapped with the
+        Gamma inverse CDF - requires scipy, powers of 2 give balanced sequences)
+    seed
+        Seed of random generator (samples are reproducible)
+
+    Returns
+    -------
+    A: np.ndarray
+        First sample matrix
+    B: np.ndarray
+        Second sample matrix
+    """
+
+    alpha = np.asarray(alpha, dtype = float)
+    n_groups = len(alpha)
+
+    if method == "dirichlet":
+        rng = np.random.default_rng(seed)
+        samples = rng.standard_gamma(np.tile(alpha, 2), size = (n_samples, 2 * n_groups))
+
+    elif method == "sobol":
+        try:
+            from scipy.stats import qmc, gamma
+        except ImportError:
+            raise ImportError("Sobol sampling requires scipy (pip install \"city_metrics[sensitivity]\")")
+
+        # Columns of A and B are distinct dimensions of the same sequence
+        uniform = qmc.Sobol(d = 2 * n_groups, scramble = True, seed = seed).random(n_samples)
+        samples = gamma.ppf(uniform, np.tile(alpha, 2))
+
+    else:
+        raise ValueError(f"Sampling method not available: {method} (available: {', '.join(SAMPLING_METHODS)})")
+
+    return samples[:, :n_groups], samples[:, n_groups:]
+
+def normalize_weights(samples: np.ndarray) -> np.ndarray:
+    """
+    Return weight vectors on the simplex (rows divided by their sum).
+    """
+
+    return samples / samples.sum(axis = 1, keepdims = True)
+
+def sobol_indices(y_A: np.ndarray,
+                  y_B: np.ndarray,
+                  y_AB: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return first-order (Saltelli 2010 estimator) and total (Jansen estimator) Sobol indices.
+
+    Parameters
+    ----------
+    y_A: np.ndarray
+        Outputs of sample matrix A (one row per sample, one column per output - e.g., city)
+    y_B: np.ndarray
+        Outputs of sample matrix B
+    y_AB: np.ndarray
+        Outputs of matrices AB_i (A with column i taken from B), stacked along the first axis (groups x samples x outputs)
+
+    Returns
+    -------
+    first_order: np.ndarray
+        First-order index of each input and output (groups x outputs - NaN if output has no variance)
+    total_order: np.ndarray
+        Total index of each input and output (groups x outputs)
+    """
+
+    # Outputs without variance (e.g., city with equal group subscores - rounding noise only) get NaN
+    variance = np.var(np.concatenate([y_A, y_B]), axis = 0)
+    variance = np.where(variance > MIN_VARIANCE, variance, np.nan)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        first_order = np.mean(y_B[None] * (y_AB - y_A[None]), axis = 1) / variance
+        total_order = 0.5 * np.mean((y_A[None] - y_AB) ** 2, axis = 1) / variance
+
+    return first_order, total_order
+
+def city_ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    Return rank of cities (1 = best score) for each row of city scores (one column per city).
+    """
+
+    return np.argsort(np.argsort(-scores, axis = -1, kind = "stable"), axis = -1, kind = "stable") + 1
+
+def global_weight_sensitivity(group_means: pd.DataFrame,
+                              base_weights: np.ndarray,
+                              n_samples: int = GLOBAL_SAMPLES,
+                              method: str = "dirichlet",
+                              concentration: Optional[float] = None,
+                              seed = 0) -> pd.DataFrame:
+    """
+    Perform global sensitivity analysis of city scores to group weights.
+
+    Weight vectors are drawn from a Dirichlet distribution on the simplex, and the scores of all cities
+    for the n_samples * (n_groups + 2) weight vectors of the Saltelli scheme (matrices A, B and AB_i)
+    are computed with a single matrix product over length-weighted group means.
+
+    Parameters
+    ----------
+    group_means: pd.DataFrame
+        Length-weighted mean subscore of each group (one row per city - index, one column per group)
+    base_weights: np.ndarray
+        Base group weights (order of group_means columns)
+    n_samples: int
+        Number of base samples
+    method: str
+        Sampling method: "dirichlet" or "sobol" (see latent_weight_samples)
+    concentration: Optional[float]
+        Concentration of Dirichlet distribution around base weights (parameters concentration * normalized
+        base weights) - uniform distribution on the simplex if None
+    seed
+        Seed of random generator (results are reproducible)
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per city and group with city_name, target_group, base_weight, first_order_index,
+        total_order_index, and city-level statistics: baseline_score, score_mean, score_std,
+        score_p05/score_p95, baseline_rank, rank_change_probability (probability that the rank of the city
+        differs from its baseline rank), rank_p05/rank_p95.
+    """
+
+    group_names = list(group_means.columns)
+    n_groups = len(group_names)
+    means = group_means.to_numpy(dtype = float)
+
+    base_weights = np.asarray(base_weights, dtype = float)
+    base_weights = base_weights / base_weights.sum()
+
+    # Dirichlet parameters
+    if concentration is None:
+        alpha = np.ones(n_groups)
+    else:
+        if (base_weights <= 0).any():
+            raise ValueError("Base weights must be positive to sample weights around them")
+        alpha = concentration * base_weights
+
+    # Saltelli scheme: A, B and AB_i (A with column i from B) - (n_groups + 2) blocks of n_samples rows
+    A, B = latent_weight_samples(n_samples, alpha, method, seed)
+    AB = np.repeat(A[None], n_groups, axis = 0)
+    AB[np.arange(n_groups), :, np.arange(n_groups)] = B.T
+    samples = np.concatenate([A[None], B[None], AB]).reshape(-1, n_groups)
 
-        # ---- adapt GeoDataFrame to general pipeline ----
-        gdf_proc["segment_length"] = gdf_proc.geometry.apply(geodesic_length) 
-        gdf_proc = gdf_proc.rename(columns={"cyclability_metrics": "total_score"})
+    # Scores of all cities for all weight vectors (single matrix product)
+    logging.info(f"SCORE {len(samples)} WEIGHT VECTORS FOR {len(group_means)} CITIES")
+    scores = score_weight_vectors(normalize_weights(samples), means).reshape(n_groups + 2, n_samples, -1)
 
+    first_order, total_order = sobol_indices(scores[0], scores[1], scores[2:])
 
-        # Compute total city metrics    
-        logging.info(f"COMPUTE CITY METRICS FOR WEIGHT DELTA: {deltas[i]:+.2f}")
-        total_city_score, _, _ = compute_total_city_metrics(gdf_proc, 
-                                                            "cyclability", 
-                                                            weights_config)
+    # Score and rank distributions over weight vectors drawn from the distribution (A and B)
+    draws = scores[:2].reshape(2 * n_samples, -1)
+    baseline_score = score_weight_vectors(base_weights, means)
+    baseline_rank = city_ranks(baseline_score)
+    ranks = city_ranks(draws)
+    score_percentiles = np.percentile(draws, GLOBAL_PERCENTILES, axis = 0)
+    rank_percentiles = np.percentile(ranks, GLOBAL_PERCENTILES, axis = 0, method = "nearest")
 
-        sweep_city_score_result.append(total_city_score)
+    city_stats = pd.DataFrame({
+        "baseline_score": baseline_score,
+        "score_mean": draws.mean(axis = 0),
+        "score_std": draws.std(axis = 0),
+        "score_p05": score_percentiles[0],
+        "score_p95": score_percentiles[1],
+        "baseline_rank": baseline_rank,
+        "rank_change_probability": (ranks != baseline_rank).mean(axis = 0),
+        "rank_p05": rank_percentiles[0],
+        "rank_p95": rank_percentiles[1]
+    }, index = group_means.index)
 
+    # One row per city and group (cities x groups)
+    result = pd.DataFrame({
+        "city_name": np.repeat(group_means.index.to_numpy(), n_groups),
+        "target_group": np.tile(group_names, len(group_means)),
+        "base_weight": np.tile(base_weights, len(group_means)),
+        "first_order_index": first_order.T.ravel(),
+        "total_order_index": total_order.T.ravel()
+    })
 
-    return sweep_city_score_result, deltas.tolist()
\ No newline at end of file
+    return result.join(city_stats, on = "city_name")
\ No newline at end of file
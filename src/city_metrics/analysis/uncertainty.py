@@ -0,0 +1,274 @@
+"""
+Confidence intervals of the length-weighted city score.
+
+Two complementary estimates are computed from scored segments of a city:
+- spatial block bootstrap: segments are grouped into square grid blocks (spatially correlated segments stay
+  together), and blocks are resampled with replacement. Each resample is a row of a NumPy index matrix, so that
+  thousands of resamples are evaluated with a few gathers and row sums (chunked to bound memory, optionally
+  spread over a process pool)
+- analytic bounds: missing features (maxspeed, surface, lighting) of each segment are filled with the lowest
+  (worst case) and highest (best case) score of their mapping/bins - range of city scores compatible with
+  missing data
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from city_metrics.metrics.engine import CompiledMetrics
+
+# Default number of bootstrap resamples, block size (meters) and confidence level
+BOOTSTRAP_RESAMPLES = 2000
+BLOCK_SIZE = 500.0
+CONFIDENCE = 0.95
+
+# Maximum number of elements of index matrices (resamples are evaluated in chunks)
+MAX_INDEX_ELEMENTS = 2**22
+
+# Approximate length of a degree of latitude (meters)
+METERS_PER_DEGREE = 111_320.0
+
+@dataclass
+class CityScoreIntervals:
+    """
+    Confidence interval and best/worst-case bounds of a city score.
+    """
+
+    total_score: float
+    confidence: float
+    ci_lower: float
+    ci_upper: float
+    bootstrap_std: float
+    n_resamples: int
+    block_size: float
+    n_blocks: int
+    worst_case: float
+    best_case: float
+
+def spatial_block_ids(lon: np.ndarray,
+                      lat: np.ndarray,
+                      block_size: float = BLOCK_SIZE) -> np.ndarray:
+    """
+    Assign points (e.g., segment centroids in EPSG:4326) to square grid blocks of block_size meters.
+
+    Coordinates are projected with a local equirectangular approximation (sufficient at city scale).
+
+    Returns
+    -------
+    np.ndarray
+        Block of each point (0 to n_blocks - 1).
+    """
+
+    lon = np.asarray(lon, dtype = float)
+    lat = np.asarray(lat, dtype = float)
+
+    x = lon * METERS_PER_DEGREE * np.cos(np.radians(np.nanmean(lat)))
+    y = lat * METERS_PER_DEGREE
+
+    cells = np.floor(np.column_stack([x, y]) / block_size).astype(np.int64)
+    _, block_ids = np.unique(cells, axis = 0, return_inverse = True)
+
+    return block_ids.ravel()
+
+def block_bootstrap_scores(block_length: np.ndarray,
+                           block_score_length: np.ndarray,
+                           n_resamples: int,
+                           seed = 0) -> np.ndarray:
+    """
+    Return length-weighted city score of each block bootstrap resample.
+
+    Each resample draws as many blocks as available, with replacement (row of index matrix).
+
+    Parameters
+    ----------
+    block_length: np.ndarray
+        Sum of segment lengths of each block.
+    block_score_length: np.ndarray
+        Sum of score * length of each block.
+    n_resamples: int
+        Number of resamples.
+    seed
+        Seed of random generator (int or np.random.SeedSequence).
+
+    Returns
+    -------
+    np.ndarray
+        City score of each resample.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_blocks = len(block_length)
+
+    scores = np.empty(n_resamples, dtype = float)
+    chunk_size = max(1, MAX_INDEX_ELEMENTS // max(n_blocks, 1))
+    for start in range(0, n_resamples, chunk_size):
+        stop = min(start + chunk_size, n_resamples)
+        idx = rng.integers(0, n_blocks, size = (stop - start, n_blocks))
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            scores[start:stop] = block_score_length[idx].sum(axis = 1) / block_length[idx].sum(axis = 1)
+
+    return scores
+
+def parallel_block_bootstrap_scores(block_length: np.ndarray,
+                                    block_score_length: np.ndarray,
+                                    n_resamples: int,
+                                    seed: int = 0,
+                                    workers: int = 1) -> np.ndarray:
+    """
+    Same as block_bootstrap_scores, with resamples split over a process pool (independent random
+    streams spawned from seed - results only depend on seed and workers).
+    """
+
+    if workers <= 1:
+        return block_bootstrap_scores(block_length, block_score_length, n_resamples, seed)
+
+    sizes = [len(part) for part in np.array_split(np.arange(n_resamples), workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        parts = pool.map(block_bootstrap_scores,
+                         [block_length] * workers,
+                         [block_score_length] * workers,
+                         sizes,
+                         seeds)
+
+        return np.concatenate(list(parts))
+
+def feature_score_ranges(engine: CompiledMetrics,
+                         features: tuple) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return lowest and highest score of each feature (mapping values or bin scores).
+    """
+
+    compiled = {feature.name: feature for feature in engine.features}
+
+    min_scores, max_scores = [], []
+    for feature_name in features:
+        feature = compiled[feature_name]
+        scores = feature.scores if feature.type == "categorical" else feature.bin_scores
+        min_scores.append(float(np.min(scores)))
+        max_scores.append(float(np.max(scores)))
+
+    return np.array(min_scores), np.array(max_scores)
+
+def missing_feature_bounds(lengths: np.ndarray,
+                           scores: np.ndarray,
+                           feature_scores: np.ndarray,
+                           missing: np.ndarray,
+                           weights: np.ndarray,
+                           min_scores: np.ndarray,
+                           max_scores: np.ndarray) -> tuple[float, float]:
+    """
+    Return worst-case and best-case city score if missing features of segments are filled with
+    lowest and highest feature scores.
+
+    Parameters
+    ----------
+    lengths: np.ndarray
+        Length of each segment.
+    scores: np.ndarray
+        Score of each segment.
+    feature_scores: np.ndarray
+        Score of each segment (rows) and feature (columns) - features with missing information only.
+    missing: np.ndarray
+        Missing flag of each segment and feature (same shape as feature_scores).
+    weights: np.ndarray
+        Effective weight of each feature (group weight * feature weight).
+    min_scores: np.ndarray
+        Lowest score of each feature.
+    max_scores: np.ndarray
+        Highest score of each feature.
+
+    Returns
+    -------
+    tuple[float, float]
+        Worst-case and best-case city score.
+    """
+
+    total_length = lengths.sum()
+    if not total_length:
+        return float("nan"), float("nan")
+
+    # Score change of each segment if missing features get lowest/highest scores
+    missing = missing.astype(float)
+    worst = np.clip(scores + (missing * (min_scores - feature_scores)) @ weights, 0, 1)
+    best = np.clip(scores + (missing * (max_scores - feature_scores)) @ weights, 0, 1)
+
+    return float(lengths @ worst / total_length), float(lengths @ best / total_length)
+
+def city_score_intervals(segments: pd.DataFrame,
+                         engine: CompiledMetrics,
+                         features: tuple,
+                         n_resamples: int = BOOTSTRAP_RESAMPLES,
+                         block_size: float = BLOCK_SIZE,
+                         confidence: float = CONFIDENCE,
+                         seed: int = 0,
+                         workers: int = 1) -> Optional[CityScoreIntervals]:
+    """
+    Compute block bootstrap confidence interval and best/worst-case bounds of a city score.
+
+    Parameters
+    ----------
+    segments: pd.DataFrame
+        One row per segment with segment_length, total_score, lon/lat of centroid, and
+        score_<feature> and missing_<feature> columns for each feature with missing information.
+    engine: CompiledMetrics
+        Compiled metrics used to score segments (feature score ranges and weights).
+    features: tuple
+        Features with missing information (e.g., UNCERTAINTY_FEATURES).
+    n_resamples: int
+        Number of bootstrap resamples.
+    block_size: float
+        Size of spatial blocks (meters).
+    confidence: float
+        Confidence level of interval (e.g., 0.95).
+    seed: int
+        Seed of random generator (reproducible intervals).
+    workers: int
+        Number of worker processes evaluating resamples.
+
+    Returns
+    -------
+    Optional[CityScoreIntervals]
+        Intervals of city score (None if no segment has a length).
+    """
+
+    lengths = pd.to_numeric(segments["segment_length"]).to_numpy(dtype = float)
+    scores = pd.to_numeric(segments["total_score"]).to_numpy(dtype = float)
+
+    # Segments without length or score do not contribute
+    valid = ~np.isnan(lengths) & ~np.isnan(scores)
+    segments, lengths, scores = segments[valid], lengths[valid], scores[valid]
+    if not lengths.sum():
+        return None
+
+    # Block sums
+    block_ids = spatial_block_ids(segments["lon"].to_numpy(), segments["lat"].to_numpy(), block_size)
+    block_length = np.bincount(block_ids, weights = lengths)
+    block_score_length = np.bincount(block_ids, weights = scores * lengths)
+
+    resampled = parallel_block_bootstrap_scores(block_length, block_score_length, n_resamples, seed, workers)
+    alpha = (1 - confidence) / 2
+    ci_lower, ci_upper = np.nanquantile(resampled, [alpha, 1 - alpha])
+
+    # Analytic bounds (stored feature scores - middle of score range if unavailable)
+    weights = np.array([engine.weights[engine.feature_names.index(feature)] for feature in features])
+    min_scores, max_scores = feature_score_ranges(engine, features)
+    feature_scores = segments[[f"score_{feature}" for feature in features]].to_numpy(dtype = float)
+    feature_scores = np.where(np.isnan(feature_scores), (min_scores + max_scores) / 2, feature_scores)
+    missing = segments[[f"missing_{feature}" for feature in features]].to_numpy(dtype = bool)
+    worst_case, best_case = missing_feature_bounds(lengths, scores, feature_scores, missing, weights, min_scores, max_scores)
+
+    return CityScoreIntervals(
+        total_score = float(lengths @ scores / lengths.sum()),
+        confidence = confidence,
+        ci_lower = float(ci_lower),
+        ci_upper = float(ci_upper),
+        bootstrap_std = float(np.nanstd(resampled)),
+        n_resamples = n_resamples,
+        block_size = block_size,
+        n_blocks = len(block_length),
+        worst_case = worst_case,
+        best_case = best_case
+    )
@@ -1,8 +1,16 @@
 from fastapi import FastAPI
 from city_metrics.api.routes.segments import router as segments_router
+from city_metrics.api.routes.config import router as config_router
+from city_metrics.api.routes.scenarios import router as scenarios_router
 
 
 app = FastAPI(title = "city_metrics api")
 
 # Include segment router to API
-app.include_router(segments_router)
\ No newline at end of file
+app.include_router(segments_router)
+
+# Include config router to API
+app.include_router(config_router)
+
+# Include scenario router to API
+app.include_router(scenarios_router)
\ No newline at end of file
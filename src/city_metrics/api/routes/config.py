@@ -0,0 +1,23 @@
+from fastapi import APIRouter, HTTPException
+from city_metrics.api.schemas.config import MetricsConfigOut
+from city_metrics.metrics.config.registry import config_registry, METRICS_CONFIG_PATHS, WEIGHTS_CONFIG_PATH
+
+
+router = APIRouter(prefix = "/config", tags = ["config"])
+
+@router.get("/{metric_name}", response_model = MetricsConfigOut)
+def get_metrics_config(metric_name: str):
+
+    if metric_name not in METRICS_CONFIG_PATHS:
+        raise HTTPException(status_code = 404, detail = "Metrics not available")
+
+    # Served from config registry (files are re-read only if changed)
+    metrics_config_path = METRICS_CONFIG_PATHS[metric_name]
+    engine = config_registry.get_compiled(metric_name, metrics_config_path, WEIGHTS_CONFIG_PATH)
+
+    return MetricsConfigOut(
+        metric_name = metric_name,
+        metric_version = config_registry.get_version(metric_name, metrics_config_path),
+        weights_version = config_registry.get_version("weights", WEIGHTS_CONFIG_PATH),
+        feature_weights = dict(zip(engine.feature_names, engine.weights.tolist()))
+    )
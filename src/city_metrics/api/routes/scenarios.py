@@ -0,0 +1,36 @@
+from fastapi import APIRouter, HTTPException
+from city_metrics.api.schemas.scenario import ScenarioIn, ScenarioOut, SegmentScenarioOut
+from city_metrics.metrics.config.registry import METRICS_CONFIG_PATHS, WEIGHTS_CONFIG_PATH
+from city_metrics.services.metrics.scenario import run_scenario
+
+
+router = APIRouter(prefix = "/scenarios", tags = ["scenarios"])
+
+@router.post("/{city_name}", response_model = ScenarioOut)
+def post_scenario(city_name: str, scenario: ScenarioIn):
+
+    # Evaluated against cached city snapshot (baseline in DB is not modified)
+    try:
+        result = run_scenario(city_name,
+                              scenario.overrides,
+                              METRICS_CONFIG_PATHS["cyclability"],
+                              WEIGHTS_CONFIG_PATH,
+                              refresh = scenario.refresh)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+
+    return ScenarioOut(
+        city_name = result.city_name,
+        metric_version = result.metric_version,
+        n_segments = result.n_segments,
+        baseline_score = result.baseline_score,
+        scenario_score = result.scenario_score,
+        score_delta = result.score_delta,
+        baseline_uncertainty = result.baseline_uncertainty,
+        scenario_uncertainty = result.scenario_uncertainty,
+        segment_scores = {
+            osm_id: SegmentScenarioOut(baseline_score = baseline, scenario_score = score)
+            for osm_id, (baseline, score) in result.segment_scores.items()
+        },
+        unresolved = result.unresolved
+    )
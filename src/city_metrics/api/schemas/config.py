@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Dict
+
+
+class MetricsConfigOut(BaseModel):
+    metric_name: str
+    metric_version: str
+    weights_version: str
+    feature_weights: Dict[str, float]
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Union, List
+
+
+class ScenarioIn(BaseModel):
+    # Overridden attributes by OSM ID, e.g. {"way/1": {"bike_infrastructure": "track", "maxspeed": 30}}
+    overrides: Dict[str, Dict[str, Optional[Union[float, str]]]] = Field(min_length = 1)
+    refresh: bool = False
+
+class SegmentScenarioOut(BaseModel):
+    baseline_score: float
+    scenario_score: float
+
+class ScenarioOut(BaseModel):
+    city_name: str
+    metric_version: str
+    n_segments: int
+    baseline_score: float
+    scenario_score: float
+    score_delta: float
+    baseline_uncertainty: float
+    scenario_uncertainty: float
+    segment_scores: Dict[str, SegmentScenarioOut]
+    unresolved: List[str]
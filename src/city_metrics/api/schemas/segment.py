@@ -4,9 +4,11 @@ from typing import Optional, Dict
 
 class SegmentNetworkOut(BaseModel):
     osm_id: str
+    parent_osm_id: Optional[str] = None
     street_name: Optional[str]
     bike_infra: Optional[str]
     maxspeed: Optional[int]
+    gradient: Optional[float] = None
     is_oneway: Optional[bool]
     is_lit: Optional[bool]
     surface: Optional[str]
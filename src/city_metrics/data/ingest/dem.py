@@ -0,0 +1,273 @@
+"""
+Road gradient from a local digital elevation model (DEM GeoTIFF).
+
+Segments of a chunk are densified (one vertex every GRADIENT_SPACING meters at most), and all vertices of the
+chunk are sampled at once: vertex coordinates are converted into pixel coordinates of the raster (reprojected
+with a single vectorized pyproj call if the DEM is not in EPSG:4326), the window of the raster covering the
+vertices is read once, and elevations are interpolated bilinearly with NumPy gathers. Very large windows
+(high resolution DEM, chunk spread over the city) are read in tiles of DEM_TILE_SIZE pixels, one read per tile
+containing vertices: the whole raster is never loaded in memory.
+
+The gradient of a segment is the length-weighted mean of the absolute gradient of its edges
+(sum of absolute elevation changes / segment length, in percent): climbs and descents both count, as
+segments can be ridden in both directions. Segments with a vertex outside the raster or on nodata pixels
+get a missing gradient (NaN).
+
+rasterio is an optional dependency (pip install "city_metrics[dem]"): the gradient computation itself only
+needs an elevation sampling function (see segment_gradients).
+"""
+
+import logging
+import numpy as np
+import geopandas as gpd
+import shapely
+from pathlib import Path
+from typing import Callable
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Maximum distance between sampled vertices of a segment (meters)
+GRADIENT_SPACING = 30.0
+
+# Gradients are rounded (percent) - segments share attribute tuples for scoring (see metrics/engine.py)
+GRADIENT_DECIMALS = 1
+
+# Windows larger than DEM_MAX_WINDOW_PIXELS are read in square tiles of DEM_TILE_SIZE pixels
+DEM_MAX_WINDOW_PIXELS = 2**24
+DEM_TILE_SIZE = 2048
+
+# Meters per degree of latitude (local equirectangular approximation)
+METERS_PER_DEGREE = 111_320.0
+
+def bilinear_sample(array: np.ndarray,
+                    rows: np.ndarray,
+                    cols: np.ndarray) -> np.ndarray:
+    """
+    Interpolate values of a 2D array at fractional pixel coordinates (bilinear interpolation of pixel centers).
+
+    Pixel (i, j) covers [i, i + 1) x [j, j + 1) (same convention as raster affine transforms).
+    Points outside the array get NaN, points on the outer half pixel get values of the border pixels.
+    NaN pixels (nodata) propagate to the points interpolated from them.
+
+    Parameters
+    ----------
+    array: np.ndarray
+        2D array of values (e.g., elevations of a raster window).
+    rows: np.ndarray
+        Fractional row coordinate of each point.
+    cols: np.ndarray
+        Fractional column coordinate of each point.
+
+    Returns
+    -------
+    np.ndarray
+        Interpolated value of each point.
+    """
+
+    height, width = array.shape
+    rows = np.asarray(rows, dtype = float)
+    cols = np.asarray(cols, dtype = float)
+    inside = (rows >= 0) & (rows <= height) & (cols >= 0) & (cols <= width)
+
+    # Coordinates relative to pixel centers (clipped on the outer half pixel)
+    r = np.clip(np.where(inside, rows, 0.5) - 0.5, 0, height - 1)
+    c = np.clip(np.where(inside, cols, 0.5) - 0.5, 0, width - 1)
+    r0 = np.minimum(np.floor(r).astype(np.intp), max(height - 2, 0))
+    c0 = np.minimum(np.floor(c).astype(np.intp), max(width - 2, 0))
+    r1 = np.minimum(r0 + 1, height - 1)
+    c1 = np.minimum(c0 + 1, width - 1)
+    fr = r - r0
+    fc = c - c0
+
+    top = array[r0, c0] * (1 - fc) + array[r0, c1] * fc
+    bottom = array[r1, c0] * (1 - fc) + array[r1, c1] * fc
+    values = top * (1 - fr) + bottom * fr
+
+    return np.where(inside, values, np.nan)
+
+def segment_gradients(geoms,
+                      sample_elevations: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                      spacing: float = GRADIENT_SPACING) -> np.ndarray:
+    """
+    Return length-weighted gradient (percent) of LineStrings in EPSG:4326.
+
+    All vertices are sampled with a single call of sample_elevations, and edge lengths and elevation
+    changes are summed per segment with np.bincount (no per-segment Python loop).
+
+    Parameters
+    ----------
+    geoms
+        LineStrings (array-like of shapely geometries, EPSG:4326).
+    sample_elevations: Callable[[np.ndarray, np.ndarray], np.ndarray]
+        Function returning elevation (meters) of points given their longitudes and latitudes
+        (NaN where elevation is unavailable - e.g., DemSampler.sample).
+    spacing: float
+        Maximum distance between sampled vertices (meters).
+
+    Returns
+    -------
+    np.ndarray
+        Gradient of each segment (NaN if elevation is missing at one of its vertices, or segment has no length).
+    """
+
+    geoms = np.asarray(geoms, dtype = object)
+    n = len(geoms)
+    if n == 0:
+        return np.empty(0, dtype = float)
+
+    # Densify segments (spacing in degrees of latitude - conservative in longitude)
+    densified = shapely.segmentize(geoms, max_segment_length = spacing / METERS_PER_DEGREE)
+    coords, index = shapely.get_coordinates(densified, return_index = True)
+    elevations = np.asarray(sample_elevations(coords[:, 0], coords[:, 1]), dtype = float)
+
+    # Edges between consecutive vertices of the same segment (lengths in meters)
+    same_segment = index[1:] == index[:-1]
+    edge_segment = index[1:][same_segment]
+    dx = np.diff(coords[:, 0])[same_segment] * METERS_PER_DEGREE * np.cos(np.radians(coords[1:, 1][same_segment]))
+    dy = np.diff(coords[:, 1])[same_segment] * METERS_PER_DEGREE
+    edge_length = np.hypot(dx, dy)
+    edge_rise = np.abs(np.diff(elevations)[same_segment])
+
+    # Sums per segment (NaN elevations propagate to their segment)
+    length = np.bincount(edge_segment, weights = edge_length, minlength = n)
+    rise = np.bincount(edge_segment, weights = edge_rise, minlength = n)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        gradients = np.where(length > 0, 100 * rise / length, np.nan)
+
+    return np.round(gradients, GRADIENT_DECIMALS)
+
+class DemSampler:
+    """
+    Sampler of elevations of a local DEM raster (single band GeoTIFF, any CRS).
+
+    The raster is opened lazily, once per process (samplers are pickled without open dataset, so that
+    they can be sent to chunk worker processes - see services/pipeline.py).
+    """
+
+    def __init__(self,
+                 path: Path,
+                 band: int = 1,
+                 spacing: float = GRADIENT_SPACING):
+
+        if rasterio is None:
+            raise ImportError("DEM sampling requires rasterio (pip install \"city_metrics[dem]\")")
+
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"DEM raster not found: {self.path}")
+
+        self.band = band
+        self.spacing = spacing
+        self._dataset = None
+        self._transformer = None
+
+    def __getstate__(self) -> dict:
+
+        # Open dataset and transformer are not picklable: reopened in each process
+        state = self.__dict__.copy()
+        state["_dataset"] = None
+        state["_transformer"] = None
+        return state
+
+    @property
+    def dataset(self):
+        """
+        Open raster dataset (opened on first use).
+        """
+
+        if self._dataset is None:
+            self._dataset = rasterio.open(self.path)
+
+            # Vertices are reprojected to raster CRS if needed (EPSG:4326 assumed if raster has no CRS)
+            crs = self._dataset.crs
+            if crs is not None and crs.to_epsg() != 4326:
+                from pyproj import Transformer
+                self._transformer = Transformer.from_crs("EPSG:4326", crs.to_wkt(), always_xy = True)
+
+        return self._dataset
+
+    def close(self) -> None:
+        """
+        Close raster dataset.
+        """
+
+        if self._dataset is not None:
+            self._dataset.close()
+            self._dataset = None
+            self._transformer = None
+
+    def sample(self,
+               lon: np.ndarray,
+               lat: np.ndarray) -> np.ndarray:
+        """
+        Return elevation of points given in EPSG:4326 (NaN outside the raster or on nodata pixels).
+
+        The window covering all points is read once (in tiles if larger than DEM_MAX_WINDOW_PIXELS).
+        """
+
+        dataset = self.dataset
+        x = np.asarray(lon, dtype = float)
+        y = np.asarray(lat, dtype = float)
+        if self._transformer is not None:
+            x, y = self._transformer.transform(x, y)
+
+        # Fractional pixel coordinates (inverse affine transform)
+        inverse = ~dataset.transform
+        cols = inverse.a * x + inverse.b * y + inverse.c
+        rows = inverse.d * x + inverse.e * y + inverse.f
+
+        elevations = np.full(len(x), np.nan)
+        inside = np.flatnonzero((rows >= 0) & (rows <= dataset.height) & (cols >= 0) & (cols <= dataset.width))
+        if len(inside) == 0:
+            return elevations
+
+        # Window of points (one pixel margin for interpolation), split in tiles only if too large
+        window_pixels = (np.ptp(rows[inside]) + 3) * (np.ptp(cols[inside]) + 3)
+        tile_size = DEM_TILE_SIZE if window_pixels > DEM_MAX_WINDOW_PIXELS else max(dataset.height, dataset.width) + 1
+        tiles = (rows[inside] // tile_size).astype(np.int64) * (dataset.width // tile_size + 1) + (cols[inside] // tile_size).astype(np.int64)
+        tile_codes, tile_of_point = np.unique(tiles, return_inverse = True)
+        order = np.argsort(tile_of_point, kind = "stable")
+        bounds = np.searchsorted(tile_of_point[order], np.arange(len(tile_codes) + 1))
+
+        for tile_idx in range(len(tile_codes)):
+            points = inside[order[bounds[tile_idx]:bounds[tile_idx + 1]]]
+
+            row_off = max(int(np.floor(rows[points].min())) - 1, 0)
+            col_off = max(int(np.floor(cols[points].min())) - 1, 0)
+            row_end = min(int(np.ceil(rows[points].max())) + 1, dataset.height)
+            col_end = min(int(np.ceil(cols[points].max())) + 1, dataset.width)
+
+            window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+            array = dataset.read(self.band, window = window, out_dtype = "float32")
+            if dataset.nodata is not None:
+                array[array == dataset.nodata] = np.nan
+
+            # Window coordinates (margin of one pixel: neighbouring pixel centers are always in the window)
+            elevations[points] = bilinear_sample(array, rows[points] - row_off, cols[points] - col_off)
+
+        return elevations
+
+    def segment_gradients(self,
+                          geoms) -> np.ndarray:
+        """
+        Return length-weighted gradient (percent) of LineStrings in EPSG:4326 (see segment_gradients).
+        """
+
+        return segment_gradients(geoms, self.sample, self.spacing)
+
+    def add_gradients(self,
+                      gdf: gpd.GeoDataFrame) -> None:
+        """
+        Add gradient of segments of GeoDataFrame chunk in place (column "gradient").
+        """
+
+        gdf["gradient"] = self.segment_gradients(gdf.geometry.values)
+
+        logger.info(f"Gradient available for {int(np.count_nonzero(gdf['gradient'].notna()))}/{len(gdf)} segments.")
@@ -1,6 +1,8 @@
 import geopandas as gpd
 import pandas as pd
-from city_metrics.domain.segment import CyclabilitySegment
+import numpy as np
+from city_metrics.domain.segment import CyclabilitySegment, SegmentBatch, TRACKED_FEATURES
+from city_metrics.data.normalize.enrichment import ENRICHED_PREFIX, enrichment_columns
 from typing import Any
 from city_metrics.utils.helpers import row_get, row_has, row_items
 import re
@@ -42,28 +44,94 @@ def parse_maxspeed_to_kmh(value):
     # Else...
     return None
 
-def normalize_maxspeed_info(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+def normalize_maxspeed_info(gdf: gpd.GeoDataFrame,
+                            inplace: bool = False) -> gpd.GeoDataFrame:
     """
     Normalize maxspeed column of GeoDataFrame to km/h.
+
+    Each distinct raw maxspeed value is parsed only once.
+    If inplace is True, the given GeoDataFrame is modified directly (no copy).
     """
-    
-    gdf = gdf.copy()
+
+    if not inplace:
+        gdf = gdf.copy()
 
     # Ensure the column exists
     if "maxspeed" not in gdf.columns:
         gdf["maxspeed"] = None
+        return gdf
+
+    # Parse distinct values only (missing values get code -1)
+    codes, uniques = pd.factorize(gdf["maxspeed"])
+    parsed = [parse_maxspeed_to_kmh(val) for val in uniques]
 
-    # Update maxspeed info with normalized data (replace for now)
-    gdf["maxspeed"] = gdf["maxspeed"].apply(parse_maxspeed_to_kmh)
-    
     # Convert updated values as strings and use None for NaN - comply with pipeline
-    gdf["maxspeed"] = [
-        str(int(val)) if not pd.isna(val) else None 
-        for val in gdf["maxspeed"]
-    ]
+    # (trailing None is used for missing values, code -1)
+    parsed = np.array(
+        [str(int(val)) if val is not None else None for val in parsed] + [None],
+        dtype = object
+    )
+
+    # Update maxspeed info with normalized data (replace for now)
+    gdf["maxspeed"] = parsed[codes]
 
     return gdf
 
+# Highway types filtered out from the network
+EXCLUDED_HIGHWAY_TYPES = (
+    "motorway",
+    "motorway_link",
+    "bus_guideway",
+    "escape",
+    "traceway",
+    "steps",
+    "corridor",
+    "via_ferrata",
+    "proposed",
+    "construction",
+    "service",
+    "elevator",
+    "platform",
+    "track",
+    "path",
+    "trunk", # assuming trunks are mostly not cyclable
+    "trunk_link",
+    "raceway",
+    "bridleway"
+)
+
+def restriction_mask(gdf: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Compute row mask of raw OSM GeoDataFrame rows relevant for the package pipeline
+    (no intermediate GeoDataFrame is created).
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        GeoPandas GeoDataFrame storing raw GeoJSON FeatureCollection.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean array flagging rows to retain.
+    """
+
+    # Use None for rows without 'highway' or 'bicycle' info
+    no_info = pd.Series(None, index = gdf.index, dtype = object)
+    highway = gdf["highway"] if "highway" in gdf.columns else no_info
+    bicycle = gdf["bicycle"] if "bicycle" in gdf.columns else no_info
+
+    # Filter out all segments with bicycle restriction
+    mask = ~(bicycle == "no")
+
+    # Filter out all highway = footway | pedestrian LineStrings with no bicycle designation
+    mask &= ~(highway.isin(("footway", "pedestrian")) & (bicycle != "yes"))
+
+    # Filter out motorways and irrelevant highway types
+    mask &= ~highway.isin(EXCLUDED_HIGHWAY_TYPES)
+
+    return mask.to_numpy(dtype = bool)
+
 def restrict_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     """
     Restrict raw OSM GeoDataFrame FeatureCollection by removing unnecessary and
@@ -80,61 +148,14 @@ def restrict_gdf(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         GeoPandas GeoDataFrame storing filtered GeoJSON FeatureCollection to be used in package pipeline.
     """
 
-    gdf = gdf.copy()
-
-    # Ensure 'bicycle' column exists
-    if "bicycle" not in gdf.columns:
-        gdf["bicycle"] = None  # default to None for rows without info
-
-    # Filter out all segments with bicycle restriction
-    # ~ -> keep all rows not complying with the mask
-    mask = ~(gdf["bicycle"] == "no")
-    gdf_filtered = gdf[mask]
-
-    # Filter out all highway = footway LineStrings with no bicycle designation
-    # ~ -> keep all rows not complying with the mask
-    mask = ~((gdf_filtered["highway"] == "footway") & (gdf_filtered["bicycle"] != "yes"))
-    gdf_filtered = gdf_filtered[mask]
-
-    # Filter out all highway = pedestrian LineStrings with no bicycle designation
-    # ~ -> keep all rows not complying with the mask
-    mask = ~((gdf_filtered["highway"] == "pedestrian") & (gdf_filtered["bicycle"] != "yes"))
-    gdf_filtered = gdf_filtered[mask]
-
-    # Filter out motorways
-    mask = ~((gdf_filtered["highway"] == "motorway") | (gdf_filtered["highway"] == "motorway_link"))
-    gdf_filtered = gdf_filtered[mask]
-
-    # Filter out irrelevant highway types
-    mask = ~((gdf_filtered["highway"] == "bus_guideway") | 
-            (gdf_filtered["highway"] == "escape") | 
-            (gdf_filtered["highway"] == "traceway") | 
-            (gdf_filtered["highway"] == "steps") |
-            (gdf_filtered["highway"] == "corridor") | 
-            (gdf_filtered["highway"] == "via_ferrata") |
-            (gdf_filtered["highway"] == "proposed") |
-            (gdf_filtered["highway"] == "construction") |
-            (gdf_filtered["highway"] == "service") |
-            (gdf_filtered["highway"] == "elevator") |
-            (gdf_filtered["highway"] == "platform") |
-            (gdf_filtered["highway"] == "track") |
-            (gdf_filtered["highway"] == "path") |
-            (gdf_filtered["highway"] == "trunk") | # assuming trunks are mostly not cyclable
-            (gdf_filtered["highway"] == "trunk_link") |
-            (gdf_filtered["highway"] == "raceway") |            
-            (gdf_filtered["highway"] == "bridleway")) 
-
-
-    gdf_filtered = gdf_filtered[mask]
-
-    return gdf_filtered
+    return gdf[restriction_mask(gdf)]
 
 def extract_all_cycleway_tags(gdf_row: Any) -> dict:
     """Extract all cycleway-related data from GeoDataFrame row and store them in dictionary"""
 
     return {
         key: val for key, val in row_items(gdf_row)
-        if isinstance(val, str) and "cycleway" in key and pd.notna(val)
+        if isinstance(val, str) and "cycleway" in key and not key.startswith(ENRICHED_PREFIX) and pd.notna(val)
     }
 
 def extract_all_oneway_tags(gdf_row: Any) -> dict:
@@ -142,7 +163,7 @@ def extract_all_oneway_tags(gdf_row: Any) -> dict:
 
     return {
         key: val for key, val in row_items(gdf_row)
-        if isinstance(val, str) and "oneway" in key and "cycleway" not in key and pd.notna(val)
+        if isinstance(val, str) and "oneway" in key and "cycleway" not in key and not key.startswith(ENRICHED_PREFIX) and pd.notna(val)
     }
 
 def init_normal_cycleway_info() -> dict:
@@ -200,7 +221,8 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
     ----------
     gdf_row: Any
         Row from GeoDataFrame representing a road segment, containing 
-        required attributes.
+        required attributes (pd.Series or row of utils/helpers.iter_rows - rows of
+        itertuples do not keep colon-named tags such as cycleway:left).
     excellent_bike_infra: dict
         Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
     Returns
@@ -216,6 +238,8 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
         - "surface": surface type
         - "lighting": lighting condition
         - "highway": highway type
+        - "gradient": road gradient in percent (if sampled from DEM)
+        - "enrichment": attributes joined from local datasets (if enriched)
     """
 
 
@@ -226,7 +250,8 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
     missing_info = {
         "maxspeed": False,
         "surface": False,
-        "lighting": False
+        "lighting": False,
+        "gradient": False
     }
 
     # Gather segments facts
@@ -240,6 +265,18 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
     highway = row_get(gdf_row, "highway")
     maxspeed = row_get(gdf_row, "maxspeed")
     surface = row_get(gdf_row, "surface")
+
+    # Gather gradient (only available if sampled from DEM - see data/ingest/dem)
+    gradient = row_get(gdf_row, "gradient")
+    gradient = None if pd.isna(gradient) else float(gradient)
+    if row_has(gdf_row, "gradient") and gradient is None:
+        missing_info["gradient"] = True
+
+    # Gather attributes joined from local datasets (see data/normalize/enrichment)
+    enrichment = {
+        key[len(ENRICHED_PREFIX):]: val for key, val in row_items(gdf_row)
+        if isinstance(key, str) and key.startswith(ENRICHED_PREFIX)
+    }
     
     # Gather cycleway info
     cycleway_tags = extract_all_cycleway_tags(gdf_row)
@@ -327,6 +364,23 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
     if row_has(gdf_row, "missing_info"):
         missing_info = row_get(gdf_row, "missing_info")
 
+    # Use imputed values (optional imputation stage, or imputed values stored in PostGIS) where data is missing
+    # missing_info is left unchanged (observed state), imputation is tracked in imputed_info
+    imputed_info = {}
+    for feature, column in (("maxspeed", "maxspeed"), ("surface", "surface"), ("lighting", "lit")):
+        imputed_value = row_get(gdf_row, column + "_imputed")
+        if missing_info.get(feature) and row_has(gdf_row, column + "_imputed") and pd.notna(imputed_value):
+            imputed_info[feature] = True
+            if feature == "maxspeed":
+                maxspeed = imputed_value
+            elif feature == "surface":
+                surface = imputed_value
+            else:
+                lit = imputed_value
+
+    if row_has(gdf_row, "imputed_info") and isinstance(row_get(gdf_row, "imputed_info"), dict):
+        imputed_info = row_get(gdf_row, "imputed_info")
+
 
     ## Store key information in Segment dataclass
     return CyclabilitySegment(
@@ -340,5 +394,176 @@ def prepare_cyclability_segment(gdf_row: Any, excellent_bike_infra: dict) -> Cyc
         surface = surface,
         lighting = lit,
         highway = highway,
-        missing_info = missing_info
-    )
\ No newline at end of file
+        gradient = gradient,
+        enrichment = enrichment,
+        missing_info = missing_info,
+        imputed_info = imputed_info
+    )
+
+def _object_column(gdf: gpd.GeoDataFrame,
+                   column: str) -> np.ndarray:
+    """
+    Return GeoDataFrame column as object array (None values if column is not available).
+    """
+
+    if column not in gdf.columns:
+        return np.full(len(gdf), None, dtype = object)
+
+    return gdf[column].to_numpy(dtype = object)
+
+def _is_string(values: np.ndarray) -> np.ndarray:
+    """
+    Return mask of string values.
+    """
+
+    return np.fromiter((isinstance(val, str) for val in values), dtype = bool, count = len(values))
+
+def _last_string(gdf: gpd.GeoDataFrame,
+                 columns: list) -> np.ndarray:
+    """
+    Return last non-empty string value among columns (in column order) for each row, else None.
+    """
+
+    result = np.full(len(gdf), None, dtype = object)
+    for column in columns:
+        values = _object_column(gdf, column)
+        is_string = _is_string(values)
+        result[is_string] = values[is_string]
+
+    # Empty strings are not considered (same as truthiness checks of prepare_cyclability_segment)
+    result[result == ""] = None
+
+    return result
+
+def _flags_matrix(records: np.ndarray) -> np.ndarray:
+    """
+    Return boolean matrix of tracked features flagged in dicts (non-dict records have no flag).
+    """
+
+    return np.array(
+        [[bool(record.get(feature)) if isinstance(record, dict) else False for feature in TRACKED_FEATURES] for record in records],
+        dtype = bool
+    ).reshape(-1, len(TRACKED_FEATURES))
+
+def prepare_cyclability_batch(gdf: gpd.GeoDataFrame, excellent_bike_infra: dict) -> SegmentBatch:
+    """
+    Prepare columnar batch of cyclability segments from a whole GeoDataFrame chunk.
+
+    Vectorized equivalent of prepare_cyclability_segment (same parsing rules, applied column-wise - including
+    colon-named tags such as cycleway:left or oneway:bicycle): no per-segment object is allocated and geometry
+    is kept as the original GeoSeries.
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        GeoDataFrame of road segments (normalized chunk, or segments loaded from PostGIS).
+    excellent_bike_infra: dict
+        Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
+
+    Returns
+    -------
+    SegmentBatch
+        Columnar batch of cyclability segments.
+    """
+
+    n = len(gdf)
+    columns = [column for column in gdf.columns if isinstance(column, str)]
+
+    # Gather quality factors
+    lit = _object_column(gdf, "lit")
+    highway = _object_column(gdf, "highway")
+    maxspeed = _object_column(gdf, "maxspeed").copy()
+    surface = _object_column(gdf, "surface")
+
+    missing = np.zeros((n, len(TRACKED_FEATURES)), dtype = bool)
+    imputed = np.zeros((n, len(TRACKED_FEATURES)), dtype = bool)
+
+    ## Handle missing lighting information
+    missing[:, TRACKED_FEATURES.index("lighting")] = pd.isna(lit)
+    lit = np.where(pd.isna(lit), "unknown", lit).astype(object)
+
+    # Parse oneway information (see prepare_cyclability_segment)
+    # one-way for bikes if "oneway=yes" and no "oneway:bicycle" tag
+    oneway_bicycle = _object_column(gdf, "oneway:bicycle") if "oneway:bicycle" in columns else np.full(n, None, dtype = object)
+    bike_ways = np.where((_object_column(gdf, "oneway") == "yes") & ~_is_string(oneway_bicycle), "one", "both").astype(object)
+
+    # Cycleway types (last tag wins, same as normalize_cycleway_info)
+    cycleway_keys = {column: column.split(":") for column in columns if "cycleway" in column and not column.startswith(ENRICHED_PREFIX)}
+    undefined_type = _last_string(gdf, [column for column, keys in cycleway_keys.items() if len(keys) == 1])
+    left_type = _last_string(gdf, [column for column, keys in cycleway_keys.items() if len(keys) == 2 and keys[1] in ("left", "both")])
+    right_type = _last_string(gdf, [column for column, keys in cycleway_keys.items() if len(keys) == 2 and keys[1] in ("right", "both")])
+
+    ## Define cycleways and cyclable footways (no maxspeed penalty)
+    is_footway = highway == "footway"
+    is_cycleway = highway == "cycleway"
+    has_left = pd.notna(left_type)
+    has_right = pd.notna(right_type)
+    bike_infra = np.select(
+        [is_footway, is_cycleway, has_left & has_right, pd.notna(undefined_type), has_left, has_right],
+        ["footway", "cycleway", left_type, undefined_type, left_type, right_type],
+        default = "none"
+    ).astype(object)
+    maxspeed[is_footway | is_cycleway] = None
+
+    # Final adjustments
+    bike_infra[np.isin(bike_infra, ["no", "no|no"])] = "none"
+    bike_infra[np.isin(bike_infra, ["yes", "left", "right"])] = "lane"
+
+    missing[:, TRACKED_FEATURES.index("surface")] = pd.isna(surface)
+    surface = np.where(pd.isna(surface), "unknown", surface).astype(object)
+
+    # Gradient (only available if sampled from DEM - see data/ingest/dem)
+    if "gradient" in columns:
+        gradient = pd.to_numeric(pd.Series(_object_column(gdf, "gradient"), dtype = object), errors = "coerce").to_numpy(dtype = float)
+        missing[:, TRACKED_FEATURES.index("gradient")] = np.isnan(gradient)
+    else:
+        gradient = np.full(n, np.nan)
+
+    # Missing maxspeed info (normal roads without excellent bike infrastructure)
+    missing[:, TRACKED_FEATURES.index("maxspeed")] = (
+        pd.isna(maxspeed) & ~(is_footway | is_cycleway) & ~np.isin(bike_infra, list(excellent_bike_infra))
+    )
+
+    ## This section is used when loading data from PostGIS (jobs/recompute_metrics)
+    # If data present in gdf, load them instead of parsing
+    if "bike_infra" in columns:
+        stored_bike_infra = _object_column(gdf, "bike_infra")
+        stored = pd.notna(stored_bike_infra)
+        bike_infra[stored] = stored_bike_infra[stored]
+        bike_ways[stored] = _object_column(gdf, "is_oneway")[stored]
+    # Reuse missing info details
+    if "missing_info" in columns:
+        missing = _flags_matrix(_object_column(gdf, "missing_info"))
+
+    # Use imputed values (optional imputation stage, or imputed values stored in PostGIS) where data is missing
+    values = {"maxspeed": maxspeed, "surface": surface, "lighting": lit}
+    for idx, (feature, column) in enumerate((("maxspeed", "maxspeed"), ("surface", "surface"), ("lighting", "lit"))):
+        if column + "_imputed" not in columns:
+            continue
+        imputed_values = _object_column(gdf, column + "_imputed")
+        use = missing[:, TRACKED_FEATURES.index(feature)] & pd.notna(imputed_values)
+        imputed[:, TRACKED_FEATURES.index(feature)] = use
+        values[feature][use] = imputed_values[use]
+
+    if "imputed_info" in columns:
+        stored_imputed = _object_column(gdf, "imputed_info")
+        is_dict = np.fromiter((isinstance(val, dict) for val in stored_imputed), dtype = bool, count = n)
+        imputed[is_dict] = _flags_matrix(stored_imputed[is_dict])
+
+    return SegmentBatch(
+        osm_id = _object_column(gdf, "osm_id"),
+        name = _object_column(gdf, "name"),
+        geometry = gdf.geometry,
+        segment_length = pd.to_numeric(pd.Series(_object_column(gdf, "segment_length"), dtype = object)).to_numpy(dtype = float),
+        bike_infrastructure = bike_infra,
+        oneway = np.where(bike_ways == "one", "yes", "no").astype(object),
+        maxspeed = maxspeed,
+        surface = surface,
+        lighting = lit,
+        highway = highway,
+        gradient = gradient,
+        enrichment = {name: _object_column(gdf, column) for column, name in enrichment_columns(gdf).items()},
+        missing = missing,
+        imputed = imputed,
+        parent_osm_id = _object_column(gdf, "parent_osm_id") if "parent_osm_id" in columns else None
+    )
@@ -0,0 +1,259 @@
+"""
+Enrichment of network segments with attributes from local vector datasets (traffic counts, accident points,
+cycle parking, etc.).
+
+Layers configured in enrichment.yaml (GeoPackage, GeoParquet or GeoJSON) are loaded once, projected with a local
+equirectangular approximation (meters) and indexed with an STRtree. Segments of each chunk are then joined in bulk
+(one tree query per attribute - no per-segment Python loop), so that the cost of a chunk grows with its size and
+the logarithm of the layer size. Supported methods:
+- nearest: value of a column of the nearest feature within a maximum distance (distance to nearest feature if no column)
+- count: number of features within a distance of the segment (sum of a column if given)
+- overlap: share of segment length within features buffered by a distance (length-weighted mean of a column if given)
+
+Attributes are stored in dedicated columns (e.g., "enriched_accident_count") and scored as features of the same name
+when declared in the metrics YAML (see prepare_cyclability_batch).
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pathlib import Path
+from typing import Optional
+from city_metrics.utils.config_helpers import read_config
+from city_metrics.utils.misc import get_project_root
+from city_metrics.domain.segment import SegmentBatch, ENRICHED_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Default configuration of enrichment layers
+DEFAULT_ENRICHMENT_CONFIG_PATH = Path(__file__).parents[2] / "metrics" / "config" / "enrichment.yaml"
+
+# Supported join methods
+ENRICHMENT_METHODS = ("nearest", "count", "overlap")
+
+# Meters per degree of latitude (local equirectangular approximation)
+METERS_PER_DEGREE = 111_320.0
+
+def load_enrichment_layer(path: Path,
+                          layer: Optional[str] = None) -> gpd.GeoDataFrame:
+    """
+    Load local vector dataset (GeoParquet if extension is .parquet/.geoparquet, else any format read by
+    GeoPandas - GeoPackage, GeoJSON) in EPSG:4326, without null or empty geometries.
+    """
+
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".geoparquet"):
+        gdf = gpd.read_parquet(path)
+    else:
+        gdf = gpd.read_file(path, layer = layer)
+
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs("EPSG:4326")
+
+    return gdf[~(gdf.geometry.isna() | gdf.geometry.is_empty)]
+
+def project_geometries(geoms,
+                       reference_lat: float) -> np.ndarray:
+    """
+    Project geometries from EPSG:4326 to meters (local equirectangular projection).
+    """
+
+    scale = np.array([METERS_PER_DEGREE * np.cos(np.radians(reference_lat)), METERS_PER_DEGREE])
+
+    return shapely.transform(np.asarray(geoms, dtype = object), lambda coords: coords * scale)
+
+def attribute_values(layer: gpd.GeoDataFrame,
+                     column: Optional[str]) -> Optional[np.ndarray]:
+    """
+    Return values of layer column used by an attribute (float if numeric, object otherwise - None if no column).
+    """
+
+    if column is None:
+        return None
+    if column not in layer.columns:
+        raise KeyError(f"Column '{column}' not found in enrichment layer")
+
+    values = layer[column]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype = float)
+
+    return values.to_numpy(dtype = object)
+
+def join_nearest(tree: shapely.STRtree,
+                 segments: np.ndarray,
+                 values: Optional[np.ndarray],
+                 distance: Optional[float]) -> np.ndarray:
+    """
+    Return value of nearest feature of each segment within distance (distance to nearest feature if values
+    is None). Segments without feature within distance get NaN (None for non-numeric values).
+    """
+
+    pairs, distances = tree.query_nearest(segments, max_distance = distance, return_distance = True, all_matches = False)
+
+    if values is None:
+        result = np.full(len(segments), np.nan)
+        result[pairs[0]] = distances
+    else:
+        result = np.full(len(segments), np.nan if values.dtype == float else None, dtype = values.dtype)
+        result[pairs[0]] = values[pairs[1]]
+
+    return result
+
+def join_count(tree: shapely.STRtree,
+               segments: np.ndarray,
+               values: Optional[np.ndarray],
+               distance: float) -> np.ndarray:
+    """
+    Return number of features within distance of each segment (sum of values if given).
+    """
+
+    pairs = tree.query(segments, predicate = "dwithin", distance = distance)
+    weights = None if values is None else np.nan_to_num(values[pairs[1]].astype(float))
+
+    return np.bincount(pairs[0], weights = weights, minlength = len(segments)).astype(float)
+
+def join_overlap(tree: shapely.STRtree,
+                 features: np.ndarray,
+                 segments: np.ndarray,
+                 values: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Return share of length of each segment within features (length-weighted mean of values over
+    overlapping parts if given - NaN if segment does not overlap any feature).
+
+    Overlapping features are counted once each (share is capped to 1).
+    """
+
+    n = len(segments)
+    pairs = tree.query(segments, predicate = "intersects")
+
+    # Intersections are computed for candidate pairs only
+    overlap = shapely.length(shapely.intersection(segments[pairs[0]], features[pairs[1]]))
+    overlap_length = np.bincount(pairs[0], weights = overlap, minlength = n)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        if values is None:
+            return np.minimum(overlap_length / shapely.length(segments), 1.0)
+
+        weighted = np.bincount(pairs[0], weights = overlap * values[pairs[1]].astype(float), minlength = n)
+        return np.where(overlap_length > 0, weighted / overlap_length, np.nan)
+
+def read_enrichment_config(config_path: Optional[Path] = None) -> dict:
+    """
+    Read configuration of enrichment layers (default: metrics/config/enrichment.yaml).
+    """
+
+    config = read_config("enrichment", "yaml", config_path or DEFAULT_ENRICHMENT_CONFIG_PATH) or {}
+
+    return config.get("layers") or {}
+
+class SpatialEnricher:
+    """
+    Spatial join of network segments with local vector layers.
+
+    Parameters
+    ----------
+    layers_config: dict
+        Configured layers by layer name (see enrichment.yaml): path (relative to project root), optional
+        layer (GeoPackage layer name), and attributes by attribute name (method, optional column, distance in meters).
+    root: Optional[Path]
+        Base directory of relative layer paths (default: project root).
+    """
+
+    def __init__(self,
+                 layers_config: dict,
+                 root: Optional[Path] = None):
+
+        root = Path(root) if root is not None else get_project_root()
+
+        # Loaded layers by layer name
+        layers = {}
+        for layer_name, layer_config in layers_config.items():
+            path = Path(layer_config["path"])
+            layers[layer_name] = load_enrichment_layer(path if path.is_absolute() else root / path, layer_config.get("layer"))
+            logger.info(f"Loaded enrichment layer {layer_name}: {len(layers[layer_name])} features.")
+
+        # Reference latitude of local projection
+        coords = [shapely.get_coordinates(shapely.centroid(layer.geometry.values)) for layer in layers.values() if len(layer)]
+        self.reference_lat = float(np.mean(np.concatenate(coords)[:, 1])) if coords else 0.0
+
+        # Attribute joins: (method, STRtree, projected features, values, distance) by attribute name
+        self.attributes = {}
+        for layer_name, layer_config in layers_config.items():
+            layer = layers[layer_name]
+            features = project_geometries(layer.geometry.values, self.reference_lat)
+            tree = shapely.STRtree(features)
+
+            for attribute_name, attribute_config in layer_config.get("attributes", {}).items():
+                method = attribute_config.get("method")
+                if method not in ENRICHMENT_METHODS:
+                    raise ValueError(f"Enrichment method not available: {method} (attribute '{attribute_name}')")
+                if attribute_name in self.attributes or attribute_name in SegmentBatch.ATTRIBUTES:
+                    raise ValueError(f"Enrichment attribute '{attribute_name}' is already defined")
+
+                distance = attribute_config.get("distance")
+                values = attribute_values(layer, attribute_config.get("column"))
+
+                if method == "count" and distance is None:
+                    raise ValueError(f"Enrichment attribute '{attribute_name}' (count) needs a distance")
+
+                # Overlap with buffered features (buffered once - own tree)
+                if method == "overlap" and distance:
+                    buffered = shapely.buffer(features, distance)
+                    self.attributes[attribute_name] = (method, shapely.STRtree(buffered), buffered, values, distance)
+                else:
+                    self.attributes[attribute_name] = (method, tree, features, values, distance)
+
+    @property
+    def attribute_names(self) -> list[str]:
+        return list(self.attributes)
+
+    def enrich(self,
+               gdf: gpd.GeoDataFrame) -> None:
+        """
+        Add enrichment attributes of GeoDataFrame chunk segments in place (columns "enriched_<attribute>").
+        """
+
+        segments = project_geometries(gdf.geometry.values, self.reference_lat)
+
+        for attribute_name, (method, tree, features, values, distance) in self.attributes.items():
+
+            if method == "nearest":
+                result = join_nearest(tree, segments, values, distance)
+            elif method == "count":
+                result = join_count(tree, segments, values, distance)
+            else:
+                result = join_overlap(tree, features, segments, values)
+
+            gdf[ENRICHED_PREFIX + attribute_name] = pd.Series(result, index = gdf.index)
+
+            logger.info(f"Enriched {attribute_name}: {int(pd.notna(result).sum())}/{len(gdf)} segments.")
+
+def enrichment_columns(gdf: pd.DataFrame) -> dict[str, str]:
+    """
+    Return enrichment attribute of each enrichment column of GeoDataFrame (column -> attribute name).
+    """
+
+    return {
+        column: column[len(ENRICHED_PREFIX):]
+        for column in gdf.columns if isinstance(column, str) and column.startswith(ENRICHED_PREFIX)
+    }
+
+def expand_enrichment(gdf: pd.DataFrame,
+                      column: str = "enrichment",
+                      prefix: str = ENRICHED_PREFIX) -> pd.DataFrame:
+    """
+    Expand column of enrichment dicts (e.g., network_segments.enrichment JSONB) into one column per attribute
+    ("<prefix><attribute>" - missing attributes are None). The dict column is removed.
+    """
+
+    if column not in gdf.columns:
+        return gdf
+
+    records = gdf.pop(column).to_numpy(dtype = object)
+    names = list(dict.fromkeys(name for record in records if isinstance(record, dict) for name in record))
+    for name in names:
+        gdf[prefix + name] = [record.get(name) if isinstance(record, dict) else None for record in records]
+
+    return gdf
@@ -0,0 +1,191 @@
+"""
+Spatial kNN imputation of missing segment attributes (maxspeed, surface, lighting).
+
+Missing attributes of a segment are imputed from the nearest segments of the same highway class
+for which the attribute is observed (mode of the k nearest donors within a maximum distance).
+
+Donors are indexed once per (feature, highway class) with an STRtree on segment midpoints, and recipients
+of each chunk are queried in bulk (vectorized), so that imputation scales as O(n log n) with the network size.
+Distances are computed on midpoints projected with a local equirectangular approximation (meters).
+
+Imputed values are stored in dedicated columns (e.g., "surface_imputed") - raw columns are left untouched,
+so that observed and imputed information can be kept separate (see prepare_cyclability_segment).
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# Imputed features and associated raw GeoDataFrame columns
+IMPUTED_FEATURES = {
+    "maxspeed": "maxspeed",
+    "surface": "surface",
+    "lighting": "lit"
+}
+
+# Suffix of columns storing imputed values
+IMPUTED_SUFFIX = "_imputed"
+
+# Meters per degree of latitude (local equirectangular approximation)
+METERS_PER_DEGREE = 111_320.0
+
+def segment_midpoints(geoms,
+                      reference_lat: float) -> np.ndarray:
+    """
+    Return midpoints of LineStrings as (x, y) coordinates in meters (local equirectangular projection).
+    """
+
+    midpoints = shapely.line_interpolate_point(np.asarray(geoms, dtype = object), 0.5, normalized = True)
+    coords = shapely.get_coordinates(midpoints)
+
+    return np.column_stack([
+        coords[:, 0] * METERS_PER_DEGREE * np.cos(np.radians(reference_lat)),
+        coords[:, 1] * METERS_PER_DEGREE
+    ])
+
+def vote_nearest(recipients: np.ndarray,
+                 distances: np.ndarray,
+                 codes: np.ndarray,
+                 n_recipients: int,
+                 k: int) -> np.ndarray:
+    """
+    Vote imputed value code of each recipient among its k nearest donors (mode, ties broken by distance).
+
+    Parameters
+    ----------
+    recipients: np.ndarray
+        Recipient index of each (recipient, donor) pair.
+    distances: np.ndarray
+        Distance of each pair.
+    codes: np.ndarray
+        Value code of donor of each pair.
+    n_recipients: int
+        Number of recipients.
+    k: int
+        Number of nearest donors considered.
+
+    Returns
+    -------
+    np.ndarray
+        Voted code for each recipient (-1 if recipient has no donor).
+    """
+
+    voted = np.full(n_recipients, -1, dtype = np.intp)
+    if len(recipients) == 0:
+        return voted
+
+    # Keep k nearest donors of each recipient
+    order = np.lexsort((distances, recipients))
+    recipients, distances, codes = recipients[order], distances[order], codes[order]
+    group_start = np.flatnonzero(np.r_[True, recipients[1:] != recipients[:-1]])
+    rank = np.arange(len(recipients)) - np.repeat(group_start, np.diff(np.r_[group_start, len(recipients)]))
+    keep = rank < k
+    recipients, distances, codes = recipients[keep], distances[keep], codes[keep]
+
+    # Count votes per (recipient, code) - keep nearest distance for ties
+    n_codes = codes.max() + 1
+    keys, inverse, counts = np.unique(recipients * n_codes + codes, return_inverse = True, return_counts = True)
+    nearest = np.full(len(keys), np.inf)
+    np.minimum.at(nearest, inverse, distances)
+
+    # Most voted code per recipient (then nearest)
+    key_recipients = keys // n_codes
+    order = np.lexsort((nearest, -counts, key_recipients))
+    first = np.r_[True, key_recipients[order][1:] != key_recipients[order][:-1]]
+    winners = order[first]
+    voted[key_recipients[winners]] = keys[winners] % n_codes
+
+    return voted
+
+class SpatialImputer:
+    """
+    Spatial kNN imputer of missing segment attributes.
+
+    Parameters
+    ----------
+    gdfs: list[gpd.GeoDataFrame]
+        Normalized GeoDataFrame chunks of the whole network (donors are taken from all chunks).
+    k: int
+        Number of nearest donors voting for imputed value.
+    max_distance: float
+        Maximum distance (meters) between segment midpoints of recipient and donors.
+    """
+
+    def __init__(self,
+                 gdfs: list[gpd.GeoDataFrame],
+                 k: int = 5,
+                 max_distance: float = 250.0):
+
+        self.k = k
+        self.max_distance = max_distance
+
+        gdfs = [gdf for gdf in gdfs if not gdf.empty]
+        geoms = np.concatenate([np.asarray(gdf.geometry.values, dtype = object) for gdf in gdfs] or [np.empty(0, dtype = object)])
+        highway = np.concatenate([column_values(gdf, "highway") for gdf in gdfs] or [np.empty(0, dtype = object)])
+
+        # Reference latitude of local projection
+        self.reference_lat = float(np.mean(shapely.get_coordinates(geoms)[:, 1])) if len(geoms) else 0.0
+        midpoints = segment_midpoints(geoms, self.reference_lat) if len(geoms) else np.empty((0, 2))
+
+        # Donor index per (feature, highway class): (STRtree of midpoints, donor midpoints, value codes, values)
+        self.donors = {}
+        for feature, column in IMPUTED_FEATURES.items():
+            values = np.concatenate([column_values(gdf, column) for gdf in gdfs] or [np.empty(0, dtype = object)])
+            observed = pd.notna(values)
+
+            for highway_class in pd.unique(highway[observed & pd.notna(highway)]):
+                donor = observed & (highway == highway_class)
+                codes, uniques = pd.factorize(values[donor])
+                points = shapely.points(midpoints[donor])
+                self.donors[(feature, highway_class)] = (shapely.STRtree(points), midpoints[donor], codes, np.asarray(uniques, dtype = object))
+
+    def impute(self,
+               gdf: gpd.GeoDataFrame) -> None:
+        """
+        Impute missing attributes of GeoDataFrame chunk in place (columns "<column>_imputed").
+        """
+
+        highway = column_values(gdf, "highway")
+        midpoints = segment_midpoints(gdf.geometry.values, self.reference_lat) if not gdf.empty else np.empty((0, 2))
+
+        for feature, column in IMPUTED_FEATURES.items():
+
+            values = column_values(gdf, column)
+            imputed = np.full(len(gdf), None, dtype = object)
+            missing = pd.isna(values)
+
+            for highway_class in pd.unique(highway[missing & pd.notna(highway)]):
+                donors = self.donors.get((feature, highway_class))
+                if donors is None:
+                    continue
+                tree, donor_points, codes, uniques = donors
+
+                # Bulk query of donors within max distance for all recipients of class
+                recipient_idx = np.flatnonzero(missing & (highway == highway_class))
+                recipient_points = shapely.points(midpoints[recipient_idx])
+                pairs = tree.query(recipient_points, predicate = "dwithin", distance = self.max_distance)
+                distances = np.hypot(*(midpoints[recipient_idx][pairs[0]] - donor_points[pairs[1]]).T)
+
+                voted = vote_nearest(pairs[0], distances, codes[pairs[1]], len(recipient_idx), self.k)
+                has_vote = voted >= 0
+                imputed[recipient_idx[has_vote]] = uniques[voted[has_vote]]
+
+            # Keep None for missing values (object dtype) - comply with pipeline
+            gdf[column + IMPUTED_SUFFIX] = pd.Series(imputed, index = gdf.index, dtype = object)
+
+            logger.info(f"Imputed {feature}: {int(pd.notna(imputed).sum())}/{int(missing.sum())} missing values.")
+
+def column_values(gdf: gpd.GeoDataFrame,
+                  column: str) -> np.ndarray:
+    """
+    Return values of GeoDataFrame column as object array (None values if column is not available).
+    """
+
+    if column not in gdf.columns:
+        return np.full(len(gdf), None, dtype = object)
+
+    return gdf[column].to_numpy(dtype = object)
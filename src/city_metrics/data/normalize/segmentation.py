@@ -0,0 +1,138 @@
+"""
+Topological noding of the road network: split OSM ways at junctions into network segments.
+
+OSM ways sharing a junction share the same OSM node, hence the same coordinates. Junctions are
+therefore found by hashing vertex coordinates (vectorized) over all ways of the network and
+retaining vertices shared by at least two ways. Ways are then split at their interior junction vertices.
+
+Note: geometric intersections without shared node (bridges, tunnels) are deliberately not split.
+"""
+
+import numpy as np
+import shapely
+import geopandas as gpd
+from city_metrics.utils.geometry import geodesic_lengths
+from city_metrics.validation.geometry import has_distinct_coordinates
+
+# Precision of OSM node coordinates (degrees)
+COORDINATE_PRECISION = 1e-7
+
+# Separator between parent OSM ID and sub-segment number (e.g., "way/123-2")
+SUB_SEGMENT_SEPARATOR = "-"
+
+def coordinate_keys(coords: np.ndarray) -> np.ndarray:
+    """
+    Hash (lon, lat) coordinates into single integer keys (coordinates snapped to OSM precision).
+    """
+
+    # Shift snapped coordinates to positive integers (lon < 2^32, lat < 2^32 once shifted)
+    snapped = np.rint(np.asarray(coords)[:, :2] / COORDINATE_PRECISION).astype(np.int64)
+    lon = (snapped[:, 0] + 1_800_000_000).astype(np.uint64)
+    lat = (snapped[:, 1] + 900_000_000).astype(np.uint64)
+
+    return (lon << np.uint64(32)) | lat
+
+def find_junction_keys(geoms) -> np.ndarray:
+    """
+    Find junction vertices of a network (vertices shared by at least two geometries).
+
+    Parameters
+    ----------
+    geoms: array-like
+        LineStrings of the whole network (all chunks).
+
+    Returns
+    -------
+    np.ndarray
+        Sorted array of coordinate keys of junction vertices.
+    """
+
+    coords, index = shapely.get_coordinates(np.asarray(geoms, dtype = object), return_index = True)
+    if len(coords) == 0:
+        return np.empty(0, dtype = np.uint64)
+
+    keys = coordinate_keys(coords)
+
+    # Count each vertex only once per geometry (closed ways repeat their first vertex)
+    order = np.lexsort((keys, index))
+    keys, index = keys[order], index[order]
+    first = np.ones(len(keys), dtype = bool)
+    first[1:] = (keys[1:] != keys[:-1]) | (index[1:] != index[:-1])
+
+    unique_keys, counts = np.unique(keys[first], return_counts = True)
+
+    return unique_keys[counts >= 2]
+
+def split_at_junctions(gdf: gpd.GeoDataFrame,
+                       junction_keys: np.ndarray) -> gpd.GeoDataFrame:
+    """
+    Split LineStrings of GeoDataFrame at their interior junction vertices.
+
+    Each sub-segment keeps the attributes of its way, the OSM ID of its way (parent_osm_id)
+    and gets its own osm_id (parent OSM ID + sub-segment number, e.g. "way/123-2") and segment_length.
+    Ways without interior junction keep their osm_id.
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        Normalized GeoDataFrame (valid LineStrings).
+    junction_keys: np.ndarray
+        Sorted coordinate keys of junction vertices (from find_junction_keys).
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        GeoDataFrame of network segments.
+    """
+
+    if gdf.empty:
+        segments = gdf.copy()
+        segments["parent_osm_id"] = segments["osm_id"]
+        return segments
+
+    geoms = np.asarray(gdf.geometry.values, dtype = object)
+    coords, index = shapely.get_coordinates(geoms, return_index = True)
+
+    # Interior vertices (neither first nor last vertex of their geometry)
+    interior = np.zeros(len(coords), dtype = bool)
+    interior[1:-1] = (index[1:-1] == index[:-2]) & (index[1:-1] == index[2:])
+
+    # Split vertices end a sub-segment and start the next one: duplicate them
+    split = interior & np.isin(coordinate_keys(coords), junction_keys)
+    repeats = 1 + split.astype(np.intp)
+    coords = np.repeat(coords, repeats, axis = 0)
+    index = np.repeat(index, repeats)
+
+    # Flag first vertex of each sub-segment: first vertex of geometry or second copy of split vertex
+    starts = np.zeros(len(coords), dtype = bool)
+    starts[0] = True
+    starts[1:] = index[1:] != index[:-1]
+    starts[np.cumsum(repeats)[split] - 1] = True
+    piece = np.cumsum(starts) - 1
+
+    pieces = shapely.linestrings(coords, indices = piece)
+    parents = index[starts]
+
+    # Drop zero-length sub-segments (repeated vertices)
+    keep = has_distinct_coordinates(pieces)
+    pieces, parents = pieces[keep], parents[keep]
+
+    # Sub-segment number within its way (kept sub-segments only - contiguous numbers)
+    first_piece = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]]) if len(parents) else np.empty(0, dtype = np.intp)
+    number = np.arange(len(parents)) - np.repeat(first_piece, np.diff(np.r_[first_piece, len(parents)]))
+    n_pieces = np.bincount(parents, minlength = len(gdf))[parents]
+
+    # Single materialization of network segments
+    segments = gdf.take(parents).reset_index(drop = True)
+    segments[segments.geometry.name] = gpd.GeoSeries(pieces, index = segments.index, crs = gdf.crs)
+
+    parent_osm_id = segments["osm_id"].to_numpy(dtype = object)
+    segments["parent_osm_id"] = parent_osm_id
+    segments["osm_id"] = np.where(
+        n_pieces > 1,
+        [f"{osm_id}{SUB_SEGMENT_SEPARATOR}{num + 1}" for osm_id, num in zip(parent_osm_id, number)],
+        parent_osm_id
+    )
+    segments["segment_length"] = geodesic_lengths(pieces)
+
+    return segments
@@ -1,5 +1,8 @@
 from dataclasses import dataclass, field
 from typing import Optional, Any, Dict
+import numpy as np
+import pandas as pd
+import geopandas as gpd
 
 
 @dataclass
@@ -24,10 +27,19 @@ class CyclabilitySegment(Segment):
     lighting: str
     highway: str
 
+    # Length-weighted gradient (percent) sampled from DEM (None if not available)
+    gradient: Optional[float] = None
+
+    # Attributes joined from local datasets, by attribute name (scored if declared as features)
+    enrichment: Dict[str, Any] = field(default_factory = dict)
+
     cyclability_metrics: Optional[float] = None
 
     missing_info: Dict[str, bool] = field(default_factory = dict)
 
+    # Features imputed from nearest segments (missing_info keeps observed state)
+    imputed_info: Dict[str, bool] = field(default_factory = dict)
+
     # Add method to assign metrics for cyclability
     def set_metrics(self, metrics_name: str, value: float) -> None:
         
@@ -36,4 +48,116 @@ class CyclabilitySegment(Segment):
             raise ValueError("Invalid metrics for CyclabilitySegment")
         
         # Set metrics
-        self.cyclability_metrics = value
\ No newline at end of file
+        self.cyclability_metrics = value
+
+# Features tracked in missing_info / imputed_info (columns of SegmentBatch.missing and SegmentBatch.imputed)
+TRACKED_FEATURES = ("maxspeed", "surface", "lighting", "gradient")
+
+# Prefix of GeoDataFrame columns storing enrichment attributes (see data/normalize/enrichment)
+ENRICHED_PREFIX = "enriched_"
+
+@dataclass
+class SegmentBatch:
+    """
+    Columnar batch of cyclability segments (struct of arrays - one array per CyclabilitySegment field).
+
+    Geometry is kept as the original GeoSeries and is never touched by scoring. Missing and imputed
+    information is stored as boolean matrices (one column per tracked feature), and metrics scores are
+    filled in place by scoring (one array per metrics).
+    """
+
+    osm_id: np.ndarray
+    name: np.ndarray
+    geometry: gpd.GeoSeries
+    segment_length: np.ndarray
+
+    bike_infrastructure: np.ndarray
+    oneway: np.ndarray
+    maxspeed: np.ndarray
+    surface: np.ndarray
+    lighting: np.ndarray
+    highway: np.ndarray
+    gradient: np.ndarray
+
+    # Boolean matrices (segments x TRACKED_FEATURES)
+    missing: np.ndarray
+    imputed: np.ndarray
+
+    # OSM way of segments split at junctions (None if not split)
+    parent_osm_id: Optional[np.ndarray] = None
+
+    # Attributes joined from local datasets, by attribute name (see data/normalize/enrichment)
+    enrichment: Dict[str, np.ndarray] = field(default_factory = dict)
+
+    # Metrics scores by metrics name (filled in place by scoring)
+    metrics: Dict[str, np.ndarray] = field(default_factory = dict)
+
+    # Attribute fields (used by scoring)
+    ATTRIBUTES = ("osm_id", "bike_infrastructure", "oneway", "maxspeed", "surface", "lighting", "highway", "gradient")
+
+    def __len__(self) -> int:
+        return len(self.osm_id)
+
+    def set_metrics(self, metrics_name: str, values: np.ndarray) -> None:
+        """
+        Set metrics scores of all segments.
+        """
+
+        self.metrics[metrics_name] = np.asarray(values, dtype = float)
+
+    def attributes(self) -> pd.DataFrame:
+        """
+        Return attribute columns used by scoring (no geometry), including enrichment attributes.
+        """
+
+        columns = {name: getattr(self, name) for name in self.ATTRIBUTES}
+        columns.update(self.enrichment)
+
+        return pd.DataFrame(columns, copy = False)
+
+    def missing_info(self) -> list[dict]:
+        """
+        Return missing_info dicts of all segments (e.g., for storage).
+        """
+
+        return [dict(zip(TRACKED_FEATURES, row)) for row in self.missing.tolist()]
+
+    def imputed_info(self) -> list[dict]:
+        """
+        Return imputed_info dicts of all segments (only imputed features are listed).
+        """
+
+        return [{feature: True for feature, flag in zip(TRACKED_FEATURES, row) if flag} for row in self.imputed.tolist()]
+
+    def to_geodataframe(self) -> gpd.GeoDataFrame:
+        """
+        Return GeoDataFrame with the same columns as a GeoDataFrame built from CyclabilitySegment
+        dataclasses, plus one "<metrics_name>_metrics" column per metrics (and parent_osm_id if available).
+        """
+
+        columns = {
+            "osm_id": self.osm_id,
+            "name": self.name,
+            "segment_length": self.segment_length,
+            "bike_infrastructure": self.bike_infrastructure,
+            "oneway": self.oneway,
+            "maxspeed": self.maxspeed,
+            "surface": self.surface,
+            "lighting": self.lighting,
+            "highway": self.highway,
+            "gradient": self.gradient,
+            "missing_info": self.missing_info(),
+            "imputed_info": self.imputed_info()
+        }
+        for metrics_name, values in self.metrics.items():
+            columns[f"{metrics_name}_metrics"] = values
+        if self.parent_osm_id is not None:
+            columns["parent_osm_id"] = self.parent_osm_id
+        for name, values in self.enrichment.items():
+            columns[ENRICHED_PREFIX + name] = values
+
+        geometry = gpd.GeoSeries(self.geometry.values, crs = self.geometry.crs)
+        gdf = gpd.GeoDataFrame(columns, geometry = geometry, crs = self.geometry.crs)
+
+        # Same column order as dataclass fields (geometry third)
+        return gdf[["osm_id", "name", "geometry"] + [name for name in gdf.columns if name not in ("osm_id", "name", "geometry")]]
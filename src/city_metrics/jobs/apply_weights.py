@@ -0,0 +1,26 @@
+import click
+import logging
+
+@click.command()
+@click.option("--city", "--city-name", "city_names", type = str, multiple = True, help = "City to update (repeatable - default: all cities)")
+def main(city_names):
+
+    from city_metrics.services.metrics.compute import apply_weights_to_cities
+    from city_metrics.utils.misc import get_project_root
+
+    root = get_project_root()
+
+    weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
+    metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+
+    # Apply weight changes in SQL (no segment rescoring) and refresh city metrics
+    updated = apply_weights_to_cities(
+        weights_config_path = weights_config_path,
+        metrics_config_path = metrics_config_path,
+        city_names = list(city_names) or None
+    )
+    logging.info(f"Weights applied to {len(updated)} cities.")
+
+    logging.info("DONE")
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,14 @@ import logging
 @click.option("--tiling/--no-tiling", default=False, help="Enable tiling or not", required= False)
 @click.option("--retries", default = 50, required= False)
 @click.option("--delay", default = 2.0, required= False)
-def main(city_name, country_code, south, west, north, east, chunk_size, timeout, tolerance, tiling, retries, delay):
+@click.option("--non-interactive", "non_interactive", is_flag = True, help = "Score unknown tag values with fallback and queue them instead of prompting")
+@click.option("--noding", is_flag = True, help = "Split OSM ways at junctions into network segments")
+@click.option("--impute", is_flag = True, help = "Impute missing maxspeed, surface and lighting from nearest segments")
+@click.option("--extra-metric", "extra_metrics", multiple = True, help = "Additional registered metrics scored in the same pass (repeatable)")
+@click.option("--workers", type = int, default = 1, required = False, help = "Number of worker processes scoring chunks in parallel (implies --non-interactive)")
+@click.option("--dem", "dem_path", type = click.Path(exists = True, dir_okay = False), default = None, required = False, help = "Local DEM raster (GeoTIFF) used to compute road gradient")
+@click.option("--enrich", is_flag = True, help = "Join attributes of local datasets configured in enrichment.yaml to segments")
+def main(city_name, country_code, south, west, north, east, chunk_size, timeout, tolerance, tiling, retries, delay, non_interactive, noding, impute, extra_metrics, workers, dem_path, enrich):
     from city_metrics.services.pipeline import build_network_from_api
     from city_metrics.utils.misc import get_project_root
     from city_metrics.data.ingest.overpass_queries import roads_in_bbox, roads_in_polygon
@@ -23,12 +30,21 @@ def main(city_name, country_code, south, west, north, east, chunk_size, timeout,
     from city_metrics.data.ingest.geocoding import city_to_polygon, split_polygon_into_bboxes
     from city_metrics.services.metrics.compute import compute_city_metrics_from_postgis
     from city_metrics.data.export.postgres import delete_city_rows
-    from city_metrics.utils.config_helpers import read_config
+    from city_metrics.metrics.config.registry import config_registry
+    from city_metrics.services.analysis.uncertainty import compute_city_score_intervals
+    from city_metrics.data.normalize.enrichment import SpatialEnricher, read_enrichment_config
 
     root = get_project_root()
     
     weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
     metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+    enrichment_config_path = root / "src/city_metrics/metrics/config/enrichment.yaml"
+
+    # Local datasets are loaded and indexed once (shared by all tiles)
+    enricher = None
+    if enrich:
+        logging.info("LOAD ENRICHMENT LAYERS")
+        enricher = SpatialEnricher(read_enrichment_config(enrichment_config_path))
 
     if all(v is not None for v in [south, west, north, east]):
         # Build bbox as prescribed as input
@@ -62,13 +78,19 @@ def main(city_name, country_code, south, west, north, east, chunk_size, timeout,
     logging.info("CLEAR DATABASE")
     delete_city_rows("network_segments", city_name)
     # segment_metrics is deleted automatically (postgres)
+    delete_city_rows("metric_config_snapshots", city_name)
 
 
     if tiling:
-        for i, (south, west, north, east) in enumerate(tiles, 1):
-            logging.info("PROCESSING TILE %d / %d", i, len(tiles))
+        queries = [roads_in_bbox(south, west, north, east, timeout) for (south, west, north, east) in tiles]
+
+        # Noding and imputation need the whole network (junctions and neighbours shared by tiles):
+        # ways of all tiles are fetched first, then processed as a single network
+        if noding or impute:
+            queries = [queries]
 
-            query = roads_in_bbox(south, west, north, east, timeout)
+        for i, query in enumerate(queries, 1):
+            logging.info("PROCESSING TILE %d / %d", i, len(queries))
 
             build_network_from_api(
                 city_name = city_name,
@@ -79,7 +101,14 @@ def main(city_name, country_code, south, west, north, east, chunk_size, timeout,
                 chunk_size = chunk_size, # maximum data chunk size to process in one go
                 timeout=timeout,
                 retries = retries,
-                delay = delay
+                delay = delay,
+                interactive = not non_interactive and workers <= 1,
+                noding = noding,
+                impute = impute,
+                extra_metrics = list(extra_metrics),
+                workers = workers,
+                dem_path = dem_path,
+                enricher = enricher
             )
     else:
         # Run pipeline
@@ -92,18 +121,28 @@ def main(city_name, country_code, south, west, north, east, chunk_size, timeout,
             chunk_size = chunk_size, 
             timeout=timeout,
             retries = retries,
-            delay = delay
+            delay = delay,
+            interactive = not non_interactive and workers <= 1,
+            noding = noding,
+            impute = impute,
+            extra_metrics = list(extra_metrics),
+            workers = workers,
+            dem_path = dem_path,
+            enricher = enricher
         )
 
     # Compute overall city data and store in PostGIS database
     logging.info("COMPUTE OVERALL CITY METRICS")
     
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
     compute_city_metrics_from_postgis(city_name, metrics_config_path, weights_config)
-    
+
+    # Confidence intervals of city score (block bootstrap and missing data bounds)
+    logging.info("COMPUTE CITY SCORE INTERVALS")
+    compute_city_score_intervals(city_name, weights_config_path, metrics_config_path, workers = workers)
+
     logging.info("DONE")
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,6 +11,8 @@ def main(city_name):
     delete_city_rows("network_segments", city_name)
     delete_city_rows("refresh_areas", city_name)
     delete_city_rows("city_metrics", city_name)
+    delete_city_rows("city_metric_intervals", city_name)
+    delete_city_rows("metric_config_snapshots", city_name)
     # segment_metrics is deleted automatically (postgres)
 
     logging.info("DONE")
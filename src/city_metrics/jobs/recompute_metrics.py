@@ -3,11 +3,15 @@ import logging
 
 @click.command()
 @click.option("--city", "--city-name", "city_name", type = str, required = True)
-def main(city_name):
+@click.option("--non-interactive", "non_interactive", is_flag = True, help = "Score unknown tag values with fallback and queue them instead of prompting")
+@click.option("--flagged-only", "flagged_only", is_flag = True, help = "Only rescore segments flagged for rescoring (unknown values)")
+@click.option("--full", "full", is_flag = True, help = "Rescore all segments (default: only segments affected by config changes since last scoring)")
+def main(city_name, non_interactive, flagged_only, full):
 
     from city_metrics.services.metrics.compute import recompute_metrics_from_postgis, compute_city_metrics_from_postgis
     from city_metrics.utils.misc import get_project_root
-    from city_metrics.utils.config_helpers import read_config
+    from city_metrics.metrics.config.registry import config_registry
+    from city_metrics.services.analysis.uncertainty import compute_city_score_intervals
 
     root = get_project_root()
 
@@ -17,17 +21,23 @@ def main(city_name):
     recompute_metrics_from_postgis(
         city_name = city_name,
         weights_config_path = weights_config_path,
-        metrics_config_path =  metrics_config_path
+        metrics_config_path =  metrics_config_path,
+        interactive = not non_interactive,
+        flagged_only = flagged_only,
+        partial = not full
     )
     
     # Compute overall city data and store in PostGIS database
     logging.info("COMPUTE OVERALL CITY METRICS")
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
     compute_city_metrics_from_postgis(city_name, metrics_config_path, weights_config)
 
+    # Confidence intervals of city score (block bootstrap and missing data bounds)
+    logging.info("COMPUTE CITY SCORE INTERVALS")
+    compute_city_score_intervals(city_name, weights_config_path, metrics_config_path)
+
     logging.info("DONE")
 if __name__ == "__main__":
     main()
\ No newline at end of file
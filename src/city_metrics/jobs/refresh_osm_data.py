@@ -8,16 +8,32 @@ import logging
 @click.option("--tiling/--no-tiling", default=False, required= False)
 @click.option("--retries", default = 50, required= False)
 @click.option("--delay", default = 2.0, required= False)
-def main(city_name, chunk_size, timeout, tiling, retries, delay):
+@click.option("--non-interactive", "non_interactive", is_flag = True, help = "Score unknown tag values with fallback and queue them instead of prompting")
+@click.option("--noding", is_flag = True, help = "Split OSM ways at junctions into network segments")
+@click.option("--impute", is_flag = True, help = "Impute missing maxspeed, surface and lighting from nearest segments")
+@click.option("--extra-metric", "extra_metrics", multiple = True, help = "Additional registered metrics scored in the same pass (repeatable)")
+@click.option("--workers", type = int, default = 1, required = False, help = "Number of worker processes scoring chunks in parallel (implies --non-interactive)")
+@click.option("--dem", "dem_path", type = click.Path(exists = True, dir_okay = False), default = None, required = False, help = "Local DEM raster (GeoTIFF) used to compute road gradient")
+@click.option("--enrich", is_flag = True, help = "Join attributes of local datasets configured in enrichment.yaml to segments")
+def main(city_name, chunk_size, timeout, tiling, retries, delay, non_interactive, noding, impute, extra_metrics, workers, dem_path, enrich):
     from city_metrics.services.refresh import refresh_osm_data
     from city_metrics.utils.misc import get_project_root
     from city_metrics.services.metrics.compute import compute_city_metrics_from_postgis
-    from city_metrics.utils.config_helpers import read_config
+    from city_metrics.metrics.config.registry import config_registry
+    from city_metrics.services.analysis.uncertainty import compute_city_score_intervals
+    from city_metrics.data.normalize.enrichment import SpatialEnricher, read_enrichment_config
 
     root = get_project_root()
 
     weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
     metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+    enrichment_config_path = root / "src/city_metrics/metrics/config/enrichment.yaml"
+
+    # Local datasets are loaded and indexed once (shared by all tiles)
+    enricher = None
+    if enrich:
+        logging.info("LOAD ENRICHMENT LAYERS")
+        enricher = SpatialEnricher(read_enrichment_config(enrichment_config_path))
 
     refresh_osm_data(
         city_name = city_name,
@@ -28,17 +44,27 @@ def main(city_name, chunk_size, timeout, tiling, retries, delay):
         timeout = timeout,
         tiling = tiling,
         retries = retries,
-        delay = delay
+        delay = delay,
+        interactive = not non_interactive and workers <= 1,
+        noding = noding,
+        impute = impute,
+        extra_metrics = list(extra_metrics),
+        workers = workers,
+        dem_path = dem_path,
+        enricher = enricher
     )
 
     # Compute overall city data and store in PostGIS database
     logging.info("COMPUTE OVERALL CITY METRICS")
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
     compute_city_metrics_from_postgis(city_name, metrics_config_path, weights_config)    
 
+    # Confidence intervals of city score (block bootstrap and missing data bounds)
+    logging.info("COMPUTE CITY SCORE INTERVALS")
+    compute_city_score_intervals(city_name, weights_config_path, metrics_config_path, workers = workers)
+
     logging.info("DONE")
 if __name__ == "__main__":
     main()
\ No newline at end of file
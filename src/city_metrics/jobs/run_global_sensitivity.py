@@ -0,0 +1,33 @@
+import click
+import logging
+
+@click.command()
+@click.option("--city", "--city-name", "city_names", type = str, multiple = True, help = "City to analyse (repeatable - default: all cities)")
+@click.option("--samples", "n_samples", type = int, default = 4096, required = False, help = "Number of base samples (samples x (groups + 2) weight vectors are scored)")
+@click.option("--sampling", "method", type = click.Choice(["dirichlet", "sobol"]), default = "dirichlet", required = False, help = "Sampling of weight vectors (sobol requires scipy)")
+@click.option("--concentration", type = float, default = None, required = False, help = "Concentration of sampled weights around base weights (default: uniform on the simplex)")
+@click.option("--seed", type = int, default = 0, required = False)
+def main(city_names, n_samples, method, concentration, seed):
+
+    from city_metrics.services.analysis.sensitivity import global_weight_sensitivity_analysis
+    from city_metrics.utils.misc import get_project_root
+
+    root = get_project_root()
+
+    weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
+    metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+
+    # Sobol indices and rank-change probabilities of all cities at once
+    global_weight_sensitivity_analysis(
+        weights_config_path = weights_config_path,
+        metrics_config_path = metrics_config_path,
+        city_names = list(city_names) or None,
+        n_samples = n_samples,
+        method = method,
+        concentration = concentration,
+        seed = seed
+    )
+
+    logging.info("DONE")
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import click
+import json
+import logging
+
+@click.command()
+@click.option("--city", "--city-name", "city_name", type = str, required = True)
+@click.option("--overrides", "overrides_path", type = click.Path(exists = True, dir_okay = False), required = True,
+              help = "JSON file of overridden attributes by OSM ID, e.g. {\"way/1\": {\"maxspeed\": 30}}")
+def main(city_name, overrides_path):
+
+    from city_metrics.services.metrics.scenario import run_scenario
+    from city_metrics.utils.misc import get_project_root
+
+    root = get_project_root()
+
+    weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
+    metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+
+    with open(overrides_path) as f:
+        overrides = json.load(f)
+
+    # Rescore overridden segments only (baseline in DB is not modified)
+    result = run_scenario(
+        city_name = city_name,
+        overrides = overrides,
+        metrics_config_path = metrics_config_path,
+        weights_config_path = weights_config_path
+    )
+
+    logging.info(f"{city_name} scenario ({result.n_segments} segments overridden):")
+    logging.info(f" - score: {result.baseline_score:.4f} -> {result.scenario_score:.4f} ({result.score_delta:+.4f})")
+    logging.info(f" - uncertainty: {result.baseline_uncertainty:.4f} -> {result.scenario_uncertainty:.4f}")
+    for osm_id, (baseline, score) in result.segment_scores.items():
+        logging.info(f" - {osm_id}: {baseline:.4f} -> {score:.4f}")
+
+    logging.info("DONE")
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -10,7 +10,7 @@ def main(city_name, target_group, delta_range):
     from city_metrics.services.analysis.sensitivity import sensitivity_single_weight_sweep
     from city_metrics.utils.misc import get_project_root
     from city_metrics.data.export.postgres import delete_city_rows
-    from city_metrics.utils.config_helpers import read_config
+    from city_metrics.metrics.config.registry import config_registry
     
     root = get_project_root()
 
@@ -18,9 +18,8 @@ def main(city_name, target_group, delta_range):
     metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
 
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
 
     # Define groups to sweep - either the one provided as input or all if "all" is given
     if target_group.lower() == "all":
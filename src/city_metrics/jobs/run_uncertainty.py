@@ -0,0 +1,33 @@
+import click
+import logging
+
+@click.command()
+@click.option("--city", "--city-name", "city_name", type = str, required = True)
+@click.option("--resamples", "n_resamples", type = int, default = 2000, required = False, help = "Number of block bootstrap resamples")
+@click.option("--block-size", "block_size", type = float, default = 500.0, required = False, help = "Size of spatial blocks (meters)")
+@click.option("--confidence", type = float, default = 0.95, required = False)
+@click.option("--workers", type = int, default = 1, required = False, help = "Number of worker processes evaluating resamples")
+def main(city_name, n_resamples, block_size, confidence, workers):
+
+    from city_metrics.services.analysis.uncertainty import compute_city_score_intervals
+    from city_metrics.utils.misc import get_project_root
+
+    root = get_project_root()
+
+    weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
+    metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+
+    # Block bootstrap confidence interval and missing data bounds of city score
+    compute_city_score_intervals(
+        city_name = city_name,
+        weights_config_path = weights_config_path,
+        metrics_config_path = metrics_config_path,
+        n_resamples = n_resamples,
+        block_size = block_size,
+        confidence = confidence,
+        workers = workers
+    )
+
+    logging.info("DONE")
+if __name__ == "__main__":
+    main()
\ No newline at end of file
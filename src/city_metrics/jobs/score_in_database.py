@@ -0,0 +1,26 @@
+import click
+import logging
+
+@click.command()
+@click.option("--city", "--city-name", "city_names", type = str, multiple = True, help = "City to score (repeatable - default: all cities)")
+def main(city_names):
+
+    from city_metrics.services.metrics.compute import score_cities_in_database
+    from city_metrics.utils.misc import get_project_root
+
+    root = get_project_root()
+
+    weights_config_path = root / "src/city_metrics/metrics/config/weights.yaml"
+    metrics_config_path = root / "src/city_metrics/metrics/config/cyclability.yaml"
+
+    # Publish compiled configurations and score stored segments in PostGIS (no segment loaded in Python)
+    scored = score_cities_in_database(
+        weights_config_path = weights_config_path,
+        metrics_config_path = metrics_config_path,
+        city_names = list(city_names) or None
+    )
+    logging.info(f"{len(scored)} cities scored in database.")
+
+    logging.info("DONE")
+if __name__ == "__main__":
+    main()
\ No newline at end of file
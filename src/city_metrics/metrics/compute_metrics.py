@@ -1,11 +1,15 @@
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from city_metrics.data.normalize.cleaning import prepare_cyclability_segment
+from city_metrics.data.normalize.cleaning import prepare_cyclability_segment, prepare_cyclability_batch
 from city_metrics.utils.config_helpers import read_config, add_config_data
 from city_metrics.utils.helpers import row_get, row_has, row_items
 import logging
-from city_metrics.domain.segment import Segment
-from typing import Any
+from city_metrics.domain.segment import Segment, SegmentBatch
+from city_metrics.metrics.resolver import TagValueResolver
+from city_metrics.metrics.unknown_values import UnknownValueQueue, fallback_score
+from city_metrics.metrics.engine import compile_metrics, resolve_categorical_score, score_metrics_unique
+from typing import Any, Optional
 from pathlib import Path
 
 # Logger setup
@@ -41,11 +45,39 @@ def prepare_segment_for_metrics(gdf_row: Any,
     else:
         raise ValueError(f"Metrics not available: {metrics_name}")
 
+def prepare_segment_batch_for_metrics(gdf: gpd.GeoDataFrame,
+                                      metrics_name: str,
+                                      excellent_bike_infra: dict) -> SegmentBatch:
+    """
+    Prepare columnar batch of segments (whole GeoDataFrame chunk) for a specific metrics type.
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        GeoDataFrame of road segments (OSM data).
+    metrics_name: str
+        Name of metrics to consider (e.g., "cyclability").
+    excellent_bike_infra: dict
+        Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
+
+    Returns
+    -------
+    SegmentBatch
+        Columnar batch of segments (see city_metrics/domain/segment).
+    """
+
+    if metrics_name == "cyclability":
+        return prepare_cyclability_batch(gdf, excellent_bike_infra)
+    else:
+        raise ValueError(f"Metrics not available: {metrics_name}")
+
 def compute_metrics_score_from_segment(segment: Segment,
                                         weights_config: dict,
                                         metrics_config: dict,
                                         metrics_config_path: str,
-                                        metrics_name: str) -> tuple[float, dict]:
+                                        metrics_name: str,
+                                        resolver: Optional[TagValueResolver] = None,
+                                        unknown_queue: Optional[UnknownValueQueue] = None) -> tuple[float, dict]:
     """
     Compute metrics score for a single road segment based on YAML configurations
 
@@ -61,6 +93,12 @@ def compute_metrics_score_from_segment(segment: Segment,
         Path of YAML file defining metrics feature configurations
     metrics_name: str
         Name of metrics (e.g., cyclability) - must comply with YAML definitions
+    resolver: Optional[TagValueResolver]
+        Resolver of categorical values missing from YAML mappings. If value can not be resolved,
+        user is prompted for a score (interactive mode).
+    unknown_queue: Optional[UnknownValueQueue]
+        If given, scoring is non-interactive: values that can not be resolved are scored with
+        the fallback score and recorded in the queue.
         
     Returns
     -------
@@ -83,28 +121,23 @@ def compute_metrics_score_from_segment(segment: Segment,
     # Cycle each feature in YAML configuration file
     for feature_name, feature_config in metrics_config.items():
         # Define value of given feature for current segment
-        feature_value = getattr(segment, feature_name)
+        # (features not defined by segment dataclass are enrichment attributes - see data/normalize/enrichment)
+        if hasattr(segment, feature_name):
+            feature_value = getattr(segment, feature_name)
+        else:
+            feature_value = segment.enrichment.get(feature_name)
         is_null = pd.isna(feature_value)
         # If categorical parameter type in YAML file, select feature value directly from feature_value
         if feature_config["type"] == "categorical":
             # Make feature value lower case (consistency)
             feature_value = str(feature_value).lower()
-            feature_score = feature_config["mapping"].get(feature_value)    
-            if feature_score is None:
-                
-                logging.warning(f"The value {repr(feature_value)} for feature '{feature_name}' "
-                    f"is missing from the YAML mapping. Please add it to the 'categorical' mapping.\n"
-                    f"Segment for which mapping is missing: '{segment.osm_id}'")
-                
-                feature_score = float(input(
-                    f"Enter score for {repr(feature_value)} for feature '{feature_name}': "
-                    ))
-                
-                # Save to YAML
-                add_config_data(feature_name, feature_value, feature_score, metrics_config_path)
-                
-                # Update feature_config dict for current loop
-                feature_config["mapping"][feature_value] = feature_score       
+            feature_score = resolve_categorical_score(feature_name,
+                                                      feature_value,
+                                                      feature_config,
+                                                      metrics_config_path,
+                                                      [segment.osm_id],
+                                                      resolver,
+                                                      unknown_queue)
 
         # If continuous parameter type in YAML file, get bin for which feature_value is less 
         # or equal than threshold
@@ -124,6 +157,10 @@ def compute_metrics_score_from_segment(segment: Segment,
                 elif feature_name == "maxspeed" and is_null:
                     feature_score = feature_config["fallback"]
                     break
+                # Other continuous features with missing value (e.g., gradient without DEM)
+                elif is_null:
+                    feature_score = fallback_score(feature_config)
+                    break
                 # Assign score
                 elif float(feature_value) <= bin["max"]:
                     feature_score = bin["metrics"]
@@ -155,7 +192,9 @@ def define_segment_with_metrics_score(gdf_row: Any,
                                     metrics_config: dict,
                                     metrics_config_path: str,
                                     excellent_bike_infra: dict,
-                                    metrics_name: str) -> tuple[Segment, dict]:
+                                    metrics_name: str,
+                                    resolver: Optional[TagValueResolver] = None,
+                                    unknown_queue: Optional[UnknownValueQueue] = None) -> tuple[Segment, dict]:
     """
     Return segment augmented with selected metrics score
 
@@ -173,6 +212,10 @@ def define_segment_with_metrics_score(gdf_row: Any,
         Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
     metrics_name: str
         Name of metrics (e.g., cyclability) - must comply with YAML definitions
+    resolver: Optional[TagValueResolver]
+        Resolver of categorical values missing from YAML mappings
+    unknown_queue: Optional[UnknownValueQueue]
+        Queue of unknown values - if given, scoring is non-interactive
 
     Returns
     -------
@@ -191,7 +234,9 @@ def define_segment_with_metrics_score(gdf_row: Any,
                                                                                 weights_config, 
                                                                                 metrics_config,
                                                                                 metrics_config_path,
-                                                                                metrics_name)
+                                                                                metrics_name,
+                                                                                resolver,
+                                                                                unknown_queue)
     
     # Augment segment dataclass with metrics score (use dataclass method set_metrics)
     segment.set_metrics(metrics_name, metrics_score)
@@ -202,11 +247,16 @@ def define_augmented_geodataframe(gdf: gpd.GeoDataFrame,
                                 weights_config: dict,
                                 metrics_config: dict,
                                 metrics_config_path: str,
-                                excellent_bike_infra: dict) -> tuple[gpd.GeoDataFrame, list]:
+                                excellent_bike_infra: dict,
+                                resolver: Optional[TagValueResolver] = None,
+                                unknown_queue: Optional[UnknownValueQueue] = None) -> tuple[gpd.GeoDataFrame, list]:
     """
     Return GeoDataFrame augmented with metrics scores for all segments and list of metrics features scores.
 
-    For now only cyclability metrics is considered
+    Only cyclability metrics is considered (see define_multi_metrics_geodataframe for several metrics).
+
+    Segments are prepared row by row (parsing of OSM info), then scored all at once with the
+    columnar engine compiled from YAML configurations (see metrics/engine.py).
 
     Parameters
     ----------
@@ -220,6 +270,10 @@ def define_augmented_geodataframe(gdf: gpd.GeoDataFrame,
         Path of YAML file defining metrics feature configurations 
     excellent_bike_infra: dict
         Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
+    resolver: Optional[TagValueResolver]
+        Resolver of categorical values missing from YAML mappings (a default resolver is used if not given)
+    unknown_queue: Optional[UnknownValueQueue]
+        Queue of unknown values - if given, scoring is non-interactive (unknown values scored with fallback)
 
     Returns
     -------
@@ -229,43 +283,146 @@ def define_augmented_geodataframe(gdf: gpd.GeoDataFrame,
         List of metrics scores of all features for all segments
     """
 
+    # Single metrics pass (see define_multi_metrics_geodataframe)
+    gdf_final, metrics_features_scores = define_multi_metrics_geodataframe(gdf,
+                                                                           weights_config,
+                                                                           {"cyclability": metrics_config},
+                                                                           {"cyclability": metrics_config_path},
+                                                                           excellent_bike_infra,
+                                                                           {"cyclability": resolver} if resolver is not None else None,
+                                                                           {"cyclability": unknown_queue} if unknown_queue is not None else None)
+
+    return gdf_final, metrics_features_scores.get("cyclability", [])
+
+def define_multi_metrics_geodataframe(gdf: gpd.GeoDataFrame,
+                                      weights_config: dict,
+                                      metrics_configs: dict,
+                                      metrics_config_paths: dict,
+                                      excellent_bike_infra: dict,
+                                      resolvers: Optional[dict] = None,
+                                      unknown_queues: Optional[dict] = None,
+                                      engines: Optional[dict] = None) -> tuple[gpd.GeoDataFrame, dict]:
+    """
+    Return GeoDataFrame augmented with scores of several metrics and metrics features scores of each metrics.
+
+    Segments are prepared once as a columnar SegmentBatch (cyclability segment model - all metrics are
+    defined over the same normalized features), unique attribute tuples are found once, and all metrics are scored on
+    the unique tuples with their own compiled engine (see metrics/engine.py - score_metrics_unique).
+    Each metrics score is stored in column "<metrics_name>_metrics", and subscores of its weight groups
+    in columns "<metrics_name>_<group>_score".
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        GeoDataFrame containing road segments
+    weights_config: dict
+        Dict from YAML file containing feature weights (one section per metrics)
+    metrics_configs: dict
+        Dict from YAML file defining metrics feature configurations, by metrics name
+    metrics_config_paths: dict
+        Path of YAML file defining metrics feature configurations, by metrics name
+    excellent_bike_infra: dict
+        Dict from YAML file defining bike_infrastructure metrics features from YAML file for which score is 1.0
+    resolvers: Optional[dict]
+        Resolver of categorical values missing from YAML mappings, by metrics name (default resolvers if not given)
+    unknown_queues: Optional[dict]
+        Queue of unknown values, by metrics name - if given, scoring is non-interactive
+    engines: Optional[dict]
+        Compiled metrics by metrics name (compiled from configurations if not given)
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        GeoDataFrame with segments augmented by metrics scores
+    dict
+        List of metrics scores of all features for all segments, by metrics name
+    """
+
     total = len(gdf)
 
-    # Initiate cyclability results list
-    segments_with_components_cyclability = []
+    # Resolvers of unseen categorical values (learned mappings are kept for the whole call)
+    resolvers = dict(resolvers or {})
+    for metrics_name, metrics_config in metrics_configs.items():
+        if metrics_name not in resolvers:
+            resolvers[metrics_name] = TagValueResolver(metrics_config)
+
+    # Define columnar batch of segments once for all metrics (vectorized parsing of OSM info)
+    batch = prepare_segment_batch_for_metrics(gdf, "cyclability", excellent_bike_infra)
+
+    if total == 0:
+        return batch.to_geodataframe(), {metrics_name: [] for metrics_name in metrics_configs}
+
+    # Score all segments with columnar engines compiled from YAML configs
+    # (each unique attribute tuple is scored once per metrics, results are broadcast to segments)
+    # Only attribute columns are used - geometry is not touched by scoring
+    if not engines:
+        engines = {
+            metrics_name: compile_metrics(metrics_config, weights_config, metrics_name)
+            for metrics_name, metrics_config in metrics_configs.items()
+        }
+    results, inverse = score_metrics_unique(engines,
+                                            batch.attributes(),
+                                            metrics_config_paths,
+                                            resolvers,
+                                            unknown_queues)
+
+    metrics_features_scores = {}
+    metrics_group_scores = {}
+    for metrics_name, (metrics_scores, feature_scores) in results.items():
+        batch.set_metrics(metrics_name, metrics_scores)
+
+        # Group subscores of unique tuples (weight groups of weights configuration)
+        metrics_group_scores[metrics_name] = engines[metrics_name].group_scores(feature_scores)
+
+        # Scores of all features for all segments
+        # (one dict per unique tuple, shared by its segments - dicts must not be modified)
+        feature_names = engines[metrics_name].feature_names
+        tuple_features_scores = [dict(zip(feature_names, row)) for row in feature_scores.tolist()]
+        metrics_features_scores[metrics_name] = [tuple_features_scores[i] for i in inverse]
+
+    # Single conversion of batch into GeoDataFrame (geometry is the original GeoSeries)
+    gdf_final = batch.to_geodataframe()
+
+    # Group subscores of segments (columns "<metrics_name>_<group>_score")
+    for metrics_name, group_scores in metrics_group_scores.items():
+        for group_idx, group_name in enumerate(engines[metrics_name].group_names):
+            gdf_final[f"{metrics_name}_{group_name}_score"] = group_scores[inverse, group_idx]
+
+    logger.info(f"Scored {total} segments for {len(engines)} metrics ({int(inverse.max()) + 1} unique attribute tuples).")
+
+    return gdf_final, metrics_features_scores
+
+# Features for which missing data contributes to city uncertainty
+UNCERTAINTY_FEATURES = ("maxspeed", "surface", "lighting")
+
+# Weight groups whose subscores are stored with segment metrics (segment_metrics.<group>_score)
+SCORE_GROUPS = ("infrastructure", "physical", "traffic", "regulation")
+
+def uncertainty_feature_weights(weights_config: dict,
+                                metrics_name: str,
+                                features: tuple = UNCERTAINTY_FEATURES) -> np.ndarray:
+    """
+    Return effective weight (group weight * feature weight) of each feature.
+    """
 
-    # Cyclability - Define segments augmented with metrics scores
-    for idx, gdf_row in enumerate(gdf.itertuples(index=False), start = 1):
-        
-        # Compute segment augmented with metrics (and metric components) for this row
-        segments_with_components_cyclability.append(
-            define_segment_with_metrics_score(gdf_row, 
-                                              weights_config, 
-                                              metrics_config,
-                                              metrics_config_path,
-                                              excellent_bike_infra, 
-                                              "cyclability")
-        )
-
-        # Logging of progress every 100 rows or last row
-        if idx % 100 == 0 or idx == total:
-            logger.info(f"Processed {idx}/{total} segments.")
-
-    # Cyclability - Unpack segments and associated score features informaton
-    segments_cyclability = []
-    metrics_features_scores_cyclability = []
-    
-    for seg, feats in segments_with_components_cyclability:
-        segments_cyclability.append(seg)
-        metrics_features_scores_cyclability.append(feats)
+    feature_weights = {
+        feature_name: group_config["weight"] * rel_weight
+        for group_config in weights_config[metrics_name].values()
+        for feature_name, rel_weight in group_config["features"].items()
+    }
+
+    return np.array([feature_weights.get(feature, 0.0) for feature in features], dtype = float)
 
+def missing_features_matrix(missing_info,
+                            features: tuple = UNCERTAINTY_FEATURES) -> np.ndarray:
+    """
+    Return boolean matrix of missing features (one row per segment, one column per feature)
+    from missing_info dicts (None is considered as no missing feature).
+    """
 
+    records = [m if isinstance(m, dict) else {} for m in missing_info]
 
-    # Define final GDF (only cyclability available)
-    # Pandas automatically converts dataclasses fields to columns - no need to convert manually
-    gdf_final = gpd.GeoDataFrame(segments_cyclability, crs = gdf.crs)
-    
-    return gdf_final, metrics_features_scores_cyclability
+    return np.array([[bool(m.get(feature)) for feature in features] for m in records], dtype = bool).reshape(-1, len(features))
 
 def compute_total_city_metrics(gdf: gpd.GeoDataFrame,
                                metrics_name: str,
@@ -273,6 +430,9 @@ def compute_total_city_metrics(gdf: gpd.GeoDataFrame,
     """
     Compute the overall city score and the percentage of missing features in GeoDataFrame.
 
+    Computation is vectorized (dot products of segment lengths with scores and with
+    the boolean matrix of missing features).
+
     Parameters
     ----------
     gdf : gpd.GeoDataFrame
@@ -294,75 +454,116 @@ def compute_total_city_metrics(gdf: gpd.GeoDataFrame,
         Total metric uncertainty
     """
 
-    # Get weights from config 
-    weights_metrics = weights_config[metrics_name]
+    # Single group aggregation
+    result = compute_total_city_metrics_by_group(gdf.assign(_group = 0), metrics_name, weights_config, "_group").iloc[0]
 
-    # Initialize variables
-    total_city_score = 0.0
-    feature_uncertainty_contributions = {
-        "maxspeed": 0.0,
-        "surface": 0.0,
-        "lighting": 0.0
-    }
+    feature_uncertainty_contributions = result[list(UNCERTAINTY_FEATURES)].astype(float).rename(None)
 
-    # Define total network segments length
-    total_network_length = gdf["segment_length"].sum()
+    return float(result["total_score"]), feature_uncertainty_contributions, float(result["total_uncertainty"])
 
-    for row in gdf.itertuples(index = False):
-        
-        length = row_get(row, "segment_length")
-        score = row_get(row, "total_score")
-        missing_info = row_get(row, "missing_info")
-
-        # Skip invalid segments
-        if length is None:
-            logging.warning(
-                f"LENGTH ZERO"
-            )
-        elif score is None:
-            logging.warning(
-                f"SCORE ZERO"
-            )
-            continue
-
-        # Get partially normalized score
-        total_city_score += score * length
-
-        # Get uncertainty data by counting lengths of segments that do not have info in dedicated dict
-        for feature in feature_uncertainty_contributions:
-            if missing_info.get(feature):
-                feature_uncertainty_contributions[feature] += length
-
-    # Divide by total length of segments
-    total_city_score = total_city_score / total_network_length
-
-    feature_uncertainty_contributions = {
-        idx: val / total_network_length for  idx, val in feature_uncertainty_contributions.items() 
-    }        
+def compute_total_city_metrics_by_group(df: pd.DataFrame,
+                                        metrics_name: str,
+                                        weights_config: dict,
+                                        group_column: str = "city_name") -> pd.DataFrame:
+    """
+    Compute overall score and uncertainty of many cities (or any group of segments) in one pass.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame of network segments of all groups with segment_length, total_score, missing_info
+        and group column.
+    metrics_name: str
+        Metrics name (e.g., "cyclability")
+    weights_config: dict
+        Dict of weights configuration file.
+    group_column: str
+        Name of group column (e.g., "city_name").
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per group (index) with total_score, total_uncertainty, total_length and
+        per-feature uncertainty contributions (one column per feature).
+    """
+
+    groups, group_names = pd.factorize(df[group_column])
+    n_groups = len(group_names)
+
+    # Segments without length do not contribute, segments without score only contribute to total length
+    length = pd.to_numeric(df["segment_length"]).to_numpy(dtype = float)
+    length = np.where(np.isnan(length), 0.0, length)
+    score = pd.to_numeric(df["total_score"]).to_numpy(dtype = float)
+    if np.isnan(score).any():
+        logging.warning(f"{int(np.isnan(score).sum())} segments without score.")
+    score = np.where(np.isnan(score), 0.0, score)
+
+    # Length-weighted sums per group
+    total_length = np.bincount(groups, weights = length, minlength = n_groups)
+    score_length = np.bincount(groups, weights = score * length, minlength = n_groups)
+
+    # Missing length per group and feature
+    missing = missing_features_matrix(df["missing_info"])
+    missing_length = np.column_stack([
+        np.bincount(groups, weights = missing[:, idx] * length, minlength = n_groups)
+        for idx in range(len(UNCERTAINTY_FEATURES))
+    ])
+
+    aggregates = pd.DataFrame({"total_length": total_length, "score_length": score_length},
+                              index = pd.Index(group_names, name = group_column))
+    for idx, feature in enumerate(UNCERTAINTY_FEATURES):
+        aggregates[f"missing_length_{feature}"] = missing_length[:, idx]
+
+    return city_metrics_from_aggregates(aggregates, metrics_name, weights_config)
+
+def city_metrics_from_aggregates(aggregates: pd.DataFrame,
+                                 metrics_name: str,
+                                 weights_config: dict) -> pd.DataFrame:
+    """
+    Compute overall score and uncertainty of cities from length-weighted sums.
+
+    Sums are computed either in memory (compute_total_city_metrics_by_group) or directly in
+    PostGIS (see services/metrics/loader.py - load_city_metrics_aggregates).
+
+    Parameters
+    ----------
+    aggregates: pd.DataFrame
+        One row per city (index) with total_length (sum of segment lengths), score_length
+        (sum of score * length) and missing_length_<feature> (sum of lengths of segments missing feature).
+        Optional <group>_score_length columns (sum of group subscore * length) give group subscores of cities.
+    metrics_name: str
+        Metrics name (e.g., "cyclability")
+    weights_config: dict
+        Dict of weights configuration file.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per city (index) with total_score, total_uncertainty, total_length,
+        per-feature uncertainty contributions (one column per feature) and
+        length-weighted group subscores (<group>_score columns, if available).
+    """
+
+    total_length = aggregates["total_length"].to_numpy(dtype = float)
+    score_length = aggregates["score_length"].to_numpy(dtype = float)
+    missing_length = aggregates[[f"missing_length_{feature}" for feature in UNCERTAINTY_FEATURES]].to_numpy(dtype = float)
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        total_score = score_length / total_length
+        missing_fraction = missing_length / total_length[:, None]
 
     # Apply weight to uncertainty
-    feature_weight_total = {
-        "maxspeed": 0.0,
-        "surface": 0.0,
-        "lighting": 0.0
-    }
-    # Cycle over all features considered in feature_uncertainty_contributions
-    for feature in feature_uncertainty_contributions:
-        # Cycle over all parts of weight YAML
-        for group_config in weights_metrics.values():            
-            # Store group weight
-            group_weight = group_config["weight"]
-            # Cycle over features for i-th group
-            for feature_name, rel_weight in group_config["features"].items():
-                # Collect info only if given feature is found
-                if feature_name == feature:
-                    feature_weight_total[feature] = rel_weight * group_weight
-
-    all_scores = pd.Series(feature_uncertainty_contributions)
-    all_weights = pd.Series(feature_weight_total)
-
-    feature_uncertainty_contributions = all_scores * all_weights
-
-    total_city_score_uncertainty = feature_uncertainty_contributions.sum()
-
-    return total_city_score, feature_uncertainty_contributions, total_city_score_uncertainty
\ No newline at end of file
+    contributions = missing_fraction * uncertainty_feature_weights(weights_config, metrics_name)
+
+    result = pd.DataFrame(contributions, index = aggregates.index, columns = list(UNCERTAINTY_FEATURES))
+    result.insert(0, "total_score", total_score)
+    result.insert(1, "total_uncertainty", contributions.sum(axis = 1))
+    result.insert(2, "total_length", total_length)
+
+    # Length-weighted rollup of group subscores
+    for group_name in SCORE_GROUPS:
+        if f"{group_name}_score_length" in aggregates.columns:
+            with np.errstate(invalid = "ignore", divide = "ignore"):
+                result[f"{group_name}_score"] = aggregates[f"{group_name}_score_length"].to_numpy(dtype = float) / total_length
+
+    return result
@@ -0,0 +1,166 @@
+"""
+Diff of compiled metrics configurations (see metrics/engine.py - compile_metrics).
+
+Used by partial metrics recomputation: comparing the configuration a city was scored with to the
+current one tells which segments need rescoring, instead of rescoring the whole network at each edit:
+- categorical features: mapping values whose score changed (added, removed or modified entries)
+- continuous features: value ranges whose bin score changed
+- fallback scores of missing/unknown values
+- weights: applied to stored feature scores (or stored group subscores if only group weights changed),
+  without rescoring
+"""
+
+import numpy as np
+from dataclasses import dataclass, field
+from city_metrics.metrics.engine import CompiledFeature, CompiledMetrics
+from city_metrics.metrics.unknown_values import fallback_score
+
+@dataclass
+class FeatureDiff:
+    """
+    Changes of a single metrics feature.
+    """
+
+    name: str
+
+    # Categorical features: lowercase values whose score changed, and whether mapping keys changed
+    # (values resolved by rules - learned mappings - may resolve differently)
+    changed_values: set = field(default_factory = set)
+    keys_changed: bool = False
+
+    # Continuous features: (lower, upper] value ranges whose score changed (infinite bounds allowed)
+    changed_ranges: list = field(default_factory = list)
+
+    # Fallback score of missing/unknown values changed
+    fallback_changed: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changed_values or self.keys_changed or self.changed_ranges or self.fallback_changed)
+
+@dataclass
+class MetricsConfigDiff:
+    """
+    Changes between two compiled configurations of the same metrics.
+    """
+
+    # Changed features only
+    features: dict = field(default_factory = dict)
+
+    # Per-feature weight vector changed
+    weights_changed: bool = False
+
+    # Weight groups or feature weights within groups changed (stored group subscores can not be reused)
+    group_features_changed: bool = False
+
+    # Features added, removed, reordered or of another type (all segments must be rescored)
+    structural: bool = False
+
+    @property
+    def scores_changed(self) -> bool:
+        return self.structural or bool(self.features)
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.scores_changed and not self.weights_changed
+
+def bin_scores_at(feature: CompiledFeature,
+                  values: np.ndarray) -> np.ndarray:
+    """
+    Return bin scores of continuous feature for non-missing values (same rule as engine:
+    first bin for which value is less or equal than bin max, values above last bin get score of last bin).
+    """
+
+    bins = np.minimum(np.searchsorted(feature.breakpoints, values, side = "left"), len(feature.breakpoints) - 1)
+
+    return feature.bin_scores[bins]
+
+def changed_ranges(old: CompiledFeature,
+                   new: CompiledFeature) -> list[tuple[float, float]]:
+    """
+    Return (lower, upper] value ranges of continuous feature for which bin score changed.
+
+    Both sets of breakpoints split values into elementary ranges where each configuration has a single bin:
+    score is compared once per elementary range, and adjacent changed ranges are merged.
+    """
+
+    edges = np.union1d(old.breakpoints, new.breakpoints)
+
+    # Elementary ranges (-inf, e_0], (e_0, e_1], ..., (e_n, inf) - scores evaluated at upper bound
+    lower = np.r_[-np.inf, edges]
+    upper = np.r_[edges, np.inf]
+    changed = ~np.isclose(bin_scores_at(old, upper), bin_scores_at(new, upper))
+
+    ranges = []
+    for lo, hi, is_changed in zip(lower, upper, changed):
+        if not is_changed:
+            continue
+        if ranges and ranges[-1][1] == lo:
+            ranges[-1] = (ranges[-1][0], float(hi))
+        else:
+            ranges.append((float(lo), float(hi)))
+
+    return ranges
+
+def diff_feature(old: CompiledFeature,
+                 new: CompiledFeature) -> FeatureDiff:
+    """
+    Compare two compiled configurations of the same feature (same type).
+    """
+
+    diff = FeatureDiff(new.name)
+
+    if new.type == "categorical":
+        old_mapping = {str(key).lower(): float(score) for key, score in zip(old.index, old.scores)}
+        new_mapping = {str(key).lower(): float(score) for key, score in zip(new.index, new.scores)}
+
+        diff.changed_values = {
+            value for value in old_mapping.keys() | new_mapping.keys()
+            if old_mapping.get(value) != new_mapping.get(value)
+        }
+        diff.keys_changed = old_mapping.keys() != new_mapping.keys()
+        diff.fallback_changed = fallback_score(old.config) != fallback_score(new.config)
+
+    elif new.type == "continuous":
+        diff.changed_ranges = changed_ranges(old, new)
+        diff.fallback_changed = old.fallback != new.fallback
+
+    return diff
+
+def diff_compiled_metrics(old: CompiledMetrics,
+                          new: CompiledMetrics) -> MetricsConfigDiff:
+    """
+    Compare compiled configuration a city was scored with (old) to current configuration (new).
+
+    Parameters
+    ----------
+    old: CompiledMetrics
+        Compiled metrics of stored segment metrics (e.g., from metric_config_snapshots table).
+    new: CompiledMetrics
+        Compiled metrics of current configuration files.
+
+    Returns
+    -------
+    MetricsConfigDiff
+        Changed features, weights and structural changes.
+    """
+
+    diff = MetricsConfigDiff()
+
+    # Stored feature scores can only be reused if features are the same (name, order and type)
+    if [(f.name, f.type) for f in old.features] != [(f.name, f.type) for f in new.features]:
+        diff.structural = True
+        return diff
+
+    for old_feature, new_feature in zip(old.features, new.features):
+        feature_diff = diff_feature(old_feature, new_feature)
+        if feature_diff.changed:
+            diff.features[new_feature.name] = feature_diff
+
+    diff.weights_changed = not np.allclose(old.weights, new.weights)
+    diff.group_features_changed = (
+        old.group_names != new.group_names
+        or not np.allclose(old.group_matrix, new.group_matrix)
+    )
+
+    return diff
@@ -0,0 +1,185 @@
+"""
+Process-wide registry of metrics and weights YAML configurations.
+
+Configurations are loaded, validated and versioned once per process, and reloaded only when the file
+changes (mtime is checked first, then the content hash - touching a file does not trigger a reload).
+Compiled scoring engines (see metrics/engine.py) are cached as well.
+
+This removes redundant I/O from chunk loops (e.g., metric version of each chunk) and lets long-running
+processes (API) serve config-dependent results without re-reading files at each request.
+"""
+
+import copy
+import hashlib
+import logging
+import threading
+import yaml
+from dataclasses import dataclass
+from pathlib import Path
+from city_metrics.metrics.config.versioning import config_version
+from city_metrics.metrics.engine import CompiledMetrics, compile_metrics
+
+logger = logging.getLogger(__name__)
+
+# Default configuration files
+CONFIG_DIR = Path(__file__).parent
+METRICS_CONFIG_PATHS = {"cyclability": CONFIG_DIR / "cyclability.yaml"}
+WEIGHTS_CONFIG_PATH = CONFIG_DIR / "weights.yaml"
+
+@dataclass
+class ConfigEntry:
+    """
+    Cached configuration file.
+    """
+
+    path: Path
+    mtime: int # nanoseconds
+    digest: str
+    version: str
+    config: dict # without version field
+
+def validate_metrics_config(config: dict, path: Path) -> None:
+    """
+    Validate structure of metrics configuration (without version field).
+    """
+
+    for feature_name, feature_config in config.items():
+        feature_type = feature_config.get("type") if isinstance(feature_config, dict) else None
+
+        if feature_type == "categorical":
+            if not isinstance(feature_config.get("mapping"), dict):
+                raise ValueError(f"Categorical feature '{feature_name}' has no mapping in {path}")
+
+        elif feature_type == "continuous":
+            bins = feature_config.get("bins")
+            if not bins or any("max" not in b or "metrics" not in b for b in bins):
+                raise ValueError(f"Continuous feature '{feature_name}' has invalid bins in {path}")
+            if any(b1["max"] >= b2["max"] for b1, b2 in zip(bins, bins[1:])):
+                raise ValueError(f"Bins of continuous feature '{feature_name}' are not sorted in {path}")
+
+        else:
+            raise ValueError(f"Feature '{feature_name}' has invalid type {repr(feature_type)} in {path}")
+
+def validate_weights_config(config: dict, path: Path) -> None:
+    """
+    Validate structure of weights configuration (without version field).
+    """
+
+    for metrics_name, groups in config.items():
+        for group_name, group_config in groups.items():
+            if "weight" not in group_config or not isinstance(group_config.get("features"), dict):
+                raise ValueError(f"Group '{group_name}' of metrics '{metrics_name}' is invalid in {path}")
+
+class ConfigRegistry:
+    """
+    Registry of YAML configurations (thread-safe).
+    """
+
+    def __init__(self):
+
+        self._entries = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def _entry(self,
+               index_name: str,
+               config_path: Path) -> ConfigEntry:
+        """
+        Return cached entry of configuration file, reloading it only if the file changed.
+        """
+
+        config_path = Path(config_path).resolve()
+        if not config_path.exists():
+            raise FileNotFoundError(f"Could not find {index_name} config file at {config_path}")
+
+        mtime = config_path.stat().st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(config_path)
+            if entry is not None and entry.mtime == mtime:
+                return entry
+
+            content = config_path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+
+            # File touched but content unchanged
+            if entry is not None and entry.digest == digest:
+                entry.mtime = mtime
+                return entry
+
+            config = yaml.safe_load(content) or {}
+            version = config_version(config)
+            config.pop("version", None)
+
+            if index_name == "weights":
+                validate_weights_config(config, config_path)
+            else:
+                validate_metrics_config(config, config_path)
+
+            if entry is not None:
+                logger.info(f"Reloaded {index_name} config {config_path.name} ({version}).")
+
+            entry = ConfigEntry(config_path, mtime, digest, version, config)
+            self._entries[config_path] = entry
+
+            return entry
+
+    def get_config(self,
+                   index_name: str,
+                   config_path: Path,
+                   copy_config: bool = True) -> dict:
+        """
+        Return configuration (without version field).
+
+        A deep copy is returned by default, since callers may modify the configuration
+        (e.g., weight sweeps). Use copy_config = False for read-only access.
+        """
+
+        config = self._entry(index_name, config_path).config
+
+        return copy.deepcopy(config) if copy_config else config
+
+    def get_version(self,
+                    index_name: str,
+                    config_path: Path) -> str:
+        """
+        Return version string of configuration ("v<version>-<hash>" - see get_config_version).
+        """
+
+        return self._entry(index_name, config_path).version
+
+    def get_compiled(self,
+                     metrics_name: str,
+                     metrics_config_path: Path,
+                     weights_config_path: Path) -> CompiledMetrics:
+        """
+        Return scoring engine compiled from metrics and weights configurations (recompiled only if any changed).
+        """
+
+        metrics_entry = self._entry(metrics_name, metrics_config_path)
+        weights_entry = self._entry("weights", weights_config_path)
+
+        key = (metrics_name, metrics_entry.path, weights_entry.path)
+        digests = (metrics_entry.digest, weights_entry.digest)
+
+        with self._lock:
+            cached = self._compiled.get(key)
+            if cached is not None and cached[0] == digests:
+                return cached[1]
+
+            compiled = compile_metrics(copy.deepcopy(metrics_entry.config), weights_entry.config, metrics_name)
+            self._compiled[key] = (digests, compiled)
+
+            return compiled
+
+    def clear(self) -> None:
+        """
+        Clear all cached configurations.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._compiled.clear()
+
+# Process-wide registry
+config_registry = ConfigRegistry()
@@ -2,6 +2,22 @@ import hashlib
 import yaml
 
 
+def config_version(config: dict) -> str:
+    """
+    Generate a version string for a parsed YAML configuration (see get_config_version).
+    """
+
+    v_prefix = config.get("version", "0.0.0") # default: 0.0.0
+
+    # Determine hash of yaml from 
+    canonical_yaml = yaml.dump(config, sort_keys=True).encode("utf-8")
+    full_hash = hashlib.sha256(canonical_yaml).hexdigest()
+
+    # Final metric version as string
+    final_version = f"v{v_prefix}-{full_hash[:8]}"
+
+    return final_version
+
 def get_config_version(yaml_path: str) -> str:
     """
     Generate a version string for a YAML configuration file.
@@ -9,6 +25,9 @@ def get_config_version(yaml_path: str) -> str:
     The version combines the "version" field in the YAML (default "0.0.0") 
     with a short SHA-256 hash of the canonical YAML content.
 
+    Note: the file is read at each call - use config_registry.get_version (metrics/config/registry.py)
+    for a memoized version.
+
     Parameters
     ----------
     yaml_path: str
@@ -24,13 +43,4 @@ def get_config_version(yaml_path: str) -> str:
     with open(yaml_path, "r") as f:
         config = yaml.safe_load(f)
     
-    v_prefix = config.get("version", "0.0.0") # default: 0.0.0
-
-    # Determine hash of yaml from 
-    canonical_yaml = yaml.dump(config, sort_keys=True).encode("utf-8")
-    full_hash = hashlib.sha256(canonical_yaml).hexdigest()
-
-    # Final metric version as string
-    final_version = f"v{v_prefix}-{full_hash[:8]}"
-
-    return final_version
\ No newline at end of file
+    return config_version(config)
@@ -0,0 +1,444 @@
+"""
+Columnar scoring engine compiled from metrics (e.g., cyclability.yaml) and weights (weights.yaml) configurations.
+
+Configurations are compiled once into array structures:
+- categorical mappings: value -> code index and code -> score lookup array
+- continuous bins: np.searchsorted breakpoints and bin scores
+- weight groups: a single per-feature weight vector (group weight * feature weight), and a group matrix
+  (feature weights within each group) giving group subscores
+
+A whole chunk of segments is then scored with array operations (feature score matrix and matrix-vector product),
+reproducing the special cases of compute_metrics_score_from_segment (maxspeed of footways/cycleways,
+maxspeed of excellent bike infrastructure, fallback for missing maxspeed).
+Only values missing from mappings are resolved one by one (resolver, unknown-value queue or interactive prompt).
+"""
+
+import logging
+import math
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Optional
+from city_metrics.utils.config_helpers import add_config_data
+from city_metrics.metrics.resolver import TagValueResolver
+from city_metrics.metrics.unknown_values import UnknownValueQueue, fallback_score, DEFAULT_FALLBACK_SCORE
+
+# Highway types for which missing maxspeed gets the highest score (no traffic)
+NO_TRAFFIC_HIGHWAY_TYPES = ("footway", "cycleway")
+
+def resolve_categorical_score(feature_name: str,
+                              feature_value: str,
+                              feature_config: dict,
+                              metrics_config_path: str,
+                              osm_ids: list,
+                              resolver: Optional[TagValueResolver] = None,
+                              unknown_queue: Optional[UnknownValueQueue] = None) -> float:
+    """
+    Return score of (lowercase) categorical value: YAML mapping first, then rule-based resolution,
+    then fallback and unknown-value queue (non-interactive mode), else interactive prompt.
+    In interactive mode, the value given by the user is saved to the YAML mapping.
+
+    The value is resolved once for all segments having it (osm_ids).
+    """
+
+    feature_score = feature_config["mapping"].get(feature_value)
+
+    # Try rule-based resolution of unseen value first
+    if feature_score is None and resolver is not None:
+        feature_score = resolver.resolve(feature_name, feature_value, len(osm_ids))
+
+    # Non-interactive mode: use fallback and defer unknown value to queue (all segments are flagged)
+    if feature_score is None and unknown_queue is not None:
+        feature_score = fallback_score(feature_config)
+        for osm_id in osm_ids:
+            unknown_queue.record(feature_name, feature_value, osm_id)
+
+    if feature_score is None:
+
+        logging.warning(f"The value {repr(feature_value)} for feature '{feature_name}' "
+            f"is missing from the YAML mapping. Please add it to the 'categorical' mapping.\n"
+            f"Segment for which mapping is missing: '{osm_ids[0]}'")
+
+        feature_score = float(input(
+            f"Enter score for {repr(feature_value)} for feature '{feature_name}': "
+            ))
+
+        # Save to YAML
+        add_config_data(feature_name, feature_value, feature_score, metrics_config_path)
+
+        # Update feature_config dict for current run
+        feature_config["mapping"][feature_value] = feature_score
+
+    return feature_score
+
+def factorize_values(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Factorize values into codes and distinct values (missing values get code -1).
+    """
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype = object))
+
+    return codes, np.asarray(uniques, dtype = object)
+
+def unique_rows(columns: pd.DataFrame,
+                attributes: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find unique tuples of attribute values among rows of columns (missing attributes are ignored).
+
+    Returns
+    -------
+    np.ndarray
+        Tuple of each row.
+    np.ndarray
+        Representative row (first row) of each tuple.
+    """
+
+    # Factorize each attribute column, then rows into unique tuples of codes
+    attributes = [name for name in dict.fromkeys(attributes) if name in columns.columns]
+    factorized = [factorize_values(columns[name]) for name in attributes]
+
+    if math.prod(len(uniques) + 1 for _, uniques in factorized) < 2**62:
+        # Combine codes into a single integer key per row (mixed radix - missing values code -1 shifted to 0)
+        key = np.zeros(len(columns), dtype = np.int64)
+        for codes, uniques in factorized:
+            key = key * (len(uniques) + 1) + (codes + 1)
+        inverse, _ = pd.factorize(key)
+    else:
+        # Very high tag diversity: sort rows of codes
+        _, inverse = np.unique(np.column_stack([codes for codes, _ in factorized]), axis = 0, return_inverse = True)
+        inverse = inverse.ravel()
+    first = np.unique(inverse, return_index = True)[1]
+
+    return inverse, first
+
+@dataclass
+class CompiledFeature:
+    """
+    Compiled configuration of a single metrics feature.
+    """
+
+    name: str
+    type: str
+    config: dict
+
+    # Categorical features: mapping keys and scores (code -> score)
+    index: Optional[pd.Index] = None
+    scores: Optional[np.ndarray] = None
+
+    # Continuous features: bin upper bounds (breakpoints) and bin scores
+    breakpoints: Optional[np.ndarray] = None
+    bin_scores: Optional[np.ndarray] = None
+    fallback: float = DEFAULT_FALLBACK_SCORE
+
+@dataclass
+class CompiledMetrics:
+    """
+    Metrics configuration compiled into array structures for columnar scoring.
+    """
+
+    metrics_name: str
+    features: list[CompiledFeature] = field(default_factory = list)
+    weights: Optional[np.ndarray] = None
+
+    # Weight groups: group weights and feature weights within each group (one row per group)
+    # (weights = group_weights @ group_matrix)
+    group_names: list[str] = field(default_factory = list)
+    group_weights: Optional[np.ndarray] = None
+    group_matrix: Optional[np.ndarray] = None
+
+    @property
+    def feature_names(self) -> list[str]:
+        return [feature.name for feature in self.features]
+
+    def group_scores(self,
+                     feature_scores: np.ndarray) -> np.ndarray:
+        """
+        Return group subscores (one column per weight group) from feature score matrix.
+        """
+
+        return feature_scores @ self.group_matrix.T
+
+    def weights_by_group(self) -> tuple[dict, dict]:
+        """
+        Return weight of each group and weights of features within each group (by group name).
+        """
+
+        group_weights = dict(zip(self.group_names, self.group_weights.tolist()))
+        group_feature_weights = {
+            group_name: {
+                feature_name: weight
+                for feature_name, weight in zip(self.feature_names, row.tolist()) if weight != 0
+            }
+            for group_name, row in zip(self.group_names, self.group_matrix)
+        }
+
+        return group_weights, group_feature_weights
+
+    def score(self,
+              columns: pd.DataFrame,
+              metrics_config_path: str,
+              resolver: Optional[TagValueResolver] = None,
+              unknown_queue: Optional[UnknownValueQueue] = None,
+              osm_ids: Optional[np.ndarray] = None,
+              inverse: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score all rows of a chunk (segments, or unique attribute tuples - see score_unique).
+
+        Parameters
+        ----------
+        columns: pd.DataFrame
+            Segment data with one column per feature, plus "osm_id" and "highway" columns
+            (e.g., attributes of SegmentBatch - see domain/segment.py).
+        metrics_config_path: str
+            Path of YAML file defining metrics feature configurations (interactive mode)
+        resolver: Optional[TagValueResolver]
+            Resolver of categorical values missing from YAML mappings.
+        unknown_queue: Optional[UnknownValueQueue]
+            Queue of unknown values - if given, scoring is non-interactive.
+        osm_ids: Optional[np.ndarray]
+            OSM IDs of segments, if rows are unique attribute tuples (default: "osm_id" column).
+        inverse: Optional[np.ndarray]
+            Row of each segment, if rows are unique attribute tuples.
+
+        Returns
+        -------
+        np.ndarray
+            Metrics score of each row.
+        np.ndarray
+            Feature score matrix (one row per row of columns, one column per feature).
+        """
+
+        # Segments of each row (only needed for values missing from mappings)
+        if osm_ids is None:
+            osm_ids = columns["osm_id"].to_numpy(dtype = object)
+            inverse = np.arange(len(columns))
+
+        n = len(columns)
+        feature_scores = np.empty((n, len(self.features)), dtype = float)
+
+        for idx, feature in enumerate(self.features):
+            # Features without column (e.g., gradient without DEM) are missing for all rows
+            if feature.name in columns.columns:
+                values = columns[feature.name].to_numpy(dtype = object)
+            else:
+                values = np.full(n, None, dtype = object)
+
+            if feature.type == "categorical":
+                feature_scores[:, idx] = self._score_categorical(feature, values, osm_ids, inverse,
+                                                                 metrics_config_path, resolver, unknown_queue)
+
+            elif feature.type == "continuous":
+                # Excellent bike infrastructure is known only if scored before (same as feature order in YAML)
+                bike_infra_scores = (
+                    feature_scores[:, self.feature_names.index("bike_infrastructure")]
+                    if "bike_infrastructure" in self.feature_names[:idx] else None
+                )
+                feature_scores[:, idx] = self._score_continuous(feature, values, columns, bike_infra_scores)
+
+        return feature_scores @ self.weights, feature_scores
+
+    def score_unique(self,
+                     columns: pd.DataFrame,
+                     metrics_config_path: str,
+                     resolver: Optional[TagValueResolver] = None,
+                     unknown_queue: Optional[UnknownValueQueue] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score segments of a chunk once per unique attribute tuple (features and highway type).
+
+        Most segments of a city share a small number of attribute tuples: scoring cost grows
+        with tag diversity instead of segment count.
+
+        Returns
+        -------
+        np.ndarray
+            Metrics score of each segment.
+        np.ndarray
+            Feature score matrix of unique tuples (one row per tuple, one column per feature).
+        np.ndarray
+            Tuple (row of feature score matrix) of each segment.
+        """
+
+        inverse, first = unique_rows(columns, self.feature_names + ["highway"])
+
+        # Score unique tuples only (representative row: first segment of each tuple)
+        unique_columns = columns.iloc[first]
+        tuple_scores, feature_scores = self.score(unique_columns,
+                                                  metrics_config_path,
+                                                  resolver,
+                                                  unknown_queue,
+                                                  osm_ids = columns["osm_id"].to_numpy(dtype = object),
+                                                  inverse = inverse)
+
+        return tuple_scores[inverse], feature_scores, inverse
+
+    def _score_categorical(self,
+                           feature: CompiledFeature,
+                           values: np.ndarray,
+                           osm_ids: np.ndarray,
+                           inverse: np.ndarray,
+                           metrics_config_path: str,
+                           resolver: Optional[TagValueResolver],
+                           unknown_queue: Optional[UnknownValueQueue]) -> np.ndarray:
+        """
+        Score categorical feature with code -> score lookup (values missing from mapping are resolved one by one).
+        """
+
+        # Lookup of distinct values only (lowercase for consistency - same as str(value).lower())
+        codes, uniques = factorize_values(values)
+        lowered = np.array([str(val).lower() for val in uniques], dtype = object)
+        lookup = feature.index.get_indexer(lowered)
+        unique_scores = np.append(np.where(lookup >= 0, feature.scores[lookup] if len(feature.scores) else np.nan, np.nan), np.nan)
+        scores = unique_scores[codes]
+
+        # Values missing from compiled mapping or missing values (rare) - resolved once per value
+        unknown = np.flatnonzero(np.isnan(scores))
+        if len(unknown):
+            unknown_values = np.array([str(values[row]).lower() for row in unknown], dtype = object)
+            for value in dict.fromkeys(unknown_values):
+                rows = unknown[unknown_values == value]
+                scores[rows] = resolve_categorical_score(feature.name, value, feature.config, metrics_config_path,
+                                                         osm_ids[np.isin(inverse, rows)].tolist(), resolver, unknown_queue)
+
+        return scores
+
+    def _score_continuous(self,
+                          feature: CompiledFeature,
+                          values: np.ndarray,
+                          columns: pd.DataFrame,
+                          bike_infra_scores: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Score continuous feature with bins (values above last bin get score of last bin).
+        """
+
+        # Convert distinct values only
+        codes, uniques = factorize_values(values)
+        values = np.append(pd.to_numeric(pd.Series(uniques, dtype = object)).to_numpy(dtype = float), np.nan)[codes]
+        is_null = np.isnan(values)
+
+        # First bin for which value is less or equal than bin max
+        bins = np.minimum(np.searchsorted(feature.breakpoints, values, side = "left"), len(feature.breakpoints) - 1)
+        scores = feature.bin_scores[bins]
+
+        # Missing values
+        scores[is_null] = feature.fallback
+        if feature.name == "maxspeed":
+            # High maxspeed score for footway and cycleway type when no info is given (typical)
+            highway_codes, highway_uniques = factorize_values(columns["highway"])
+            no_traffic = np.append(np.isin(highway_uniques, NO_TRAFFIC_HIGHWAY_TYPES), False)[highway_codes]
+            # Assign high maxspeed score when no info is available BUT bike_infrastructure is of highest quality
+            if bike_infra_scores is not None:
+                no_traffic |= bike_infra_scores == 1.0
+            scores[is_null & no_traffic] = 1.0
+
+        return scores
+
+def compile_metrics(metrics_config: dict,
+                    weights_config: dict,
+                    metrics_name: str) -> CompiledMetrics:
+    """
+    Compile metrics and weights configurations into a CompiledMetrics engine.
+
+    Parameters
+    ----------
+    metrics_config: dict
+        Dict from YAML file defining metrics feature configurations (without version)
+    weights_config: dict
+        Dict from YAML file containing feature weights (without version)
+    metrics_name: str
+        Name of metrics (e.g., cyclability) - must comply with YAML definitions
+
+    Returns
+    -------
+    CompiledMetrics
+        Compiled scoring engine.
+    """
+
+    compiled = CompiledMetrics(metrics_name)
+
+    for feature_name, feature_config in metrics_config.items():
+        feature = CompiledFeature(feature_name, feature_config["type"], feature_config)
+
+        if feature.type == "categorical":
+            mapping = feature_config["mapping"]
+            feature.index = pd.Index(list(mapping.keys()), dtype = object)
+            feature.scores = np.array(list(mapping.values()), dtype = float)
+
+        elif feature.type == "continuous":
+            bins = feature_config["bins"]
+            feature.breakpoints = np.array([b["max"] for b in bins], dtype = float)
+            feature.bin_scores = np.array([b["metrics"] for b in bins], dtype = float)
+            feature.fallback = float(feature_config.get("fallback", DEFAULT_FALLBACK_SCORE))
+
+        else:
+            raise ValueError(f"Feature type not available: {feature.type}")
+
+        compiled.features.append(feature)
+
+    # Feature weights within each group
+    groups = weights_config[metrics_name]
+    compiled.group_names = list(groups.keys())
+    compiled.group_weights = np.array([group_config["weight"] for group_config in groups.values()], dtype = float)
+    compiled.group_matrix = np.zeros((len(groups), len(compiled.features)), dtype = float)
+    for group_idx, group_config in enumerate(groups.values()):
+        for feature_name, feature_weight in group_config["features"].items():
+            if feature_name not in compiled.feature_names:
+                raise KeyError(f"Feature '{feature_name}' of weights configuration is missing from metrics configuration")
+            compiled.group_matrix[group_idx, compiled.feature_names.index(feature_name)] += feature_weight
+
+    # Collapse weight groups into a single per-feature weight vector
+    compiled.weights = compiled.group_weights @ compiled.group_matrix
+
+    return compiled
+
+def score_metrics_unique(engines: dict[str, CompiledMetrics],
+                         columns: pd.DataFrame,
+                         metrics_config_paths: dict,
+                         resolvers: Optional[dict] = None,
+                         unknown_queues: Optional[dict] = None) -> tuple[dict, np.ndarray]:
+    """
+    Score segments of a chunk with several compiled metrics in a single pass.
+
+    Unique attribute tuples are found once over the features of all metrics, then each metrics
+    scores the unique tuples only: additional metrics cost one small matrix per metrics.
+
+    Parameters
+    ----------
+    engines: dict[str, CompiledMetrics]
+        Compiled metrics by metrics name.
+    columns: pd.DataFrame
+        Segment data with one column per feature of all metrics, plus "osm_id" and "highway" columns.
+    metrics_config_paths: dict
+        Path of YAML file defining metrics feature configurations, by metrics name.
+    resolvers: Optional[dict]
+        Resolver of categorical values missing from YAML mappings, by metrics name.
+    unknown_queues: Optional[dict]
+        Queue of unknown values, by metrics name (non-interactive scoring).
+
+    Returns
+    -------
+    dict
+        (metrics score of each segment, feature score matrix of unique tuples), by metrics name.
+    np.ndarray
+        Tuple (row of feature score matrices) of each segment.
+    """
+
+    resolvers = resolvers or {}
+    unknown_queues = unknown_queues or {}
+
+    attributes = [name for engine in engines.values() for name in engine.feature_names] + ["highway"]
+    inverse, first = unique_rows(columns, attributes)
+
+    unique_columns = columns.iloc[first]
+    osm_ids = columns["osm_id"].to_numpy(dtype = object)
+
+    results = {}
+    for metrics_name, engine in engines.items():
+        tuple_scores, feature_scores = engine.score(unique_columns,
+                                                    metrics_config_paths[metrics_name],
+                                                    resolvers.get(metrics_name),
+                                                    unknown_queues.get(metrics_name),
+                                                    osm_ids = osm_ids,
+                                                    inverse = inverse)
+        results[metrics_name] = (tuple_scores[inverse], feature_scores)
+
+    return results, inverse
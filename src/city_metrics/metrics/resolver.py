@@ -0,0 +1,245 @@
+"""
+Rule-based resolution of categorical OSM tag values missing from YAML mappings.
+
+Raw OSM values often are variants of known values (e.g., "asphalt;concrete", "paving_stones:20",
+"Yes;No"). Unseen values are normalized with the following rules:
+1) lowercase and strip whitespace/quotes, use "_" as word separator
+2) look up value in mapping and in alias table of the feature
+3) split value on ";", ":", "|" and strip suffixes (numbers, units, plurals) from each token
+4) take the most conservative (lowest score) known token
+
+Resolved values are cached in a learned-mappings table, so that repeated values are resolved with a dict hit.
+The table is stored in the learned_mappings database table and used to seed resolvers of later runs.
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import Optional
+from city_metrics.utils.config_helpers import read_config
+
+logger = logging.getLogger(__name__)
+
+# Default alias tables
+DEFAULT_ALIASES_PATH = Path(__file__).parent / "config" / "aliases.yaml"
+
+# Separators of multiple values in a single OSM tag
+TOKEN_SEPARATORS = re.compile(r"[;:|]")
+
+# Suffixes stripped from tokens (e.g., "paving_stones_20", "asphalt_lanes")
+TOKEN_SUFFIXES = re.compile(r"(_?\d+(\.\d+)?(cm|mm|m)?|_lanes?|_only)$")
+
+# Single plural suffix stripped from tokens (e.g., "tracks", but not "grass")
+PLURAL_SUFFIX = re.compile(r"(?<=[^s])s$")
+
+def load_aliases(aliases_path: Optional[Path] = None) -> dict:
+    """
+    Load alias tables from YAML file (default: metrics/config/aliases.yaml).
+    """
+
+    aliases = read_config("aliases", "yaml", aliases_path or DEFAULT_ALIASES_PATH) or {}
+
+    # Normalize keys and values to lowercase strings (YAML may parse some of them as booleans/numbers)
+    return {
+        feature_name: {str(k).lower(): str(v).lower() for k, v in (table or {}).items()}
+        for feature_name, table in aliases.items()
+    }
+
+def normalize_tag_value(value: str) -> str:
+    """
+    Normalize raw tag value: lowercase, strip whitespace and quotes, use "_" as word separator.
+    """
+
+    value = str(value).lower().strip().strip("'\"[]")
+    value = re.sub(r"\s*([;:|])\s*", r"\1", value)
+
+    return re.sub(r"\s+", "_", value)
+
+class TagValueResolver:
+    """
+    Resolve categorical tag values missing from metrics YAML mappings.
+
+    Parameters
+    ----------
+    metrics_config: dict
+        Dict from YAML file defining metrics feature configurations (mappings are read at each
+        resolution, so values added to the mappings are taken into account).
+    aliases: dict
+        Alias tables by feature name ({feature_name: {alias: canonical_value}}).
+    learned_records: list[dict]
+        Learned mappings of previous runs (learned_mappings table records) used to seed the resolver.
+    """
+
+    def __init__(self,
+                 metrics_config: dict,
+                 aliases: Optional[dict] = None,
+                 learned_records: Optional[list[dict]] = None):
+
+        self.metrics_config = metrics_config
+        self.aliases = load_aliases() if aliases is None else aliases
+
+        # Learned mappings: (feature_name, raw_value) -> (resolved_value, score) or None if unresolved
+        self.learned = {}
+
+        # Occurrences of unseen values per run
+        self.occurrences = {}
+
+        if learned_records:
+            self.seed(learned_records)
+
+    def seed(self, records: list[dict]) -> None:
+        """
+        Seed learned mappings with records of previous runs (learned_mappings table).
+
+        Scores are looked up again in current mappings (resolved values removed from mappings are dropped,
+        so that raw values are resolved again by rules).
+        """
+
+        for record in records:
+            feature_name = record["feature_name"]
+            if "mapping" not in self.metrics_config.get(feature_name, {}):
+                continue
+
+            resolved = self._lookup(feature_name, record["resolved_value"])
+            if resolved is not None:
+                self.learned.setdefault((feature_name, record["raw_value"]), resolved)
+
+    def resolve(self,
+                feature_name: str,
+                value: str,
+                count: int = 1) -> Optional[float]:
+        """
+        Return score of unseen value for given feature, or None if value can not be resolved.
+        count is the number of occurrences of the value (e.g., segments sharing it).
+        """
+
+        key = (feature_name, value)
+        self.occurrences[key] = self.occurrences.get(key, 0) + count
+
+        # Dict hit for repeated values
+        if key in self.learned:
+            resolved = self.learned[key]
+            return resolved[1] if resolved is not None else None
+
+        resolved = self._apply_rules(feature_name, value)
+        self.learned[key] = resolved
+
+        if resolved is not None:
+            logger.info(f"Resolved value {repr(value)} for feature '{feature_name}' "
+                        f"as {repr(resolved[0])} (score: {resolved[1]})")
+            return resolved[1]
+
+        return None
+
+    def _lookup(self,
+                feature_name: str,
+                value: str) -> Optional[tuple[str, float]]:
+        """
+        Look up value in feature mapping, directly or through alias table.
+        """
+
+        mapping = self.metrics_config[feature_name]["mapping"]
+        aliases = self.aliases.get(feature_name, {})
+
+        for candidate in (value, aliases.get(value)):
+            if candidate is not None and candidate in mapping:
+                return candidate, float(mapping[candidate])
+
+        return None
+
+    def _apply_rules(self,
+                     feature_name: str,
+                     value: str) -> Optional[tuple[str, float]]:
+        """
+        Apply normalization rules to value and return (resolved_value, score) or None.
+        """
+
+        value = normalize_tag_value(value)
+
+        # Whole value (normalized)
+        resolved = self._lookup(feature_name, value)
+        if resolved is not None:
+            return resolved
+
+        # Single tokens - keep the most conservative known token
+        known = []
+        for token in TOKEN_SEPARATORS.split(value):
+            token = token.strip("_-")
+            if not token:
+                continue
+
+            stripped = TOKEN_SUFFIXES.sub("", token)
+            for candidate in dict.fromkeys((token, stripped, PLURAL_SUFFIX.sub("", stripped))):
+                resolved = self._lookup(feature_name, candidate) if candidate else None
+                if resolved is not None:
+                    known.append(resolved)
+                    break
+
+        if not known:
+            return None
+
+        return min(known, key = lambda item: item[1])
+
+    def merge(self, other: "TagValueResolver") -> None:
+        """
+        Merge learned mappings and occurrences of another resolver (e.g., chunk scored in worker process).
+        """
+
+        for key, resolved in other.learned.items():
+            self.learned.setdefault(key, resolved)
+
+        for key, count in other.occurrences.items():
+            self.occurrences[key] = self.occurrences.get(key, 0) + count
+
+    def learned_records(self, metrics_name: str) -> list[dict]:
+        """
+        Return learned mappings (resolved values only) as records for database storage.
+        Only values seen in current run are returned (seeded mappings are already stored).
+        """
+
+        return [
+            {
+                "metric_name": metrics_name,
+                "feature_name": feature_name,
+                "raw_value": raw_value,
+                "resolved_value": resolved[0],
+                "score": resolved[1],
+                "occurrences": self.occurrences.get((feature_name, raw_value), 0)
+            }
+            for (feature_name, raw_value), resolved in self.learned.items()
+            if resolved is not None and (feature_name, raw_value) in self.occurrences
+        ]
+
+    def resolution_rate(self) -> Optional[float]:
+        """
+        Return fraction of unseen value occurrences resolved by rules (None if no unseen value).
+        """
+
+        total = sum(self.occurrences.values())
+        if total == 0:
+            return None
+
+        resolved = sum(
+            count for key, count in self.occurrences.items()
+            if self.learned.get(key) is not None
+        )
+
+        return resolved / total
+
+    def log_summary(self) -> None:
+        """
+        Log resolution statistics of current run.
+        """
+
+        rate = self.resolution_rate()
+        if rate is None:
+            logger.info("All categorical values found in YAML mappings.")
+            return
+
+        unresolved = sorted({key for key, val in self.learned.items() if val is None})
+        logger.info(f"Unseen categorical values resolved by rules: {rate:.1%} of "
+                    f"{sum(self.occurrences.values())} occurrences "
+                    f"({len(self.learned) - len(unresolved)}/{len(self.learned)} distinct values).")
+
+        if unresolved:
+            logger.info(f"Unresolved values: {unresolved}")
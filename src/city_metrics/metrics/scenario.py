@@ -0,0 +1,238 @@
+"""
+What-if scenarios: city score of a stored network if attributes of a set of segments are overridden
+(e.g., protected track or lower speed limit on a list of streets).
+
+A city snapshot holds the scored attributes, length, stored score and missing-feature flags of each segment,
+together with the length-weighted sums of the city (same sums as running aggregates - city_metric_aggregates).
+A scenario only rescores its k overridden segments with the compiled scoring rules (see metrics/engine.py)
+and shifts the sums by the difference of their contributions: city score and uncertainty are updated in O(k),
+and the baseline stored in the database is never rewritten.
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from city_metrics.metrics.engine import CompiledMetrics
+from city_metrics.metrics.unknown_values import UnknownValueQueue
+from city_metrics.metrics.compute_metrics import UNCERTAINTY_FEATURES
+
+@dataclass
+class CityScenarioSnapshot:
+    """
+    Scored segments of a city and length-weighted sums of baseline city metrics.
+    """
+
+    city_name: str
+    metric_version: str
+    engine: CompiledMetrics
+
+    # Scored attributes (one column per feature, plus "osm_id" and "highway"), indexed by OSM ID
+    columns: pd.DataFrame
+
+    # Length, stored score and missing flags (one column per uncertainty feature) of each segment
+    lengths: np.ndarray
+    scores: np.ndarray
+    missing: np.ndarray
+
+    # Effective weight of each uncertainty feature (group weight * feature weight)
+    uncertainty_weights: np.ndarray
+
+    # OSM IDs of sub-segments of each way split at junctions, by parent OSM ID
+    sub_segments: dict = field(default_factory = dict)
+
+    # Sums of baseline city metrics
+    total_length: float = field(init = False)
+    score_length: float = field(init = False)
+    missing_length: np.ndarray = field(init = False)
+
+    def __post_init__(self):
+
+        self.total_length = float(self.lengths.sum())
+        self.score_length = float(self.lengths @ self.scores)
+        self.missing_length = self.lengths @ self.missing
+
+    @classmethod
+    def from_segments(cls,
+                      city_name: str,
+                      metric_version: str,
+                      engine: CompiledMetrics,
+                      segments: pd.DataFrame,
+                      uncertainty_weights: np.ndarray) -> "CityScenarioSnapshot":
+        """
+        Build snapshot from segments of a city.
+
+        Parameters
+        ----------
+        city_name: str
+            Name of given city (e.g., "oslo").
+        metric_version: str
+            Version of stored segment metrics.
+        engine: CompiledMetrics
+            Compiled scoring rules used to rescore overridden segments.
+        segments: pd.DataFrame
+            One row per segment with "osm_id", "highway", one column per feature of engine,
+            "segment_length", "total_score", missing_<feature> flags of uncertainty features
+            and optionally "parent_osm_id" (see services/metrics/loader.py - load_segments_for_scenarios).
+        uncertainty_weights: np.ndarray
+            Effective weight of each uncertainty feature (see uncertainty_feature_weights).
+
+        Returns
+        -------
+        CityScenarioSnapshot
+            City snapshot.
+        """
+
+        # Object columns: overrides of any type can be assigned (converted by engine when scored)
+        # Features without stored values (e.g., gradient without DEM) are missing
+        columns = segments.reindex(columns = ["osm_id", "highway"] + engine.feature_names).astype(object)
+        columns.index = pd.Index(segments["osm_id"].to_numpy(dtype = object))
+
+        # Ways split at junctions can be overridden as a whole by their OSM ID (e.g., way/1 -> way/1-1, way/1-2)
+        sub_segments = {}
+        if "parent_osm_id" in segments.columns:
+            split = segments["parent_osm_id"].notna() & (segments["parent_osm_id"] != segments["osm_id"])
+            sub_segments = segments.loc[split].groupby("parent_osm_id", sort = False)["osm_id"].agg(list).to_dict()
+
+        return cls(
+            city_name = city_name,
+            metric_version = metric_version,
+            engine = engine,
+            columns = columns,
+            lengths = segments["segment_length"].to_numpy(dtype = float),
+            scores = segments["total_score"].to_numpy(dtype = float),
+            missing = segments[[f"missing_{feature}" for feature in UNCERTAINTY_FEATURES]].to_numpy(dtype = float),
+            uncertainty_weights = np.asarray(uncertainty_weights, dtype = float),
+            sub_segments = sub_segments
+        )
+
+    def city_score(self,
+                   score_length: float) -> float:
+        """
+        Return length-weighted city score from sum of score * length.
+        """
+
+        return score_length / self.total_length if self.total_length else float("nan")
+
+    def city_uncertainty(self,
+                         missing_length: np.ndarray) -> float:
+        """
+        Return city uncertainty from sums of lengths of segments missing each uncertainty feature
+        (same as city_metrics_from_aggregates).
+        """
+
+        if not self.total_length:
+            return float("nan")
+
+        return float((missing_length / self.total_length) @ self.uncertainty_weights)
+
+    @property
+    def baseline_score(self) -> float:
+        return self.city_score(self.score_length)
+
+    @property
+    def baseline_uncertainty(self) -> float:
+        return self.city_uncertainty(self.missing_length)
+
+@dataclass
+class ScenarioResult:
+    """
+    City metrics of a scenario compared to baseline.
+    """
+
+    city_name: str
+    metric_version: str
+    n_segments: int
+    baseline_score: float
+    scenario_score: float
+    baseline_uncertainty: float
+    scenario_uncertainty: float
+
+    # OSM ID -> (baseline score, scenario score) of overridden segments
+    segment_scores: dict = field(default_factory = dict)
+
+    # Overridden values missing from YAML mappings (scored with fallback) - "<feature>: <value>"
+    unresolved: list = field(default_factory = list)
+
+    @property
+    def score_delta(self) -> float:
+        return self.scenario_score - self.baseline_score
+
+def evaluate_scenario(snapshot: CityScenarioSnapshot,
+                      overrides: dict[str, dict]) -> ScenarioResult:
+    """
+    Evaluate city metrics of a scenario (overridden attributes of a set of segments).
+
+    Overridden segments are rescored non-interactively (values missing from mappings get the fallback
+    score and are reported), and an overridden feature is considered observed (missing if overridden
+    with None). Cost grows with the number of overridden segments only.
+
+    Parameters
+    ----------
+    snapshot: CityScenarioSnapshot
+        City snapshot (left unchanged).
+    overrides: dict[str, dict]
+        Overridden attributes by OSM ID (feature name -> value, e.g. {"way/1": {"bike_infrastructure": "track"}}).
+        Features of the metrics and "highway" can be overridden. OSM IDs of ways split at junctions apply
+        to all their sub-segments (overrides of a sub-segment given explicitly take precedence).
+
+    Returns
+    -------
+    ScenarioResult
+        Baseline and scenario city metrics.
+    """
+
+    # Expand ways split at junctions to their sub-segments (sub-segment overrides applied last)
+    expanded = {}
+    for osm_id, segment_overrides in overrides.items():
+        for sub_segment_id in snapshot.sub_segments.get(osm_id, []):
+            expanded.setdefault(sub_segment_id, {}).update(segment_overrides)
+    for osm_id, segment_overrides in overrides.items():
+        if osm_id not in snapshot.sub_segments:
+            expanded.setdefault(osm_id, {}).update(segment_overrides)
+    overrides = expanded
+
+    osm_ids = list(overrides.keys())
+    rows = snapshot.columns.index.get_indexer(osm_ids)
+    if (rows < 0).any():
+        unknown_ids = [osm_id for osm_id, row in zip(osm_ids, rows) if row < 0]
+        raise ValueError(f"Segments not available for {snapshot.city_name}: {', '.join(map(str, unknown_ids[:5]))}")
+
+    attributes = set(snapshot.engine.feature_names) | {"highway"}
+    unknown_attributes = {name for segment_overrides in overrides.values() for name in segment_overrides} - attributes
+    if unknown_attributes:
+        raise ValueError(f"Attributes can not be overridden: {', '.join(sorted(unknown_attributes))}")
+
+    # Overridden attributes of the k segments (copy - snapshot is shared between scenarios)
+    columns = snapshot.columns.iloc[rows].copy()
+    missing = snapshot.missing[rows].copy()
+    for row, segment_overrides in enumerate(overrides.values()):
+        for name, value in segment_overrides.items():
+            columns.iat[row, columns.columns.get_loc(name)] = value
+            if name in UNCERTAINTY_FEATURES:
+                missing[row, UNCERTAINTY_FEATURES.index(name)] = float(value is None)
+
+    # Rescore overridden segments (rounded as stored - NUMERIC(5,4))
+    unknown_queue = UnknownValueQueue()
+    scores, _ = snapshot.engine.score(columns, None, unknown_queue = unknown_queue)
+    scores = np.clip(np.round(scores, 4), 0, 1)
+
+    # Shift sums by the change of contribution of overridden segments
+    lengths = snapshot.lengths[rows]
+    baseline_scores = snapshot.scores[rows]
+    score_length = snapshot.score_length + float(lengths @ (scores - baseline_scores))
+    missing_length = snapshot.missing_length + lengths @ (missing - snapshot.missing[rows])
+
+    return ScenarioResult(
+        city_name = snapshot.city_name,
+        metric_version = snapshot.metric_version,
+        n_segments = len(osm_ids),
+        baseline_score = snapshot.baseline_score,
+        scenario_score = snapshot.city_score(score_length),
+        baseline_uncertainty = snapshot.baseline_uncertainty,
+        scenario_uncertainty = snapshot.city_uncertainty(missing_length),
+        segment_scores = {
+            osm_id: (float(baseline), float(score))
+            for osm_id, baseline, score in zip(osm_ids, baseline_scores, scores)
+        },
+        unresolved = [f"{feature_name}: {feature_value}" for feature_name, feature_value in unknown_queue.entries]
+    )
@@ -0,0 +1,116 @@
+"""
+Deferred queue of categorical values missing from YAML mappings (non-interactive scoring).
+
+In non-interactive mode, values that can not be resolved (see metrics/resolver.py) are scored with
+the documented fallback score and recorded in a queue, together with occurrences and sample OSM IDs.
+Affected segments are flagged, so that they can be rescored once mappings are curated in one batch edit.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Documented fallback score for missing/unknown data (mu_f - see metrics documentation)
+DEFAULT_FALLBACK_SCORE = 0.5
+
+def fallback_score(feature_config: dict) -> float:
+    """
+    Return fallback score of a categorical feature: "fallback" field if defined, else
+    "unknown" mapping score, else default fallback score.
+    """
+
+    if "fallback" in feature_config:
+        return float(feature_config["fallback"])
+
+    return float(feature_config.get("mapping", {}).get("unknown", DEFAULT_FALLBACK_SCORE))
+
+class UnknownValueQueue:
+    """
+    Queue of unknown categorical values recorded during non-interactive scoring.
+
+    Parameters
+    ----------
+    max_samples: int
+        Maximum number of sample OSM IDs stored per unknown value.
+    """
+
+    def __init__(self, max_samples: int = 5):
+
+        self.max_samples = max_samples
+
+        # (feature_name, feature_value) -> {"occurrences": int, "sample_osm_ids": list}
+        self.entries = {}
+
+        # osm_id -> set of features scored with fallback (segments flagged for rescoring)
+        self.flagged = {}
+
+    def record(self,
+               feature_name: str,
+               feature_value: str,
+               osm_id: str) -> None:
+        """
+        Record occurrence of unknown value and flag associated segment.
+        """
+
+        entry = self.entries.setdefault((feature_name, feature_value), {"occurrences": 0, "sample_osm_ids": []})
+        entry["occurrences"] += 1
+        if len(entry["sample_osm_ids"]) < self.max_samples and osm_id not in entry["sample_osm_ids"]:
+            entry["sample_osm_ids"].append(osm_id)
+
+        self.flagged.setdefault(osm_id, set()).add(feature_name)
+
+    def merge(self, other: "UnknownValueQueue") -> None:
+        """
+        Merge queue of another run (e.g., chunk scored in worker process) into this queue.
+        """
+
+        for key, other_entry in other.entries.items():
+            entry = self.entries.setdefault(key, {"occurrences": 0, "sample_osm_ids": []})
+            entry["occurrences"] += other_entry["occurrences"]
+            for osm_id in other_entry["sample_osm_ids"]:
+                if len(entry["sample_osm_ids"]) < self.max_samples and osm_id not in entry["sample_osm_ids"]:
+                    entry["sample_osm_ids"].append(osm_id)
+
+        for osm_id, features in other.flagged.items():
+            self.flagged.setdefault(osm_id, set()).update(features)
+
+    def segment_metadata(self, osm_id: str) -> dict:
+        """
+        Return metadata of segment stored with its metrics (segment_metrics.metadata).
+        """
+
+        features = self.flagged.get(osm_id)
+        if not features:
+            return {}
+
+        return {"needs_rescoring": True, "unresolved_features": sorted(features)}
+
+    def records(self, metrics_name: str) -> list[dict]:
+        """
+        Return queue entries as records for database storage.
+        """
+
+        return [
+            {
+                "metric_name": metrics_name,
+                "feature_name": feature_name,
+                "feature_value": feature_value,
+                "occurrences": entry["occurrences"],
+                "sample_osm_ids": list(entry["sample_osm_ids"])
+            }
+            for (feature_name, feature_value), entry in self.entries.items()
+        ]
+
+    def log_summary(self) -> None:
+        """
+        Log unknown values recorded in current run.
+        """
+
+        if not self.entries:
+            return
+
+        logger.warning(f"{len(self.entries)} unknown categorical values scored with fallback "
+                       f"({len(self.flagged)} segments flagged for rescoring):")
+        for (feature_name, feature_value), entry in sorted(self.entries.items(), key = lambda item: -item[1]["occurrences"]):
+            logger.warning(f" - {feature_name}: {repr(feature_value)} "
+                           f"({entry['occurrences']} occurrences, e.g. {', '.join(map(str, entry['sample_osm_ids']))})")
@@ -1,11 +1,15 @@
 from pathlib import Path
 import logging 
-from city_metrics.services.metrics.loader import load_segments_for_metrics_recompute
-from city_metrics.utils.config_helpers import read_config
+import numpy as np
+import pandas as pd
+from typing import Optional
+from city_metrics.services.metrics.loader import load_segments_for_metrics_recompute, load_city_metrics_aggregates
+from city_metrics.metrics.config.registry import config_registry
+from city_metrics.metrics.compute_metrics import SCORE_GROUPS
 from city_metrics.data.export.postgres import dataframe_to_postgres
 from city_metrics.data.export.postgres import prepare_group_sweep_city_metrics_df_for_postgis
-from city_metrics.data.export.postgres import delete_city_rows
-from city_metrics.analysis.sensitivity import sweep_group_weight
+from city_metrics.data.export.postgres import delete_city_rows, global_sensitivity_to_postgres
+from city_metrics.analysis.sensitivity import sweep_group_weight, global_weight_sensitivity, GLOBAL_SAMPLES
 
 def sensitivity_single_weight_sweep(city_name: str,
                                     target_group: str, 
@@ -39,12 +43,10 @@ def sensitivity_single_weight_sweep(city_name: str,
     eps = 0.05
 
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
 
-    metrics_config = read_config("cyclability", "yaml", metrics_config_path)
-    metrics_config.pop("version")
+    metrics_config = config_registry.get_config("cyclability", metrics_config_path)
 
     # Clear-up database
     logging.info("DELETE WEIGHT SWEEP DATABASE (IF PRESENT)")
@@ -92,4 +94,94 @@ def sensitivity_single_weight_sweep(city_name: str,
         dataframe_to_postgres(df_prepared, 
                               'group_sensitivity', 
                               'df', 
-                              'append')
\ No newline at end of file
+                              'append')
+
+def global_weight_sensitivity_analysis(weights_config_path: Path,
+                                       metrics_config_path: Path,
+                                       city_names: Optional[list[str]] = None,
+                                       n_samples: int = GLOBAL_SAMPLES,
+                                       method: str = "dirichlet",
+                                       concentration: Optional[float] = None,
+                                       seed: int = 0,
+                                       upload: bool = True) -> pd.DataFrame:
+    """
+    Perform global sensitivity analysis of cyclability scores of all cities to group weights
+    (Sobol indices and rank-change probabilities - see analysis/sensitivity.py).
+    This analysis is diagnostic only - it shows which weights drive city scores and how robust the
+    ranking of cities is to weight assumptions.
+    Optionally uploads the results to the database (global_sensitivity table, replacing previous results).
+
+    Length-weighted group subscores are aggregated in PostGIS (no segment is loaded nor rescored).
+
+    Parameters
+    ----------
+    weights_config_path : Path
+        Path to the weights configuration file used.
+    metrics_config_path : Path
+        Path to the metrics configuration file.
+    city_names: Optional[list[str]]
+        Names of cities to analyse (all cities with segment metrics if None).
+    n_samples: int
+        Number of base samples (n_samples * (n_groups + 2) weight vectors are evaluated).
+    method: str
+        Sampling method of weight vectors: "dirichlet" or "sobol".
+    concentration: Optional[float]
+        Concentration of sampled weights around base weights (uniform on the simplex if None).
+    seed: int
+        Seed of random generator.
+    upload : bool, optional
+        If True, upload results to PostGIS.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per city and group (see global_weight_sensitivity).
+    """
+
+    # Get config info
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
+    metric_version = config_registry.get_version("cyclability", metrics_config_path)
+
+    # Group subscores are stored for SCORE_GROUPS only
+    group_names = list(weights_config["cyclability"].keys())
+    unknown_groups = [group_name for group_name in group_names if group_name not in SCORE_GROUPS]
+    if unknown_groups:
+        raise ValueError(f"Group subscores are not stored for groups: {', '.join(unknown_groups)}")
+
+    base_weights = np.array([weights_config["cyclability"][k]["weight"] for k in group_names], dtype = float)
+
+    # Length-weighted group means of all cities (sums aggregated in PostGIS)
+    logging.info("AGGREGATE CITY METRICS")
+    aggregates = load_city_metrics_aggregates(city_names)
+    aggregates = aggregates[aggregates["total_length"] > 0]
+
+    result = pd.DataFrame()
+    if not aggregates.empty:
+        group_means = pd.DataFrame({
+            group_name: aggregates[f"{group_name}_score_length"] / aggregates["total_length"]
+            for group_name in group_names
+        })
+
+        logging.info(f"COMPUTE GLOBAL SENSITIVITY OF {len(group_means)} CITIES ({method.upper()} SAMPLING)")
+        result = global_weight_sensitivity(group_means,
+                                           base_weights,
+                                           n_samples = n_samples,
+                                           method = method,
+                                           concentration = concentration,
+                                           seed = seed)
+
+        result.insert(1, "metric_name", "cyclability")
+        result.insert(2, "metric_version", metric_version)
+        result.insert(3, "sampling", method)
+        result.insert(4, "n_samples", n_samples)
+        result.insert(5, "concentration", concentration)
+
+    else:
+        logging.info("No city metrics to analyse.")
+
+    if upload == True:
+        logging.info("SAVE GLOBAL SENSITIVITY TO DATABASE")
+        global_sensitivity_to_postgres(result, "cyclability")
+
+    return result
\ No newline at end of file
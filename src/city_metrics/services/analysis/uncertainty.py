@@ -0,0 +1,93 @@
+from pathlib import Path
+import logging
+from typing import Optional
+from city_metrics.services.metrics.loader import load_segments_for_intervals
+from city_metrics.metrics.config.registry import config_registry
+from city_metrics.metrics.compute_metrics import UNCERTAINTY_FEATURES
+from city_metrics.data.export.postgres import city_metric_intervals_to_postgres, delete_city_rows
+from city_metrics.analysis.uncertainty import CityScoreIntervals, city_score_intervals
+from city_metrics.analysis.uncertainty import BOOTSTRAP_RESAMPLES, BLOCK_SIZE, CONFIDENCE
+
+def compute_city_score_intervals(city_name: str,
+                                 weights_config_path: Path,
+                                 metrics_config_path: Path,
+                                 n_resamples: int = BOOTSTRAP_RESAMPLES,
+                                 block_size: float = BLOCK_SIZE,
+                                 confidence: float = CONFIDENCE,
+                                 workers: int = 1,
+                                 upload: bool = True) -> Optional[CityScoreIntervals]:
+    """
+    Compute confidence intervals of the cyclability score of given city stored in PostGIS
+    (spatial block bootstrap and best/worst-case bounds from missing features - see analysis/uncertainty.py).
+    Optionally uploads the results to the database (city_metric_intervals table).
+
+    Parameters
+    ----------
+    city_name: str
+        Name of given city (e.g., "oslo").
+    weights_config_path : Path
+        Path to the weights configuration file.
+    metrics_config_path : Path
+        Path to the cyclability configuration file.
+    n_resamples: int
+        Number of bootstrap resamples.
+    block_size: float
+        Size of spatial blocks (meters).
+    confidence: float
+        Confidence level of interval (e.g., 0.95).
+    workers: int
+        Number of worker processes evaluating resamples.
+    upload : bool, optional
+        If True, upload intervals to PostGIS.
+
+    Returns
+    -------
+    Optional[CityScoreIntervals]
+        Intervals of city score (None if city has no scored segment).
+    """
+
+    # Only segment lengths, scores and centroids are retrieved (no geometries)
+    logging.info("LOAD SEGMENTS")
+    segments = load_segments_for_intervals(city_name)
+
+    engine = config_registry.get_compiled("cyclability", metrics_config_path, weights_config_path)
+    intervals = None
+    if not segments.empty:
+        logging.info("COMPUTE CITY SCORE INTERVALS")
+        intervals = city_score_intervals(segments,
+                                         engine,
+                                         UNCERTAINTY_FEATURES,
+                                         n_resamples = n_resamples,
+                                         block_size = block_size,
+                                         confidence = confidence,
+                                         workers = workers)
+
+    # No scored segment left: remove stale intervals
+    if intervals is None:
+        logging.info(f"No segment metrics to compute intervals for {city_name}.")
+        if upload == True:
+            delete_city_rows("city_metric_intervals", city_name)
+        return None
+
+    logging.info(f"{city_name} score {intervals.total_score:.4f}: {confidence:.0%} CI "
+                 f"[{intervals.ci_lower:.4f}, {intervals.ci_upper:.4f}] ({intervals.n_blocks} blocks), "
+                 f"missing data bounds [{intervals.worst_case:.4f}, {intervals.best_case:.4f}]")
+
+    if upload == True:
+        logging.info(f"SAVE {city_name} CITY SCORE INTERVALS TO DATABASE")
+        city_metric_intervals_to_postgres({
+            "city_name": city_name,
+            "metric_name": "cyclability",
+            "metric_version": max(segments["metric_version"]),
+            "confidence": intervals.confidence,
+            "ci_lower": intervals.ci_lower,
+            "ci_upper": intervals.ci_upper,
+            "bootstrap_std": intervals.bootstrap_std,
+            "n_resamples": intervals.n_resamples,
+            "block_size": intervals.block_size,
+            "n_blocks": intervals.n_blocks,
+            "worst_case": intervals.worst_case,
+            "best_case": intervals.best_case
+        })
+
+    return intervals
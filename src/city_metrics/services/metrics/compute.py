@@ -1,21 +1,47 @@
 
 from pathlib import Path
 import logging 
-from city_metrics.services.metrics.loader import load_segments_for_metrics_recompute, load_data_for_city_metrics_compute
-from city_metrics.metrics.compute_metrics import define_augmented_geodataframe, compute_total_city_metrics
+from city_metrics.services.metrics.loader import load_segments_for_metrics_recompute, load_city_metrics_aggregates
+from city_metrics.services.metrics.loader import load_incremental_city_metrics_aggregates
+from city_metrics.services.metrics.loader import load_metric_config_snapshot, load_segments_for_partial_recompute
+from city_metrics.services.metrics.loader import load_metric_config_snapshots, load_scored_city_names
+from city_metrics.services.metrics.loader import load_learned_mappings
+from city_metrics.metrics.compute_metrics import define_augmented_geodataframe, city_metrics_from_aggregates, UNCERTAINTY_FEATURES
+from city_metrics.metrics.compute_metrics import SCORE_GROUPS
 from city_metrics.data.export.postgres import prepare_metrics_df_for_postgis, prepare_total_city_metrics_df_for_postgis
 from city_metrics.data.export.postgres import delete_city_rows
+from city_metrics.data.export.postgres import delete_segment_metrics_for_osm_ids
+from city_metrics.data.export.postgres import unknown_values_to_postgres, learned_mappings_to_postgres
 from city_metrics.data.export.postgres import dataframe_to_postgres
-from city_metrics.utils.config_helpers import read_config
+from city_metrics.data.export.postgres import city_metrics_to_postgres
+from city_metrics.data.export.postgres import metric_config_snapshot_to_postgres, reweight_segment_metrics
+from city_metrics.data.export.postgres import metric_config_to_postgres, score_segment_metrics_in_postgres
+from city_metrics.metrics.config.registry import config_registry
+from city_metrics.metrics.resolver import TagValueResolver
+from city_metrics.metrics.unknown_values import UnknownValueQueue
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.config.diff import diff_compiled_metrics
+from typing import Optional
 
 def recompute_metrics_from_postgis(city_name: str,
                                     weights_config_path: Path,
                                     metrics_config_path: Path,
-                                    upload: bool = True) -> None:
+                                    upload: bool = True,
+                                    interactive: bool = True,
+                                    flagged_only: bool = False,
+                                    partial: bool = True) -> None:
     """
     Recompute cyclability metrics for existing network segments stored in PostGIS.
     Optionally uploads the updated segments and metrics back to the database.
 
+    With flagged_only, only segments flagged for rescoring (scored with fallback for unknown values
+    in non-interactive mode) are rescored - to be used once YAML mappings have been curated.
+
+    With partial (default), configurations the city was scored with (metric_config_snapshots) are compared
+    to current configurations: only segments affected by changed mapping entries, bins or fallbacks are rescored,
+    and weight changes are applied to stored feature scores in SQL (see partial_recompute_metrics_from_postgis).
+    Falls back to full recompute if no usable snapshot is available.
+
     Parameters
     ----------
     city_name: str
@@ -26,15 +52,19 @@ def recompute_metrics_from_postgis(city_name: str,
         Path to the cyclability configuration file.
     upload : bool, optional
         If True, upload processed network segments and metrics to PostGIS.
+    interactive: bool
+        If False, categorical values missing from YAML mappings are scored with fallback and queued.
+    flagged_only: bool
+        If True, only rescore segments flagged for rescoring.
+    partial: bool
+        If True, only rescore segments affected by config changes since last scoring (upload only).
     """
 
     # Get config info
-    #(remove version info from resulting dict)
-    weights_config = read_config("weights", "yaml", weights_config_path)
-    weights_config.pop("version")
+    #(cached by config registry - version info removed)
+    weights_config = config_registry.get_config("weights", weights_config_path)
 
-    metrics_config = read_config("cyclability", "yaml", metrics_config_path)
-    metrics_config.pop("version")
+    metrics_config = config_registry.get_config("cyclability", metrics_config_path)
 
     # Init bike_infra values for which score is 1.0 (track, etc.)
     # Dict used in prepare_cyclability_segment for maxspeed missing info definition
@@ -43,9 +73,31 @@ def recompute_metrics_from_postgis(city_name: str,
     excellent_bike_infra = {k for k, v in bike_infra_mapping.items() if v == 1.0}
 
 
+    # Resolver of categorical values missing from YAML mappings (seeded with learned mappings of previous runs)
+    resolver = TagValueResolver(metrics_config, learned_records = load_learned_mappings("cyclability"))
+
+    # Queue of unknown values (non-interactive mode only)
+    unknown_queue = None if interactive else UnknownValueQueue()
+
+    # Partial recompute: only segments affected by config changes since last scoring
+    if partial and upload and not flagged_only:
+        logging.info("DIFF CONFIGS")
+        if partial_recompute_metrics_from_postgis(city_name,
+                                                  weights_config_path,
+                                                  metrics_config_path,
+                                                  excellent_bike_infra,
+                                                  resolver,
+                                                  unknown_queue):
+            save_metric_config_snapshot(city_name, weights_config_path, metrics_config_path)
+            return
+
     # Retrieve segments from PostGIS
     logging.info("LOAD SEGMENTS")
-    gdf = load_segments_for_metrics_recompute(city_name)
+    gdf = load_segments_for_metrics_recompute(city_name, flagged_only)
+
+    if gdf.empty:
+        logging.info(f"No segments to recompute for {city_name}.")
+        return
 
     # Compute metrics and augment dataframe
     logging.info("COMPUTE METRICS")
@@ -53,13 +105,21 @@ def recompute_metrics_from_postgis(city_name: str,
                                                                     weights_config, 
                                                                     metrics_config,
                                                                     metrics_config_path,
-                                                                    excellent_bike_infra)
+                                                                    excellent_bike_infra,
+                                                                    resolver,
+                                                                    unknown_queue)
+    resolver.log_summary()
+    if unknown_queue is not None:
+        unknown_queue.log_summary()
         
     if upload == True:
 
-        # Clear-up metrics database
+        # Clear-up metrics database (only rescored segments if flagged_only)
         logging.info(f"CLEAR DATABASE FOR {city_name} METRICS")
-        delete_city_rows("segment_metrics", city_name)
+        if flagged_only:
+            delete_segment_metrics_for_osm_ids(city_name, gdf_proc["osm_id"].tolist(), "cyclability")
+        else:
+            delete_city_rows("segment_metrics", city_name)
 
         logging.info(f"SAVE {city_name} METRICS TO DATABASE")
         # Prepare metrics GDF for PostGIS upload (takes care of ID match with network_segments)
@@ -67,7 +127,8 @@ def recompute_metrics_from_postgis(city_name: str,
                                                              gdf_proc, 
                                                              metrics_features_scores, 
                                                              'cyclability', 
-                                                             metrics_config_path)
+                                                             metrics_config_path,
+                                                             unknown_queue)
 
         # Upload metrics GDF to PostGIS
         dataframe_to_postgres(df_metrics_prepared, 
@@ -75,6 +136,145 @@ def recompute_metrics_from_postgis(city_name: str,
                               'df', 
                               'append')
 
+        # Values resolved by rules in this run (reused by later runs and partial recompute)
+        learned_mappings_to_postgres(resolver.learned_records("cyclability"))
+        if unknown_queue is not None:
+            unknown_values_to_postgres(unknown_queue.records("cyclability"))
+
+        # Configurations used to score the city (only part of the city rescored if flagged_only)
+        save_metric_config_snapshot(city_name, weights_config_path, metrics_config_path, replace = not flagged_only)
+
+def save_metric_config_snapshot(city_name: str,
+                                weights_config_path: Path,
+                                metrics_config_path: Path,
+                                metrics_name: str = "cyclability",
+                                replace: bool = True) -> None:
+    """
+    Save current configurations as configurations used to score segment metrics of a city
+    (see metric_config_snapshot_to_postgres).
+    """
+
+    # Read after scoring (mappings may have been added in interactive mode)
+    metric_config_snapshot_to_postgres(city_name,
+                                       metrics_name,
+                                       config_registry.get_version(metrics_name, metrics_config_path),
+                                       config_registry.get_version("weights", weights_config_path),
+                                       config_registry.get_config(metrics_name, metrics_config_path, copy_config = False),
+                                       config_registry.get_config("weights", weights_config_path, copy_config = False),
+                                       replace)
+
+def partial_recompute_metrics_from_postgis(city_name: str,
+                                           weights_config_path: Path,
+                                           metrics_config_path: Path,
+                                           excellent_bike_infra: set,
+                                           resolver: Optional[TagValueResolver] = None,
+                                           unknown_queue: Optional[UnknownValueQueue] = None) -> bool:
+    """
+    Recompute cyclability metrics of a city only where configuration changes affect them.
+
+    Configurations the city was scored with (metric_config_snapshots) and current configurations are compiled
+    and compared (see metrics/config/diff.py):
+    - segments whose values have a changed score (mapping entries, bin ranges, fallbacks) are selected with an
+      indexed SQL predicate, rescored and replaced
+    - other segments keep their stored feature scores: total scores are recomputed in SQL with current weights
+      and their metric version is updated (no segment transfer)
+
+    Parameters
+    ----------
+    city_name: str
+        Name of given city (e.g., "oslo").
+    weights_config_path : Path
+        Path to the weights configuration file used.
+    metrics_config_path : Path
+        Path to the cyclability configuration file.
+    excellent_bike_infra: set
+        bike_infrastructure values for which score is 1.0
+    resolver: Optional[TagValueResolver]
+        Resolver of categorical values missing from YAML mappings.
+    unknown_queue: Optional[UnknownValueQueue]
+        Queue of unknown values - if given, scoring is non-interactive.
+
+    Returns
+    -------
+    bool
+        False if partial recompute is not possible (no usable snapshot, feature structure changed, or
+        changed feature not selectable in SQL) - full recompute is needed.
+    """
+
+    snapshot = load_metric_config_snapshot(city_name, "cyclability")
+    if snapshot is None:
+        logging.info(f"No usable config snapshot for {city_name} (missing or mixed metric versions): full recompute.")
+        return False
+
+    old_engine = compile_metrics(snapshot["metrics_config"], snapshot["weights_config"], "cyclability")
+    new_engine = config_registry.get_compiled("cyclability", metrics_config_path, weights_config_path)
+
+    diff = diff_compiled_metrics(old_engine, new_engine)
+    if diff.structural:
+        logging.info("Metrics features changed: full recompute.")
+        return False
+
+    logging.info(f"Changed features: {sorted(diff.features) or 'none'} - weights changed: {diff.weights_changed}")
+
+    # Segments affected by changed scores
+    gdf = None
+    if diff.scores_changed:
+        logging.info("LOAD AFFECTED SEGMENTS")
+        gdf = load_segments_for_partial_recompute(city_name, "cyclability", snapshot["metric_version"], diff)
+        if gdf is None:
+            logging.info("Changed features can not be selected in SQL: full recompute.")
+            return False
+
+    if gdf is not None and not gdf.empty:
+        logging.info("COMPUTE METRICS")
+        gdf_proc, metrics_features_scores = define_augmented_geodataframe(gdf,
+                                                                          config_registry.get_config("weights", weights_config_path),
+                                                                          config_registry.get_config("cyclability", metrics_config_path),
+                                                                          metrics_config_path,
+                                                                          excellent_bike_infra,
+                                                                          resolver,
+                                                                          unknown_queue)
+        resolver.log_summary()
+        if unknown_queue is not None:
+            unknown_queue.log_summary()
+
+        # Replace metrics of affected segments
+        logging.info(f"CLEAR AFFECTED {city_name} METRICS")
+        delete_segment_metrics_for_osm_ids(city_name, gdf_proc["osm_id"].tolist(), "cyclability")
+
+    # Other segments: reweight stored feature scores and update version in SQL
+    # (version read after scoring - mappings may have been added in interactive mode)
+    # (stored group subscores are reused if feature weights within groups are unchanged)
+    logging.info(f"REWEIGHT {city_name} METRICS")
+    group_weights, group_feature_weights = new_engine.weights_by_group()
+    reweight_segment_metrics([city_name],
+                             "cyclability",
+                             snapshot["metric_version"],
+                             config_registry.get_version("cyclability", metrics_config_path),
+                             group_weights,
+                             group_feature_weights,
+                             reuse_group_scores = not diff.group_features_changed)
+
+    if gdf is not None and not gdf.empty:
+        logging.info(f"SAVE {city_name} METRICS TO DATABASE")
+        df_metrics_prepared = prepare_metrics_df_for_postgis(city_name,
+                                                             gdf_proc,
+                                                             metrics_features_scores,
+                                                             'cyclability',
+                                                             metrics_config_path,
+                                                             unknown_queue)
+        dataframe_to_postgres(df_metrics_prepared,
+                              'segment_metrics',
+                              'df',
+                              'append')
+
+        if resolver is not None:
+            learned_mappings_to_postgres(resolver.learned_records("cyclability"))
+        if unknown_queue is not None:
+            unknown_values_to_postgres(unknown_queue.records("cyclability"))
+
+    return True
+
 def compute_city_metrics_from_postgis(city_name: str,
                                         metrics_config_path: Path,
                                         weights_config: dict,
@@ -95,19 +295,36 @@ def compute_city_metrics_from_postgis(city_name: str,
         If True, upload processed network segments and metrics to PostGIS.
     """
 
-    # Clear-up database
-    logging.info("DELETE CITY METRICS (IF PRESENT)")
-    delete_city_rows("city_metrics", city_name)
+    # Running aggregates maintained at each chunk upload (single row lookup)
+    logging.info("LOAD CITY AGGREGATES")
+    metric_version = config_registry.get_version("cyclability", metrics_config_path)
+    aggregates = load_incremental_city_metrics_aggregates(city_name, "cyclability", metric_version)
+
+    # Mixed metric versions (or aggregates not available): aggregate segment metrics in PostGIS
+    # (only sums are retrieved - no geometries)
+    if aggregates.empty:
+        logging.info("AGGREGATE CITY DATA")
+        aggregates = load_city_metrics_aggregates([city_name])
 
-    # Load info from PostGIS
-    logging.info("LOAD CITY DATA")
-    gdf = load_data_for_city_metrics_compute(city_name)
+    # No scored segment left: remove stale city metrics
+    if aggregates.empty:
+        logging.info(f"No segment metrics to aggregate for {city_name}.")
+        if upload == True:
+            delete_city_rows("city_metrics", city_name)
+        return
 
-    # Compute overall city metrics and assocaited features uncertainty
+    # Compute overall city metrics and associated features uncertainty
     logging.info("COMPUTE CITY METRICS")
-    total_city_score, feature_uncertainty_contributions, total_city_score_uncertainty = compute_total_city_metrics(gdf, 
-                                                                                   "cyclability", 
-                                                                                   weights_config)
+    result = city_metrics_from_aggregates(aggregates, "cyclability", weights_config).loc[city_name]
+    total_city_score = float(result["total_score"])
+    total_city_score_uncertainty = float(result["total_uncertainty"])
+    feature_uncertainty_contributions = result[list(UNCERTAINTY_FEATURES)].astype(float).to_dict()
+
+    # Length-weighted rollup of group subscores (segments scored before subscores were stored count as 0)
+    group_scores = {
+        group_name: float(result[f"{group_name}_score"])
+        for group_name in SCORE_GROUPS if f"{group_name}_score" in result.index
+    }
 
     if upload == True:
 
@@ -118,10 +335,140 @@ def compute_city_metrics_from_postgis(city_name: str,
                                                                 metrics_config_path,
                                                                 total_city_score,
                                                                 feature_uncertainty_contributions,
-                                                                total_city_score_uncertainty)
+                                                                total_city_score_uncertainty,
+                                                                group_scores)
         
-        # Upload metrics GDF to PostGIS
-        dataframe_to_postgres(df_prepared, 
-                              'city_metrics', 
-                              'df', 
-                              'append')
\ No newline at end of file
+        # Upsert city metrics (row updated in place - no delete)
+        city_metrics_to_postgres(df_prepared)
+
+def apply_weights_to_cities(weights_config_path: Path,
+                            metrics_config_path: Path,
+                            city_names: Optional[list[str]] = None) -> list[str]:
+    """
+    Apply weight changes (weights.yaml) to stored cyclability metrics of cities without rescoring segments.
+
+    For each city, the configurations it was scored with (metric_config_snapshots) are compared to current ones.
+    Cities whose feature scores are unchanged (weight-only changes) are updated with one set-based UPDATE of
+    segment_metrics (group subscores reused if feature weights within groups are unchanged - see
+    reweight_segment_metrics). Running city aggregates are updated by triggers in the same statement, and
+    city metrics are then refreshed from aggregates (single row lookup per city).
+
+    Cities with changed feature scores (or without usable snapshot) are skipped - use recompute_metrics.
+
+    Parameters
+    ----------
+    weights_config_path : Path
+        Path to the weights configuration file.
+    metrics_config_path : Path
+        Path to the cyclability configuration file.
+    city_names: Optional[list[str]]
+        Names of cities to update (all cities with a snapshot if None).
+
+    Returns
+    -------
+    list[str]
+        Names of updated cities.
+    """
+
+    logging.info("LOAD CONFIG SNAPSHOTS")
+    snapshots = load_metric_config_snapshots("cyclability", city_names)
+    for city_name in sorted(set(city_names or []) - set(snapshots)):
+        logging.warning(f"No usable config snapshot for {city_name}: run recompute_metrics.")
+
+    new_engine = config_registry.get_compiled("cyclability", metrics_config_path, weights_config_path)
+    metric_version = config_registry.get_version("cyclability", metrics_config_path)
+    group_weights, group_feature_weights = new_engine.weights_by_group()
+
+    # Cities sharing the same stored version and kind of weight change are updated in one statement
+    batches = {}
+    compiled = {}
+    for city_name, snapshot in snapshots.items():
+        key = (snapshot["metric_version"], snapshot["weights_version"])
+        if key not in compiled:
+            old_engine = compile_metrics(snapshot["metrics_config"], snapshot["weights_config"], "cyclability")
+            compiled[key] = diff_compiled_metrics(old_engine, new_engine)
+        diff = compiled[key]
+
+        if diff.scores_changed:
+            logging.warning(f"Feature scores of {city_name} changed since last scoring: run recompute_metrics.")
+            continue
+        if diff.unchanged and snapshot["metric_version"] == metric_version:
+            logging.info(f"Weights of {city_name} already up to date.")
+            continue
+
+        batches.setdefault((snapshot["metric_version"], diff.group_features_changed), []).append(city_name)
+
+    updated = []
+    for (old_metric_version, group_features_changed), batch_cities in batches.items():
+        logging.info(f"REWEIGHT {len(batch_cities)} CITIES")
+        reweight_segment_metrics(batch_cities,
+                                 "cyclability",
+                                 old_metric_version,
+                                 metric_version,
+                                 group_weights,
+                                 group_feature_weights,
+                                 reuse_group_scores = not group_features_changed)
+        updated.extend(batch_cities)
+
+    # City metrics from running aggregates, and snapshots of configurations now used
+    weights_config = config_registry.get_config("weights", weights_config_path)
+    for city_name in updated:
+        logging.info(f"COMPUTE {city_name} CITY METRICS")
+        compute_city_metrics_from_postgis(city_name, metrics_config_path, weights_config)
+        save_metric_config_snapshot(city_name, weights_config_path, metrics_config_path)
+
+    return updated
+
+def score_cities_in_database(weights_config_path: Path,
+                             metrics_config_path: Path,
+                             city_names: Optional[list[str]] = None) -> list[str]:
+    """
+    Score stored segments of cities with current cyclability configurations directly in PostGIS
+    (no segment leaves the database).
+
+    Compiled configurations are published once per version to lookup tables, then each city is scored
+    with one call of the score_segment_metrics SQL function (see docker/postgres/init.sql). Scoring is
+    non-interactive: values missing from mappings are only resolved with stored learned mappings, else
+    scored with fallback, flagged and queued (unknown_value_queue). City metrics are then refreshed from
+    running aggregates.
+
+    Parameters
+    ----------
+    weights_config_path : Path
+        Path to the weights configuration file.
+    metrics_config_path : Path
+        Path to the cyclability configuration file.
+    city_names: Optional[list[str]]
+        Names of cities to score (all cities with segment metrics if None).
+
+    Returns
+    -------
+    list[str]
+        Names of scored cities.
+    """
+
+    metric_version = config_registry.get_version("cyclability", metrics_config_path)
+    weights_version = config_registry.get_version("weights", weights_config_path)
+
+    logging.info("PUBLISH CONFIG")
+    compiled = config_registry.get_compiled("cyclability", metrics_config_path, weights_config_path)
+    metric_config_to_postgres("cyclability", metric_version, weights_version, compiled)
+
+    if city_names is None:
+        city_names = load_scored_city_names("cyclability")
+
+    weights_config = config_registry.get_config("weights", weights_config_path)
+    scored = []
+    for city_name in city_names:
+        logging.info(f"SCORE {city_name} IN DATABASE")
+        n_scored = score_segment_metrics_in_postgres(city_name, "cyclability", metric_version, weights_version)
+        if n_scored == 0:
+            logging.warning(f"No stored segment metrics for {city_name}: run build_network.")
+            continue
+
+        logging.info(f"COMPUTE {city_name} CITY METRICS")
+        compute_city_metrics_from_postgis(city_name, metrics_config_path, weights_config)
+        save_metric_config_snapshot(city_name, weights_config_path, metrics_config_path)
+        scored.append(city_name)
+
+    return scored
@@ -0,0 +1,158 @@
+from pathlib import Path
+import logging
+import threading
+import time
+from typing import Optional
+from city_metrics.services.metrics.loader import load_segments_for_scenarios
+from city_metrics.metrics.compute_metrics import uncertainty_feature_weights
+from city_metrics.metrics.config.registry import config_registry
+from city_metrics.metrics.scenario import CityScenarioSnapshot, ScenarioResult, evaluate_scenario
+
+# Snapshots are reloaded after this delay, so that recomputed/refreshed cities are picked up (seconds)
+SNAPSHOT_MAX_AGE = 300
+
+class ScenarioSnapshotCache:
+    """
+    Process-wide cache of city snapshots used to evaluate scenarios (thread-safe).
+
+    A snapshot is built once per city and configuration versions, so that scenarios are evaluated without
+    database access. Snapshots older than max_age seconds are rebuilt.
+
+    Segments are loaded outside of the cache lock (held for lookups and inserts only), under a lock per city:
+    scenarios of other cities are not blocked, and concurrent requests of a city share a single load.
+    """
+
+    def __init__(self, max_age: float = SNAPSHOT_MAX_AGE):
+
+        self.max_age = max_age
+        self._snapshots = {}
+        self._city_locks = {}
+        self._lock = threading.Lock()
+
+    def _cached(self,
+                key: tuple,
+                loaded_after: Optional[float] = None) -> Optional[CityScenarioSnapshot]:
+        """
+        Return cached snapshot if fresh (and loaded after given time if any), else None.
+        """
+
+        with self._lock:
+            cached = self._snapshots.get(key)
+
+        if cached is None or time.monotonic() - cached[0] >= self.max_age:
+            return None
+        if loaded_after is not None and cached[0] < loaded_after:
+            return None
+
+        return cached[1]
+
+    def get(self,
+            city_name: str,
+            metrics_config_path: Path,
+            weights_config_path: Path,
+            refresh: bool = False) -> CityScenarioSnapshot:
+        """
+        Return snapshot of city, loading segments from PostGIS only if missing, outdated or stale.
+        """
+
+        metric_version = config_registry.get_version("cyclability", metrics_config_path)
+        weights_version = config_registry.get_version("weights", weights_config_path)
+        key = (city_name, metric_version, weights_version)
+        requested_at = time.monotonic()
+
+        if not refresh:
+            snapshot = self._cached(key)
+            if snapshot is not None:
+                return snapshot
+
+        with self._lock:
+            city_lock = self._city_locks.setdefault(city_name, threading.Lock())
+
+        with city_lock:
+
+            # Snapshot loaded by another request while waiting (after this request if refreshed)
+            snapshot = self._cached(key, requested_at if refresh else None)
+            if snapshot is not None:
+                return snapshot
+
+            segments = load_segments_for_scenarios(city_name)
+            if segments.empty:
+                raise ValueError(f"No scored segments available for {city_name}")
+
+            # Segments scored with other configurations (scenario segments are rescored with current ones)
+            stored_versions = sorted(segments["metric_version"].unique())
+            if stored_versions != [metric_version]:
+                logging.warning(f"{city_name} scored with metric versions {stored_versions} "
+                                f"(current: {metric_version}) - run recompute_metrics for consistent scenarios.")
+
+            snapshot = CityScenarioSnapshot.from_segments(
+                city_name,
+                stored_versions[-1],
+                config_registry.get_compiled("cyclability", metrics_config_path, weights_config_path),
+                segments,
+                uncertainty_feature_weights(config_registry.get_config("weights", weights_config_path, copy_config = False),
+                                            "cyclability")
+            )
+
+            with self._lock:
+                # Drop snapshots of other configuration versions of the city
+                for other_key in [other_key for other_key in self._snapshots if other_key[0] == city_name]:
+                    del self._snapshots[other_key]
+                self._snapshots[key] = (time.monotonic(), snapshot)
+
+            return snapshot
+
+    def clear(self) -> None:
+        """
+        Clear all cached snapshots.
+        """
+
+        with self._lock:
+            self._snapshots.clear()
+
+# Process-wide cache
+scenario_snapshots = ScenarioSnapshotCache()
+
+def run_scenario(city_name: str,
+                 overrides: dict[str, dict],
+                 metrics_config_path: Path,
+                 weights_config_path: Path,
+                 refresh: bool = False) -> ScenarioResult:
+    """
+    Evaluate city cyclability metrics of a what-if scenario against the cached city snapshot.
+
+    Only overridden segments are rescored (see metrics/scenario.py): the baseline stored in
+    PostGIS is not modified.
+
+    Parameters
+    ----------
+    city_name: str
+        Name of given city (e.g., "oslo").
+    overrides: dict[str, dict]
+        Overridden attributes by OSM ID (feature name -> value).
+    metrics_config_path : Path
+        Path to the cyclability configuration file.
+    weights_config_path : Path
+        Path to the weights configuration file.
+    refresh: bool
+        If True, city snapshot is reloaded from PostGIS.
+
+    Returns
+    -------
+    ScenarioResult
+        Baseline and scenario city metrics.
+    """
+
+    snapshot = scenario_snapshots.get(city_name, metrics_config_path, weights_config_path, refresh)
+
+    # OSM IDs given without element type refer to ways (same as segments API)
+    overrides = {
+        osm_id if "/" in str(osm_id) else f"way/{osm_id}": segment_overrides
+        for osm_id, segment_overrides in overrides.items()
+    }
+
+    result = evaluate_scenario(snapshot, overrides)
+    if result.unresolved:
+        logging.warning(f"Scenario values missing from mappings (scored with fallback): {', '.join(result.unresolved)}")
+
+    return result
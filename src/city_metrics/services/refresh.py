@@ -6,6 +6,7 @@ from city_metrics.data.export.postgres import delete_segment_metrics_in_polygon
 from city_metrics.data.export.postgres import delete_segments_in_polygon
 from city_metrics.data.export.postgres import load_reference_area
 from typing import Optional
+from city_metrics.data.normalize.enrichment import SpatialEnricher
 from city_metrics.data.ingest.geocoding import city_to_polygon, split_polygon_into_bboxes
 
 def refresh_osm_data(city_name: str,
@@ -16,7 +17,14 @@ def refresh_osm_data(city_name: str,
                         timeout: Optional[int] = 50,
                         tiling: Optional[bool] = False,
                         retries: Optional[int] = 50,
-                        delay: Optional[float] = 2.0) -> None:
+                        delay: Optional[float] = 2.0,
+                        interactive: bool = True,
+                        noding: bool = False,
+                        impute: bool = False,
+                        extra_metrics: Optional[list[str]] = None,
+                        workers: int = 1,
+                        dem_path: Optional[Path] = None,
+                        enricher: Optional[SpatialEnricher] = None) -> None:
     """
     Refresh network and recompute metrics associated with reference polygon covering segments present 
     in the database. 
@@ -33,6 +41,20 @@ def refresh_osm_data(city_name: str,
         If True, upload processed network segments and metrics to PostGIS.
     timeout: Optional[int]
         Overpass API timeout.
+    interactive: bool
+        If False, categorical values missing from YAML mappings are scored with fallback and queued.
+    noding: bool
+        If True, OSM ways are split at junctions into network segments.
+    impute: bool
+        If True, missing info is imputed from nearest segments of the same highway class.
+    extra_metrics: Optional[list[str]]
+        Names of additional registered metrics scored in the same pass as cyclability.
+    workers: int
+        Number of worker processes scoring chunks in parallel (requires non-interactive mode).
+    dem_path: Optional[Path]
+        Path of local DEM raster (GeoTIFF) used to compute the gradient feature of segments.
+    enricher: Optional[SpatialEnricher]
+        Spatial join with local vector layers (enrichment attributes added to segments before scoring).
     """
 
     # Retrieve reference polygon from PostGIS database
@@ -51,10 +73,15 @@ def refresh_osm_data(city_name: str,
     delete_segments_in_polygon(city_name, ref_polygon)
 
     if tiling:
-        for i, (south, west, north, east) in enumerate(tiles, 1):
-            logging.info("PROCESSING TILE %d / %d", i, len(tiles))
+        queries = [roads_in_bbox(south, west, north, east, timeout) for (south, west, north, east) in tiles]
 
-            query = roads_in_bbox(south, west, north, east, timeout)
+        # Noding and imputation need the whole network (junctions and neighbours shared by tiles):
+        # ways of all tiles are fetched first, then processed as a single network
+        if noding or impute:
+            queries = [queries]
+
+        for i, query in enumerate(queries, 1):
+            logging.info("PROCESSING TILE %d / %d", i, len(queries))
 
             # Run refresh pipeline
             build_network_from_api(
@@ -66,7 +93,14 @@ def refresh_osm_data(city_name: str,
                 chunk_size = chunk_size,
                 timeout=timeout,
                 retries=retries,
-                delay=delay
+                delay=delay,
+                interactive=interactive,
+                noding=noding,
+                impute=impute,
+                extra_metrics=extra_metrics,
+                workers=workers,
+                dem_path=dem_path,
+                enricher=enricher
             )
     else:
         # Run refresh pipeline
@@ -79,5 +113,12 @@ def refresh_osm_data(city_name: str,
                 chunk_size = chunk_size,
                 timeout=timeout,
                 retries=retries,
-                delay=delay
+                delay=delay,
+                interactive=interactive,
+                noding=noding,
+                impute=impute,
+                extra_metrics=extra_metrics,
+                workers=workers,
+                dem_path=dem_path,
+                enricher=enricher
             )
\ No newline at end of file
@@ -99,9 +99,11 @@ def load_segment_from_id(city_name: str,
         query = text("""
         SELECT
             osm_id,
+            parent_osm_id,
             street_name,
             bike_infra,
             maxspeed,
+            gradient,
             is_oneway,
             is_lit,
             surface,
@@ -2,10 +2,15 @@
 Utility functions for common Shapely geometrical operations.
 """
 
+import numpy as np
+import shapely
 from shapely.geometry import Point, box, Polygon
 from shapely.geometry.base import BaseGeometry
 from pyproj import Geod
 
+# Shared WGS84 ellipsoid (World Geodetic System 1984) - define once instead of at each call
+WGS84_GEOD = Geod(ellps = "WGS84")
+
 # Geometry info
 def geom_from_bbox(south: float,
                     west: float,
@@ -34,10 +39,50 @@ def geodesic_length(geom):
     """
     Calculate WGS84 geodesic length of segment (more accurate - it computes length on ellipsoid surface instead of using projections). 
     """
-    
-    geod = Geod(ellps = "WGS84") # WGS84: World Geodetic System 1984
 
-    return geod.geometry_length(geom)
+    return WGS84_GEOD.geometry_length(geom)
+
+def geodesic_lengths(geoms) -> np.ndarray:
+    """
+    Calculate WGS84 geodesic lengths of an array of LineStrings in one vectorized call.
+
+    Coordinates of all geometries are flattened, distances between consecutive vertices are
+    computed at once, and distances are summed per geometry with np.add.reduceat.
+    Pairs of vertices belonging to different geometries are discarded.
+
+    Parameters
+    ----------
+    geoms: array-like
+        LineString geometries (e.g., GeoSeries or its values). Missing geometries get length 0.0.
+
+    Returns
+    -------
+    np.ndarray
+        Geodesic length in meters of each geometry.
+    """
+
+    geoms = np.asarray(geoms, dtype = object)
+    lengths = np.zeros(len(geoms), dtype = float)
+
+    # Flatten coordinates - index gives the position of the parent geometry of each vertex
+    coords, index = shapely.get_coordinates(geoms, return_index = True)
+    if len(coords) == 0:
+        return lengths
+
+    # Distances between consecutive vertices (vectorized)
+    _, _, dist = WGS84_GEOD.inv(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+    # Drop pairs linking the last vertex of a geometry to the first vertex of the next one
+    dist = np.where(index[:-1] == index[1:], dist, 0.0)
+
+    # Pad with zero so that reduceat is also valid when last geometry has a single vertex
+    dist = np.append(dist, 0.0)
+
+    # Sum pairs per geometry (starts = first vertex of each geometry)
+    geom_idx, starts = np.unique(index, return_index = True)
+    lengths[geom_idx] = np.add.reduceat(dist, starts)
+
+    return lengths
 
 # Geometrical operations
 def midpoint(geom):
@@ -1,4 +1,6 @@
-from typing import Any
+from collections import namedtuple
+from typing import Any, Iterator
+import pandas as pd
 
 # Introduce helper functions to handle both gdf rows from itertuple and iterrows loops 
 # Switched to itertuple loop for computational efficiency
@@ -13,9 +15,10 @@ def row_get(row: Any,
         return row.get(key, default)
 
 # equivalent to - gdf_row.items()
+# (original column names of rows from iter_rows - itertuples renames colon-named columns, e.g. "cycleway:left")
 def row_items(row: Any):
     if hasattr(row, "_fields"):
-        return zip(row._fields, row)
+        return zip(getattr(row, "_columns", row._fields), row)
     else:
         return row.items()
 
@@ -24,4 +27,11 @@ def row_has(row: Any, key: str) -> bool:
     if hasattr(row, "_fields"):
         return hasattr(row, key)
     else:
-        return key in row
\ No newline at end of file
+        return key in row
+
+# equivalent to - df.itertuples(index = False), keeping original column names for row_items
+def iter_rows(df: pd.DataFrame) -> Iterator[tuple]:
+    columns = tuple(df.columns)
+    Row = namedtuple("Row", [str(column) for column in columns], rename = True)
+    Row._columns = columns
+    return map(Row._make, df.itertuples(index = False, name = None))
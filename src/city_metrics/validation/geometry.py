@@ -2,35 +2,155 @@
 Module for validating geometries in PostGIS database.
 """
 import geopandas as gpd
+import numpy as np
+import shapely
+from typing import Optional
 
-def validate_gdf_linestrings(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+def has_distinct_coordinates(geoms,
+                             mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return boolean array flagging geometries with at least two distinct coordinates.
+
+    Degeneracy is checked on raw coordinates (no reprojection is needed): a geometry
+    is non-degenerate if any of its vertices differs from its first vertex.
+    If mask is given, only flagged geometries are checked (others are flagged False).
+    """
+
+    geoms = np.asarray(geoms, dtype = object)
+    result = np.zeros(len(geoms), dtype = bool)
+
+    # Flatten coordinates of checked geometries only - index gives the position of the parent geometry of each vertex
+    rows = np.arange(len(geoms)) if mask is None else np.flatnonzero(mask)
+    coords, index = shapely.get_coordinates(geoms[rows], return_index = True)
+    if len(coords) == 0:
+        return result
+
+    # Vertices are ordered by geometry: first vertex of each geometry repeated over its vertices
+    counts = np.bincount(index, minlength = len(rows))
+    starts = np.cumsum(counts) - counts
+    nonempty = counts > 0
+    differs = np.any(coords != np.repeat(coords[starts[nonempty]], counts[nonempty], axis = 0), axis = 1)
+
+    result[rows] = np.bincount(index, weights = differs, minlength = len(rows)) > 0
+
+    return result
+
+def drop_non_finite_vertices(geoms) -> np.ndarray:
+    """
+    Return LineStrings without their non-finite (NaN, inf) vertices, rebuilt in a single vectorized call.
+
+    LineStrings left with fewer than two vertices are replaced by None.
+    """
+
+    geoms = np.asarray(geoms, dtype = object)
+
+    coords, index = shapely.get_coordinates(geoms, return_index = True)
+    keep = np.all(np.isfinite(coords), axis = 1)
+    keep &= np.bincount(index[keep], minlength = len(geoms))[index] >= 2
+
+    result = np.full(len(geoms), None, dtype = object)
+    if keep.any():
+        shapely.linestrings(coords[keep], indices = index[keep], out = result)
+
+    return result
+
+def linestring_validity_mask(gdf: gpd.GeoDataFrame,
+                             repair: bool = False,
+                             mask: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray, bool]:
+    """
+    Compute row mask of valid LineStrings in GeoDataFrame without materializing any intermediate.
+
+    All checks are combined into a single row mask using shapely array predicates:
+    - geometry is not null
+    - geometry type is LineString
+    - geometry is valid
+    - geometry has at least two distinct coordinates (length > 0)
+
+    Parameters
+    ----------
+    gdf: gpd.GeoDataFrame
+        GeoPandas GeoDataFrame.
+    repair: bool
+        If True, invalid geometries are repaired instead of being dropped: non-finite vertices of
+        LineStrings are removed, remaining invalid geometries are repaired with shapely make_valid
+        (and merged if possible). Repaired geometries are retained only if they are LineStrings.
+    mask: Optional[np.ndarray]
+        Row mask of cheaper checks computed beforehand (e.g., restriction_mask): rows already
+        dropped are neither repaired nor checked for degeneracy.
+
+    Returns
+    -------
+    mask: np.ndarray
+        Boolean array flagging rows to retain.
+    geoms: np.ndarray
+        Geometries of GeoDataFrame (including repaired ones if repair is True).
+    repaired: bool
+        True if any geometry was repaired (geoms differ from GeoDataFrame geometries).
+    """
+
+    geoms = np.asarray(gdf.geometry.values, dtype = object)
+
+    # Retain only features with geometry
+    mask = ~shapely.is_missing(geoms) if mask is None else mask & ~shapely.is_missing(geoms)
+
+    # Retain only valid geometries (optionally repair invalid ones)
+    valid = shapely.is_valid(geoms)
+    to_repair = mask & ~valid if repair else np.zeros(len(geoms), dtype = bool)
+    if to_repair.any():
+        geoms = geoms.copy()
+
+        # Non-finite vertices first (not handled by make_valid)
+        lines = to_repair & (shapely.get_type_id(geoms) == shapely.GeometryType.LINESTRING)
+        geoms[lines] = drop_non_finite_vertices(geoms[lines])
+
+        still_invalid = to_repair & ~shapely.is_missing(geoms) & ~shapely.is_valid(geoms)
+        geoms[still_invalid] = shapely.line_merge(shapely.make_valid(geoms[still_invalid]))
+        valid[to_repair] = shapely.is_valid(geoms[to_repair])
+    mask &= valid
+
+    # Retain only LineStrings
+    mask &= shapely.get_type_id(geoms) == shapely.GeometryType.LINESTRING
+
+    # Retain only LineStrings with valid length (checked on raw coordinates of retained rows only)
+    mask &= has_distinct_coordinates(geoms, mask)
+
+    return mask, geoms, bool(to_repair.any())
+
+def validate_gdf_linestrings(gdf: gpd.GeoDataFrame,
+                             repair: bool = False) -> gpd.GeoDataFrame:
     """
     Perform preliminary checks on GeoDataFrame LineStrings and filter out
-    invalid features. 
-    
+    invalid features (see linestring_validity_mask for the checks performed).
+
     Parameters
     ----------
     gdf: gpd.GeoDataFrame
         GeoPandas GeoDataFrame.
+    repair: bool
+        If True, repair invalid geometries with shapely make_valid instead of dropping them.
+
     Returns
     -------
     gdf: gpd.GeoDataFrame
         Cleaned GeoPandas GeoDataFrame.
     """
 
-    # Retain only LineStrings
-    gdf = gdf[gdf.geometry.type == "LineString"]
-    # Retain only valid features with geometry
-    gdf = gdf[gdf.geometry.notnull()]
-    # Retain only valid geometries
-    gdf = gdf[gdf.geometry.is_valid]
-
-    # Retain only LineStrings with valid length
-    # If data is in degrees, project data into meters before calculating length (utm is in meters)
-    if gdf.crs and gdf.crs.is_geographic:
-        temp_gdf = gdf.to_crs(gdf.estimate_utm_crs())
-        gdf = gdf[temp_gdf.geometry.length > 0]
-    else:
-        gdf = gdf[gdf.geometry.length > 0]
-
-    return gdf
\ No newline at end of file
+    mask, geoms, repaired = linestring_validity_mask(gdf, repair)
+
+    # Single materialization of the filtered GeoDataFrame
+    gdf = gdf.take(np.flatnonzero(mask))
+
+    # Write back repaired geometries (only if any geometry was repaired)
+    if repaired:
+        replace_repaired_geometries(gdf, geoms[mask])
+
+    return gdf
+
+def replace_repaired_geometries(gdf: gpd.GeoDataFrame,
+                                geoms: np.ndarray) -> None:
+    """
+    Replace in place geometries of GeoDataFrame with (repaired) geometries
+    (only called if any geometry was repaired - see linestring_validity_mask).
+    """
+
+    gdf[gdf.geometry.name] = gpd.GeoSeries(geoms, index = gdf.index, crs = gdf.crs)
@@ -0,0 +1,94 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+import geopandas as gpd
+from shapely.geometry import LineString
+from city_metrics.analysis.sensitivity import sweep_group_weight, sweep_weight_matrix, global_weight_sensitivity
+from city_metrics.metrics.compute_metrics import define_augmented_geodataframe, compute_total_city_metrics
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def test_sweep_group_weight():
+
+    gdf = gpd.GeoDataFrame({
+        "geometry": [LineString([(0, 0), (0, 0.001)])] * 4,
+        "highway": ["primary", "footway", "residential", "cycleway"],
+        "bicycle": ["yes", None, None, "designated"],
+        "surface": ["asphalt", "gravel", None, "asphalt"],
+        "lit": ["yes", None, "no", "yes"],
+        "maxspeed": [50, None, 30, None],
+        "segment_length": [120.0, 40.0, 300.0, 75.0]
+    })
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+    excellent_bike_infra = {k for k, v in metrics_config["bike_infrastructure"]["mapping"].items() if v == 1.0}
+    base_config = copy.deepcopy(weights_config)
+
+    scores, deltas = sweep_group_weight(gdf, "traffic", 0.05, 0.2, weights_config, metrics_config,
+                                        cyclability_path, excellent_bike_infra)
+    assert len(scores) == len(deltas) == 9
+    assert weights_config == base_config
+
+    # Same scores as full rescoring of segments with each normalized weight vector
+    group_names = list(weights_config["cyclability"])
+    base_weights = np.array([weights_config["cyclability"][k]["weight"] for k in group_names])
+    W, _ = sweep_weight_matrix(base_weights, group_names.index("traffic"), 0.05, 0.2)
+    for weights_row, score in zip(W, scores):
+        step_config = copy.deepcopy(base_config)
+        for k, val in zip(group_names, weights_row):
+            step_config["cyclability"][k]["weight"] = float(val)
+        gdf_proc, _ = define_augmented_geodataframe(gdf, step_config, metrics_config, cyclability_path, excellent_bike_infra)
+        expected, _, _ = compute_total_city_metrics(gdf_proc.rename(columns = {"cyclability_metrics": "total_score"}),
+                                                    "cyclability", step_config)
+        assert np.isclose(score, expected, rtol = 0, atol = 1e-12)
+
+def test_global_weight_sensitivity():
+
+    group_means = pd.DataFrame({
+        "infrastructure": [1.0, 1.0, 0.5],
+        "physical": [0.0, 1.0, 0.8],
+        "traffic": [0.0, 1.0, 0.2],
+        "regulation": [0.0, 1.0, 0.6]
+    }, index = ["a", "b", "c"])
+    base_weights = np.array([0.4, 0.2, 0.25, 0.15])
+
+    result = global_weight_sensitivity(group_means, base_weights, n_samples = 4096, seed = 1)
+    assert len(result) == 12
+    assert result.equals(global_weight_sensitivity(group_means, base_weights, n_samples = 4096, seed = 1))
+    city = result.drop_duplicates("city_name").set_index("city_name")
+
+    # Score of city "a" is the infrastructure weight: infrastructure drives its variance
+    a = result[result["city_name"] == "a"].set_index("target_group")
+    assert a["total_order_index"].idxmax() == "infrastructure"
+    assert a.loc["infrastructure", "first_order_index"] > 0.5
+    assert (a["first_order_index"] <= a["total_order_index"] + 0.05).all()
+    assert np.isclose(city.loc["a", "baseline_score"], 0.4)
+
+    # City "b" has equal group subscores: constant score (no indices), always ranked first
+    assert result.loc[result["city_name"] == "b", ["first_order_index", "total_order_index"]].isna().all().all()
+    assert city.loc["b", "baseline_rank"] == 1 and city.loc["b", "rank_change_probability"] == 0
+
+    # Cities "a" and "c" swap ranks for some weights
+    assert 0 < city.loc["a", "rank_change_probability"] < 1
+    assert city.loc["a", "rank_p05"] <= city.loc["a", "baseline_rank"] <= city.loc["a", "rank_p95"]
+
+    # Sampling concentrated around base weights: ranks are more stable
+    concentrated = global_weight_sensitivity(group_means, base_weights, n_samples = 4096, concentration = 200, seed = 1)
+    assert concentrated.loc[0, "rank_change_probability"] < city.loc["a", "rank_change_probability"]
+
+def test_global_weight_sensitivity_sobol():
+
+    pytest.importorskip("scipy")
+
+    group_means = pd.DataFrame({"infrastructure": [1.0, 0.5], "physical": [0.0, 0.8]}, index = ["a", "b"])
+    result = global_weight_sensitivity(group_means, np.array([0.5, 0.5]), n_samples = 1024, method = "sobol")
+
+    # Two groups: weights are w and 1 - w (each weight explains all variance)
+    assert np.allclose(result["first_order_index"], 1.0, atol = 0.05)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.compute_metrics import UNCERTAINTY_FEATURES
+from city_metrics.analysis.uncertainty import spatial_block_ids, block_bootstrap_scores, parallel_block_bootstrap_scores
+from city_metrics.analysis.uncertainty import city_score_intervals
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def test_block_bootstrap():
+
+    # Points 100 m apart on a line: 500 m blocks hold 5 points
+    lon = np.arange(20) * 100 / (111_320.0 * np.cos(np.radians(60.0)))
+    lat = np.full(20, 60.0)
+    block_ids = spatial_block_ids(lon, lat, 500.0)
+    assert len(np.unique(block_ids)) in (4, 5)
+
+    # Resamples are reproducible and split over workers with independent streams
+    block_length = np.array([1.0, 2.0, 3.0, 4.0])
+    block_score_length = np.array([0.2, 1.0, 2.4, 3.6])
+    scores = block_bootstrap_scores(block_length, block_score_length, 500, seed = 1)
+    assert np.array_equal(scores, block_bootstrap_scores(block_length, block_score_length, 500, seed = 1))
+    assert scores.min() >= 0.2 and scores.max() <= 0.9
+    assert len(parallel_block_bootstrap_scores(block_length, block_score_length, 101, workers = 2)) == 101
+
+def test_city_score_intervals():
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    rng = np.random.default_rng(0)
+    n = 1000
+    segments = pd.DataFrame({"segment_length": rng.uniform(10, 200, n),
+                             "total_score": rng.uniform(0.3, 0.9, n),
+                             "lon": 10.7 + rng.uniform(0, 0.1, n),
+                             "lat": 59.9 + rng.uniform(0, 0.05, n)})
+    for feature in UNCERTAINTY_FEATURES:
+        segments[f"score_{feature}"] = 0.5
+        segments[f"missing_{feature}"] = rng.random(n) < 0.3
+
+    intervals = city_score_intervals(segments, engine, UNCERTAINTY_FEATURES, n_resamples = 1000)
+
+    assert intervals.ci_lower < intervals.total_score < intervals.ci_upper
+    assert intervals.worst_case < intervals.total_score < intervals.best_case
+    assert intervals.n_blocks > 1
+
+    # No missing feature: bounds collapse to city score
+    for feature in UNCERTAINTY_FEATURES:
+        segments[f"missing_{feature}"] = False
+    intervals = city_score_intervals(segments, engine, UNCERTAINTY_FEATURES, n_resamples = 100)
+    assert intervals.worst_case == pytest.approx(intervals.total_score)
+    assert intervals.best_case == pytest.approx(intervals.total_score)
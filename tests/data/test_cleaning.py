@@ -1,10 +1,13 @@
 import geopandas as gpd
 import pandas as pd
 from shapely.geometry import LineString
-from city_metrics.data.normalize.cleaning import restrict_gdf, parse_maxspeed_to_kmh, normalize_maxspeed_info, prepare_cyclability_segment
+from city_metrics.data.normalize.cleaning import restrict_gdf, parse_maxspeed_to_kmh, normalize_maxspeed_info, prepare_cyclability_segment, prepare_cyclability_batch
 from pathlib import Path
 import math
-from city_metrics.domain.segment import CyclabilitySegment
+from city_metrics.domain.segment import CyclabilitySegment, SegmentBatch
+from city_metrics.utils.helpers import iter_rows
+from city_metrics.data.ingest.geojson_loader import geojson_to_gdf_from_path
+from city_metrics.services.pipeline import transform_gdf_chunk
 
 # Used to generate a test GeoDataFrame
 def make_test_gdf():
@@ -84,7 +87,8 @@ def test_prepare_cyclability_segment():
     assert segment.missing_info == {
         "maxspeed": True,
         "surface": True,
-        "lighting": False
+        "lighting": False,
+        "gradient": False
     }
 
     assert segment.oneway == "yes"
@@ -92,3 +96,36 @@ def test_prepare_cyclability_segment():
     segment = prepare_cyclability_segment(gdf.iloc[3], excellent_bike_infra)
 
     assert segment.bike_infrastructure == "track"
+
+def test_prepare_cyclability_batch_matches_segments():
+    gdf = make_test_gdf()
+
+    excellent_bike_infra = {"cycleway", "track", "separate"}
+
+    batch = prepare_cyclability_batch(gdf, excellent_bike_infra)
+    assert isinstance(batch, SegmentBatch)
+    assert len(batch) == len(gdf)
+
+    # Columnar preparation must match row by row preparation (same parsing rules - Series and tuple rows)
+    batch_gdf = batch.to_geodataframe()
+    for i, ((_, row), row_tuple) in enumerate(zip(gdf.iterrows(), iter_rows(gdf))):
+        segment = prepare_cyclability_segment(row, excellent_bike_infra)
+        segment_tuple = prepare_cyclability_segment(row_tuple, excellent_bike_infra)
+        for attribute in ("bike_infrastructure", "oneway", "maxspeed", "surface", "lighting", "highway", "missing_info", "imputed_info"):
+            assert batch_gdf.iloc[i][attribute] == getattr(segment, attribute) == getattr(segment_tuple, attribute), attribute
+
+    # cycleway:left tags are parsed
+    assert batch_gdf.iloc[3]["bike_infrastructure"] == "track"
+
+def test_prepare_cyclability_batch_matches_segments_on_osm_tags(dev_geojson_path):
+
+    # OSM ways with colon-named tags (cycleway:left, oneway:bicycle, ...)
+    gdf = transform_gdf_chunk(geojson_to_gdf_from_path(dev_geojson_path))
+    assert any(":" in column for column in gdf.columns if "cycleway" in column)
+
+    excellent_bike_infra = {"cycleway", "track", "separate"}
+    batch_gdf = prepare_cyclability_batch(gdf, excellent_bike_infra).to_geodataframe()
+
+    for i, row in enumerate(iter_rows(gdf)):
+        segment = prepare_cyclability_segment(row, excellent_bike_infra)
+        assert (batch_gdf.iloc[i]["bike_infrastructure"], batch_gdf.iloc[i]["oneway"]) == (segment.bike_infrastructure, segment.oneway)
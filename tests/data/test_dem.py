@@ -0,0 +1,69 @@
+import numpy as np
+import geopandas as gpd
+from shapely import LineString
+from city_metrics.data.ingest.dem import bilinear_sample, segment_gradients, METERS_PER_DEGREE
+from city_metrics.data.normalize.cleaning import prepare_cyclability_batch
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.utils.config_helpers import read_config
+
+def sample_slope(lon, lat):
+    # Plane rising 5 m every 100 m northward, no data south of the equator
+    return np.where(lat >= 0, lat * METERS_PER_DEGREE * 0.05, np.nan)
+
+def test_bilinear_sample():
+
+    array = np.array([[0.0, 10.0],
+                      [20.0, 30.0]])
+
+    # Pixel centers, midpoint between centers, outer half pixel (border values) and outside points
+    values = bilinear_sample(array,
+                             np.array([0.5, 1.5, 1.0, 0.0, 2.5, -0.1]),
+                             np.array([0.5, 1.5, 1.0, 2.0, 1.0, 1.0]))
+
+    assert np.allclose(values[:4], [0.0, 30.0, 15.0, 10.0])
+    assert np.isnan(values[4:]).all()
+
+def test_segment_gradients():
+
+    geoms = [
+        LineString([(0, 0), (0, 0.01)]), # northward (~1.1 km) - 5 %
+        LineString([(0, 0.01), (0, 0.005), (0.005, 0.005)]), # down then flat - same climb, twice the length
+        LineString([(0, 0.001), (0.01, 0.001)]), # eastward - flat
+        LineString([(0, -0.001), (0, 0.001)]), # partly outside DEM - missing
+        None
+    ]
+
+    gradients = segment_gradients(np.array(geoms, dtype = object), sample_slope, spacing = 30.0)
+
+    assert np.allclose(gradients[:3], [5.0, 2.5, 0.0], atol = 0.1)
+    assert np.isnan(gradients[3:]).all()
+
+def test_gradient_feature_scoring():
+
+    gdf = gpd.GeoDataFrame({
+        "osm_id": ["way/1", "way/2", "way/3"],
+        "highway": ["residential"] * 3,
+        "maxspeed": ["30"] * 3,
+        "surface": ["asphalt"] * 3,
+        "lit": ["yes"] * 3,
+        "segment_length": [100.0] * 3,
+        "gradient": [1.0, 9.5, np.nan]
+    }, geometry = [LineString([(0, 0), (0, 0.001)])] * 3, crs = "EPSG:4326")
+
+    batch = prepare_cyclability_batch(gdf, set())
+    assert [info["gradient"] for info in batch.missing_info()] == [False, False, True]
+
+    # Gradient scored with bins, missing gradient with fallback
+    metrics_config = read_config("cyclability", "yaml", "src/city_metrics/metrics/config/cyclability.yaml")
+    metrics_config.pop("version")
+    weights_config = read_config("weights", "yaml", "src/city_metrics/metrics/config/weights.yaml")
+    weights_config.pop("version")
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+    _, feature_scores = engine.score(batch.attributes(), None)
+
+    gradient_scores = feature_scores[:, engine.feature_names.index("gradient")]
+    assert gradient_scores.tolist() == [1.0, 0.2, metrics_config["gradient"]["fallback"]]
+
+    # Chunks without DEM have no gradient column: not flagged as missing
+    batch = prepare_cyclability_batch(gdf.drop(columns = "gradient"), set())
+    assert not any(info["gradient"] for info in batch.missing_info())
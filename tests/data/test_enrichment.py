@@ -0,0 +1,99 @@
+import json
+import numpy as np
+import geopandas as gpd
+from shapely import LineString, Point, box
+from city_metrics.data.normalize.enrichment import SpatialEnricher, METERS_PER_DEGREE
+from city_metrics.data.normalize.cleaning import prepare_cyclability_batch, prepare_cyclability_segment
+from city_metrics.data.export.postgres import prepare_network_segments_gdf_for_postgis
+from city_metrics.metrics.engine import compile_metrics
+
+# 1 meter in degrees (at the equator)
+M = 1 / METERS_PER_DEGREE
+
+def make_segments():
+    # Two 100 m segments along the equator, 1 km apart
+    return gpd.GeoDataFrame({
+        "osm_id": ["way/1", "way/2"],
+        "highway": ["residential", "residential"],
+        "maxspeed": ["30", "30"],
+        "surface": ["asphalt", "asphalt"],
+        "lit": ["yes", "yes"],
+        "segment_length": [100.0, 100.0]
+    }, geometry = [LineString([(0, 0), (100 * M, 0)]), LineString([(1000 * M, 0), (1100 * M, 0)])], crs = "EPSG:4326")
+
+def make_enricher(tmp_path):
+
+    gpd.GeoDataFrame({"aadt": [1200, 8000]},
+                     geometry = [Point(50 * M, 10 * M), Point(1050 * M, 80 * M)],
+                     crs = "EPSG:4326").to_file(tmp_path / "counts.geojson")
+    gpd.GeoDataFrame({"severity": [1, 3, 2]},
+                     geometry = [Point(10 * M, 5 * M), Point(90 * M, -5 * M), Point(500 * M, 0)],
+                     crs = "EPSG:4326").to_parquet(tmp_path / "accidents.parquet")
+    gpd.GeoDataFrame({"quality": [0.8]},
+                     geometry = [box(0, -10 * M, 25 * M, 10 * M)],
+                     crs = "EPSG:4326").to_file(tmp_path / "parks.gpkg", layer = "parks")
+
+    return SpatialEnricher({
+        "traffic_counts": {"path": "counts.geojson", "attributes": {
+            "traffic_volume": {"method": "nearest", "column": "aadt", "distance": 50},
+            "count_distance": {"method": "nearest"}
+        }},
+        "accidents": {"path": "accidents.parquet", "attributes": {
+            "accident_count": {"method": "count", "distance": 20},
+            "accident_severity": {"method": "count", "column": "severity", "distance": 20}
+        }},
+        "parks": {"path": "parks.gpkg", "layer": "parks", "attributes": {
+            "park_share": {"method": "overlap"},
+            "park_quality": {"method": "overlap", "column": "quality"}
+        }}
+    }, root = tmp_path)
+
+def test_spatial_enrichment(tmp_path):
+
+    gdf = make_segments()
+    enricher = make_enricher(tmp_path)
+    enricher.enrich(gdf)
+
+    # Nearest count station within 50 m (second station is 80 m away), distance to nearest station
+    assert gdf["enriched_traffic_volume"].iloc[0] == 1200
+    assert np.isnan(gdf["enriched_traffic_volume"].iloc[1])
+    assert np.allclose(gdf["enriched_count_distance"], [10, 80], atol = 0.1)
+
+    # Accidents within 20 m (count and sum of severity)
+    assert gdf["enriched_accident_count"].tolist() == [2, 0]
+    assert gdf["enriched_accident_severity"].tolist() == [4, 0]
+
+    # Share of segment length within park, length-weighted park quality
+    assert np.allclose(gdf["enriched_park_share"], [0.25, 0.0], atol = 1e-3)
+    assert np.isclose(gdf["enriched_park_quality"].iloc[0], 0.8)
+    assert np.isnan(gdf["enriched_park_quality"].iloc[1])
+
+    # Stored as JSON (missing attributes are not stored)
+    prepared = prepare_network_segments_gdf_for_postgis("test", gdf)
+    assert json.loads(prepared["enrichment"].iloc[1]) == {
+        "count_distance": gdf["enriched_count_distance"].iloc[1],
+        "accident_count": 0.0,
+        "accident_severity": 0.0,
+        "park_share": 0.0
+    }
+
+def test_enrichment_features_scoring(tmp_path):
+
+    gdf = make_segments()
+    make_enricher(tmp_path).enrich(gdf)
+
+    # Enrichment attribute declared as feature of metrics YAML
+    metrics_config = {
+        "surface": {"type": "categorical", "mapping": {"asphalt": 1.0}},
+        "accident_count": {"type": "continuous", "bins": [{"max": 0, "metrics": 1.0}, {"max": 5, "metrics": 0.5}], "fallback": 0.5}
+    }
+    weights_config = {"cyclability": {"safety": {"weight": 1.0, "features": {"surface": 0.5, "accident_count": 0.5}}}}
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    batch = prepare_cyclability_batch(gdf, set())
+    scores, _ = engine.score(batch.attributes(), None)
+    assert scores.tolist() == [0.75, 1.0]
+
+    # Enrichment attributes are kept by segment dataclass
+    segment = prepare_cyclability_segment(gdf.iloc[0], set())
+    assert segment.enrichment["accident_count"] == 2
@@ -1,3 +1,4 @@
+import pytest
 from unittest.mock import patch, ANY
 from pathlib import Path
 from city_metrics.data.export.postgres import dataframe_to_postgres
@@ -8,6 +9,8 @@ from city_metrics.data.normalize.cleaning import restrict_gdf
 from city_metrics.metrics.compute_metrics import define_augmented_geodataframe
 from city_metrics.data.export.postgres import prepare_network_segments_gdf_for_postgis
 from city_metrics.utils.config_helpers import read_config
+from city_metrics.data.export.postgres import prepare_metric_config_records_for_postgis
+from city_metrics.metrics.engine import compile_metrics
 
 # Fixture paths
 dev_geojson_path = Path(__file__).parent.parent.parent / "tests" / "_fixtures" / "dev_geojson.geojson"
@@ -63,3 +66,25 @@ def test_dataframe_to_postgres():
             if_exists = "append",
             index = False
         )
+
+def test_prepare_metric_config_records_for_postgis():
+
+    compiled = compile_metrics(metrics_config, weights_config, "cyclability")
+    records = prepare_metric_config_records_for_postgis("cyclability", "v1-abc", "v1-def", compiled)
+
+    # One row per feature (in YAML order), mapping entry and bin
+    features = records["metric_features"]
+    assert [row["feature_name"] for row in features] == list(metrics_config.keys())
+    assert [row["feature_index"] for row in features] == list(range(len(features)))
+    assert len(records["metric_feature_mappings"]) == sum(
+        len(config["mapping"]) for config in metrics_config.values() if config["type"] == "categorical"
+    )
+    maxspeed_bins = [row for row in records["metric_feature_bins"] if row["feature_name"] == "maxspeed"]
+    assert [row["bin_max"] for row in maxspeed_bins] == [float(b["max"]) for b in metrics_config["maxspeed"]["bins"]]
+
+    # Weight rows give back the per-feature weight vector of the engine
+    weights = dict.fromkeys(compiled.feature_names, 0.0)
+    for row in records["metric_weights"]:
+        assert row["weights_version"] == "v1-def"
+        weights[row["feature_name"]] += row["group_weight"] * row["feature_weight"]
+    assert list(weights.values()) == pytest.approx(compiled.weights.tolist())
@@ -0,0 +1,76 @@
+import numpy as np
+import geopandas as gpd
+from shapely import LineString
+from city_metrics.data.normalize.imputation import SpatialImputer
+from city_metrics.data.normalize.cleaning import prepare_cyclability_segment
+from city_metrics.metrics.compute_metrics import define_augmented_geodataframe
+from city_metrics.data.export.postgres import prepare_network_segments_gdf_for_postgis
+from city_metrics.services.metrics.loader import recompute_columns_for_pipeline
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def make_segment(x, highway, surface):
+    # Short segment along longitude (~11 m long at equator)
+    return {"osm_id": f"way/{x}", "highway": highway, "surface": surface, "lit": "yes", "maxspeed": "30",
+            "geometry": LineString([(x * 1e-4, 0), (x * 1e-4 + 1e-4, 0)])}
+
+def test_spatial_imputation():
+
+    gdf = gpd.GeoDataFrame([
+        make_segment(0, "residential", "asphalt"),
+        make_segment(1, "residential", "asphalt"),
+        make_segment(2, "residential", None), # imputed from residential neighbours
+        make_segment(3, "residential", "sett"),
+        make_segment(4, "primary", "gravel"), # different highway class - not a donor
+        make_segment(100, "residential", None) # too far from donors - not imputed
+    ], crs = "EPSG:4326")
+
+    imputer = SpatialImputer([gdf], k = 3, max_distance = 50.0)
+    imputer.impute(gdf)
+
+    assert gdf["surface_imputed"].tolist() == [None, None, "asphalt", None, None, None]
+    assert gdf["lit_imputed"].isna().all()
+
+    # Imputed value is used for scoring while missing_info keeps observed state
+    segment = prepare_cyclability_segment(gdf.iloc[2], set())
+    assert segment.surface == "asphalt"
+    assert segment.missing_info["surface"] == True
+    assert segment.imputed_info == {"surface": True}
+
+    segment = prepare_cyclability_segment(gdf.iloc[5], set())
+    assert segment.surface == "unknown"
+    assert segment.imputed_info == {}
+
+def test_stored_imputed_values_are_rescored():
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+
+    gdf = gpd.GeoDataFrame([
+        make_segment(0, "residential", "sett"),
+        make_segment(1, "residential", "sett"),
+        make_segment(2, "residential", None) # imputed from residential neighbours
+    ], crs = "EPSG:4326")
+    gdf["segment_length"] = 11.0
+    SpatialImputer([gdf], k = 3, max_distance = 50.0).impute(gdf)
+
+    gdf_scored, _ = define_augmented_geodataframe(gdf, weights_config, metrics_config, cyclability_path, set())
+
+    # Imputed value is stored in dedicated column, attribute column keeps observed state
+    stored = prepare_network_segments_gdf_for_postgis("city", gdf_scored)
+    assert stored["surface"].tolist() == ["sett", "sett", "unknown"]
+    assert stored["surface_imputed"].tolist() == [None, None, "sett"]
+
+    # Segments loaded back from PostGIS are rescored with stored imputed values
+    stored["missing_features"] = gdf_scored["missing_info"]
+    stored["imputed_features"] = gdf_scored["imputed_info"]
+    gdf_rescored, _ = define_augmented_geodataframe(recompute_columns_for_pipeline(stored),
+                                                    weights_config, metrics_config, cyclability_path, set())
+
+    assert np.allclose(gdf_rescored["cyclability_metrics"], gdf_scored["cyclability_metrics"])
+    assert gdf_rescored["imputed_info"].tolist() == [{}, {}, {"surface": True}]
@@ -0,0 +1,79 @@
+import geopandas as gpd
+from shapely import LineString
+from city_metrics.data.normalize.segmentation import find_junction_keys, split_at_junctions
+from city_metrics.analysis.graph.build import build_graph
+
+def test_split_at_junctions():
+
+    gdf = gpd.GeoDataFrame(
+        {
+            "osm_id": ["way/1", "way/2", "way/3", "way/4"],
+            "total_score": [0.5, 0.5, 0.5, 0.5]
+        },
+        geometry = [
+            LineString([(0, 0), (1, 0), (2, 0), (3, 0)]), # two junctions
+            LineString([(1, -1), (1, 0), (1, 1)]), # crosses way/1 at (1, 0)
+            LineString([(2, 0), (2, 1)]), # ends on way/1 - not split
+            LineString([(5, 5), (6, 6), (5, 6), (5, 5)]) # closed way - not split
+        ],
+        crs = "EPSG:4326"
+    )
+
+    # Junctions found over all chunks
+    junction_keys = find_junction_keys(gdf.geometry.values)
+    assert len(junction_keys) == 2
+
+    segments = split_at_junctions(gdf, junction_keys)
+
+    assert segments["osm_id"].tolist() == ["way/1-1", "way/1-2", "way/1-3", "way/2-1", "way/2-2", "way/3", "way/4"]
+    assert segments["parent_osm_id"].tolist() == ["way/1", "way/1", "way/1", "way/2", "way/2", "way/3", "way/4"]
+    assert segments.geometry.iloc[1].equals(LineString([(1, 0), (2, 0)]))
+    assert abs(segments.loc[segments["parent_osm_id"] == "way/1", "segment_length"].sum() - 3 * 111319.49) < 1
+
+    # Segments link junctions in graph (way/1 and way/2 share node (1, 0))
+    G = build_graph(segments.iloc[:5])
+    assert G.degree[(1.0, 0.0)] == 4
+
+def test_split_numbers_kept_sub_segments_only():
+
+    gdf = gpd.GeoDataFrame(
+        {"osm_id": ["way/1", "way/2", "way/3"]},
+        geometry = [
+            LineString([(0, 0), (1, 0), (1, 0), (2, 0)]), # repeated junction vertex - zero-length piece
+            LineString([(1, -1), (1, 0), (1, 1)]),
+            LineString([(3, 0), (1, 0), (1, 0)]) # single piece left after the zero-length one is dropped
+        ],
+        crs = "EPSG:4326"
+    )
+
+    segments = split_at_junctions(gdf, find_junction_keys(gdf.geometry.values))
+
+    assert segments["osm_id"].tolist() == ["way/1-1", "way/1-2", "way/2-1", "way/2-2", "way/3"]
+
+def test_parent_osm_id_kept_after_scoring():
+
+    import json
+    from city_metrics.data.ingest.geojson_loader import geojson_to_gdf
+    from city_metrics.services.pipeline import transform_gdf_chunk
+    from city_metrics.metrics.compute_metrics import define_augmented_geodataframe
+    from city_metrics.data.export.postgres import prepare_network_segments_gdf_for_postgis
+    from city_metrics.utils.config_helpers import read_config
+
+    weights_config = read_config("weights", "yaml", "src/city_metrics/metrics/config/weights.yaml")
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", "src/city_metrics/metrics/config/cyclability.yaml")
+    metrics_config.pop("version")
+
+    with open("tests/_fixtures/dev_geojson.geojson") as f:
+        data = json.load(f)
+    for feature in data["features"]:
+        feature["properties"]["osm_id"] = feature["properties"].get("@id", feature.get("id"))
+    gdf = transform_gdf_chunk(geojson_to_gdf(data, 1000)[0])
+    segments = split_at_junctions(gdf, find_junction_keys(gdf.geometry.values))
+
+    result, _ = define_augmented_geodataframe(segments, weights_config, metrics_config,
+                                              "src/city_metrics/metrics/config/cyclability.yaml", set())
+    prepared = prepare_network_segments_gdf_for_postgis("test", result)
+
+    assert prepared["parent_osm_id"].tolist() == segments["parent_osm_id"].tolist()
+    assert (prepared["parent_osm_id"] != prepared["osm_id"]).any()
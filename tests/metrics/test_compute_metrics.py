@@ -124,3 +124,55 @@ def test_compute_total_city_metrics():
 
     assert isinstance(city_score_uncertainty, float)
     assert 0 <= city_score_uncertainty <= 1
+
+def test_compute_total_city_metrics_by_group():
+
+    import pandas as pd
+    import numpy as np
+    from city_metrics.metrics.compute_metrics import compute_total_city_metrics_by_group
+
+    df = pd.DataFrame({
+        "city_name": ["a", "a", "b"],
+        "segment_length": [1.0, 3.0, 2.0],
+        "total_score": [0.2, 0.6, 0.5],
+        "missing_info": [{"maxspeed": True}, {"surface": True, "lighting": False}, None]
+    })
+
+    weights_config = read_config("weights", "yaml", "src/city_metrics/metrics/config/weights.yaml")
+    weights_config.pop("version")
+
+    result = compute_total_city_metrics_by_group(df, "cyclability", weights_config)
+
+    assert np.isclose(result.loc["a", "total_score"], (0.2 * 1 + 0.6 * 3) / 4)
+    assert np.isclose(result.loc["a", "maxspeed"], 0.25 * 1 / 4)
+    assert np.isclose(result.loc["a", "surface"], 0.25 * 0.6 * 3 / 4)
+    assert np.isclose(result.loc["b", "total_uncertainty"], 0.0)
+
+    # Same result as single city aggregation
+    score, contributions, uncertainty = compute_total_city_metrics(df[df["city_name"] == "a"], "cyclability", weights_config)
+    assert np.isclose(score, result.loc["a", "total_score"])
+    assert np.isclose(uncertainty, result.loc["a", "total_uncertainty"])
+
+def test_city_metrics_from_aggregates():
+
+    import pandas as pd
+    import numpy as np
+    from city_metrics.metrics.compute_metrics import city_metrics_from_aggregates
+
+    # Sums as returned by PostGIS aggregation
+    aggregates = pd.DataFrame({
+        "total_length": [4.0, 0.0],
+        "score_length": [2.0, 0.0],
+        "missing_length_maxspeed": [1.0, 0.0],
+        "missing_length_surface": [0.0, 0.0],
+        "missing_length_lighting": [4.0, 0.0]
+    }, index = pd.Index(["a", "empty"], name = "city_name"))
+
+    weights_config = read_config("weights", "yaml", "src/city_metrics/metrics/config/weights.yaml")
+    weights_config.pop("version")
+
+    result = city_metrics_from_aggregates(aggregates, "cyclability", weights_config)
+
+    assert np.isclose(result.loc["a", "total_score"], 0.5)
+    assert np.isclose(result.loc["a", "total_uncertainty"], result.loc["a", ["maxspeed", "surface", "lighting"]].sum())
+    assert np.isnan(result.loc["empty", "total_score"])
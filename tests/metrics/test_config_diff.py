@@ -0,0 +1,81 @@
+import copy
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.config.diff import diff_compiled_metrics
+from city_metrics.services.metrics.loader import affected_segments_predicate
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def load_configs():
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+
+    return weights_config, metrics_config
+
+def test_diff_mapping_change():
+
+    weights_config, metrics_config = load_configs()
+    old = compile_metrics(copy.deepcopy(metrics_config), weights_config, "cyclability")
+
+    # Single mapping entry changed, one added
+    metrics_config["surface"]["mapping"]["asphalt"] = 0.5
+    metrics_config["surface"]["mapping"]["new_surface"] = 0.3
+    new = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    diff = diff_compiled_metrics(old, new)
+
+    assert not diff.structural
+    assert not diff.weights_changed
+    assert list(diff.features) == ["surface"]
+    assert diff.features["surface"].changed_values == {"asphalt", "new_surface"}
+    assert diff.features["surface"].keys_changed
+
+    # Only affected surface values are selected
+    predicate, params = affected_segments_predicate(diff, "cyclability")
+    assert "lower(ns.surface) = ANY(:values_0)" in predicate # indexed expression
+    assert "lower(ns.surface_imputed) = ANY(:values_0)" in predicate # stored imputed values are scored where surface is missing
+    assert params["values_0"] == ["asphalt", "new_surface"]
+    assert "maxspeed" not in predicate
+
+    # Learned raw values are bound with changed values (all learned values of the feature - mapping keys changed)
+    learned_records = [
+        {"feature_name": "surface", "raw_value": "Asphalt;Paved", "resolved_value": "asphalt"},
+        {"feature_name": "surface", "raw_value": "gravel;dirt", "resolved_value": "gravel"}
+    ]
+    predicate, params = affected_segments_predicate(diff, "cyclability", learned_records)
+    assert "learned_mappings" not in predicate
+    assert params["values_0"] == ["asphalt", "asphalt;paved", "gravel;dirt", "new_surface"]
+
+def test_diff_weights_and_bins():
+
+    weights_config, metrics_config = load_configs()
+    old = compile_metrics(copy.deepcopy(metrics_config), copy.deepcopy(weights_config), "cyclability")
+
+    # Weight-only change: no segment to rescore
+    weights_config["cyclability"]["physical"]["weight"] += 0.05
+    new = compile_metrics(copy.deepcopy(metrics_config), weights_config, "cyclability")
+
+    diff = diff_compiled_metrics(old, new)
+    assert diff.weights_changed
+    assert not diff.scores_changed
+
+    # Score of a single maxspeed bin changed: only values of that bin are affected
+    bins = metrics_config["maxspeed"]["bins"]
+    bins[1]["metrics"] = bins[1]["metrics"] / 2
+    new = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    diff = diff_compiled_metrics(old, new)
+    assert diff.features["maxspeed"].changed_ranges == [(float(bins[0]["max"]), float(bins[1]["max"]))]
+    assert not diff.features["maxspeed"].fallback_changed
+
+    # Removed feature: stored feature scores can not be reused
+    del metrics_config["oneway"]
+    weights_config["cyclability"].pop("regulation")
+    new = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    assert diff_compiled_metrics(old, new).structural
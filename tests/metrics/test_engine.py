@@ -0,0 +1,166 @@
+import json
+import numpy as np
+import pandas as pd
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.compute_metrics import define_augmented_geodataframe, compute_metrics_score_from_segment
+from city_metrics.data.ingest.geojson_loader import geojson_to_gdf
+from city_metrics.services.pipeline import transform_gdf_chunk
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def load_configs():
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+
+    return weights_config, metrics_config
+
+def test_compile_metrics():
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    # Weight groups collapsed into a single weight vector
+    weights = dict(zip(engine.feature_names, engine.weights))
+    assert np.isclose(weights["surface"], 0.25 * 0.6)
+    assert np.isclose(engine.weights.sum(), 1.0)
+
+    # Values above last bin get score of last bin
+    columns = pd.DataFrame({"osm_id": ["way/1", "way/2", "way/3"],
+                            "highway": ["primary", "primary", "primary"],
+                            "bike_infrastructure": ["none"] * 3,
+                            "oneway": ["no"] * 3,
+                            "maxspeed": ["30", "31", "250"],
+                            "surface": ["asphalt"] * 3,
+                            "lighting": ["yes"] * 3})
+    _, feature_scores = engine.score(columns, cyclability_path)
+    assert feature_scores[:, engine.feature_names.index("maxspeed")].tolist() == [1.0, 0.7, 0.05]
+
+def test_engine_matches_segment_scoring():
+
+    weights_config, metrics_config = load_configs()
+    bike_infra_mapping = metrics_config["bike_infrastructure"]["mapping"]
+    excellent_bike_infra = {k for k, v in bike_infra_mapping.items() if v == 1.0}
+
+    # Fixture network (with osm_id) and special cases of maxspeed
+    with open("tests/_fixtures/dev_geojson.geojson") as f:
+        data = json.load(f)
+    for feature in data["features"]:
+        feature["properties"]["osm_id"] = feature["properties"].get("@id", feature.get("id"))
+    gdf = transform_gdf_chunk(geojson_to_gdf(data, 1000)[0])
+    gdf = pd.concat([gdf, gdf.iloc[:3].assign(maxspeed = None, highway = ["footway", "residential", "residential"],
+                                              **{"cycleway": [None, "track", None]})])
+
+    result, features_scores = define_augmented_geodataframe(gdf,
+                                                            weights_config,
+                                                            metrics_config,
+                                                            cyclability_path,
+                                                            excellent_bike_infra)
+
+    # Reference: row by row scoring
+    for row, components in zip(result.itertuples(index = False), features_scores):
+        score, expected = compute_metrics_score_from_segment(row,
+                                                             weights_config,
+                                                             metrics_config,
+                                                             cyclability_path,
+                                                             "cyclability")
+        assert np.isclose(row.cyclability_metrics, score)
+        assert components == expected
+
+def test_score_unique_flags_all_segments():
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    from city_metrics.metrics.unknown_values import UnknownValueQueue
+    queue = UnknownValueQueue()
+
+    columns = pd.DataFrame({"osm_id": ["way/1", "way/2", "way/3", "way/4"],
+                            "highway": ["primary", "primary", "primary", "residential"],
+                            "bike_infrastructure": ["none"] * 4,
+                            "oneway": ["no"] * 4,
+                            "maxspeed": ["30", "30", "30", None],
+                            "surface": ["xyz", "xyz", "asphalt", "xyz"],
+                            "lighting": ["yes"] * 4})
+
+    scores, feature_scores, inverse = engine.score_unique(columns, cyclability_path, unknown_queue = queue)
+
+    # Three unique tuples, identical segments share scores
+    assert len(feature_scores) == 3
+    assert inverse[0] == inverse[1]
+    assert np.allclose(scores, engine.score(columns, cyclability_path, unknown_queue = UnknownValueQueue())[0])
+
+    # Unknown value resolved once, but all segments having it are flagged
+    assert queue.records("cyclability")[0]["occurrences"] == 3
+    assert sorted(queue.flagged) == ["way/1", "way/2", "way/4"]
+
+def test_multi_metrics_single_pass():
+
+    import copy
+    from city_metrics.metrics.compute_metrics import define_multi_metrics_geodataframe
+
+    weights_config, metrics_config = load_configs()
+    bike_infra_mapping = metrics_config["bike_infrastructure"]["mapping"]
+    excellent_bike_infra = {k for k, v in bike_infra_mapping.items() if v == 1.0}
+
+    # Safety variant of cyclability: traffic only
+    weights_config["safety"] = {"traffic": {"weight": 1.0, "features": {"maxspeed": 1.0}}}
+
+    with open("tests/_fixtures/dev_geojson.geojson") as f:
+        data = json.load(f)
+    for feature in data["features"]:
+        feature["properties"]["osm_id"] = feature["properties"].get("@id", feature.get("id"))
+    gdf = transform_gdf_chunk(geojson_to_gdf(data, 1000)[0])
+
+    result, features_scores = define_multi_metrics_geodataframe(gdf,
+                                                                weights_config,
+                                                                {"cyclability": metrics_config, "safety": copy.deepcopy(metrics_config)},
+                                                                {"cyclability": cyclability_path, "safety": cyclability_path},
+                                                                excellent_bike_infra)
+
+    # Same results as single metrics pass
+    reference, reference_scores = define_augmented_geodataframe(gdf,
+                                                                weights_config,
+                                                                metrics_config,
+                                                                cyclability_path,
+                                                                excellent_bike_infra)
+    assert np.allclose(result["cyclability_metrics"], reference["cyclability_metrics"])
+    assert features_scores["cyclability"] == reference_scores
+
+    # Safety score is the maxspeed score
+    assert np.allclose(result["safety_metrics"], [f["maxspeed"] for f in features_scores["safety"]])
+
+def test_group_subscores():
+
+    weights_config, metrics_config = load_configs()
+    bike_infra_mapping = metrics_config["bike_infrastructure"]["mapping"]
+    excellent_bike_infra = {k for k, v in bike_infra_mapping.items() if v == 1.0}
+
+    with open("tests/_fixtures/dev_geojson.geojson") as f:
+        data = json.load(f)
+    for feature in data["features"]:
+        feature["properties"]["osm_id"] = feature["properties"].get("@id", feature.get("id"))
+    gdf = transform_gdf_chunk(geojson_to_gdf(data, 1000)[0])
+
+    result, features_scores = define_augmented_geodataframe(gdf,
+                                                            weights_config,
+                                                            metrics_config,
+                                                            cyclability_path,
+                                                            excellent_bike_infra)
+
+    # Total score is the sum of group weight * group subscore
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+    group_weights, group_feature_weights = engine.weights_by_group()
+    assert list(group_weights) == ["infrastructure", "physical", "traffic", "regulation"]
+    total = sum(weight * result[f"cyclability_{group_name}_score"] for group_name, weight in group_weights.items())
+    assert np.allclose(total, result["cyclability_metrics"])
+
+    # Group subscores are weighted sums of feature scores within group
+    physical = [0.6 * f["surface"] + 0.4 * f["lighting"] for f in features_scores]
+    assert group_feature_weights["physical"] == {"surface": 0.6, "lighting": 0.4}
+    assert np.allclose(result["cyclability_physical_score"], physical)
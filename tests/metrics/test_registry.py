@@ -0,0 +1,39 @@
+import os
+import shutil
+from city_metrics.metrics.config.registry import ConfigRegistry
+from city_metrics.metrics.config.versioning import get_config_version
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def test_registry_versions_and_reload(tmp_path):
+
+    path = tmp_path / "cyclability.yaml"
+    shutil.copy(cyclability_path, path)
+
+    registry = ConfigRegistry()
+
+    # Same version as versioning module, version field removed from config
+    version = registry.get_version("cyclability", path)
+    assert version == get_config_version(path)
+    assert "version" not in registry.get_config("cyclability", path)
+
+    # Copies are returned by default
+    config = registry.get_config("cyclability", path)
+    config["surface"]["mapping"]["xyz"] = 0.1
+    assert "xyz" not in registry.get_config("cyclability", path)["surface"]["mapping"]
+
+    # Touched file with unchanged content: cached entry is kept
+    entry = registry._entries[path.resolve()]
+    os.utime(path, ns = (0, 0))
+    registry.get_version("cyclability", path)
+    assert registry._entries[path.resolve()] is entry
+
+    # Changed file is reloaded, compiled engine is recompiled
+    engine = registry.get_compiled("cyclability", path, weights_path)
+    with open(path, "a") as f:
+        f.write("\nsurface_extra:\n  type: categorical\n  mapping:\n    a: 1.0\n")
+    assert registry.get_version("cyclability", path) != version
+    assert registry.get_compiled("cyclability", path, weights_path) is not engine
+    assert "surface_extra" in registry.get_compiled("cyclability", path, weights_path).feature_names
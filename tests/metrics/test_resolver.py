@@ -0,0 +1,101 @@
+from city_metrics.metrics.resolver import TagValueResolver, normalize_tag_value, PLURAL_SUFFIX
+from city_metrics.metrics.compute_metrics import compute_metrics_score_from_segment
+from city_metrics.utils.config_helpers import read_config
+from city_metrics.domain.segment import CyclabilitySegment
+from shapely.geometry import LineString
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def make_resolver():
+
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+
+    return TagValueResolver(metrics_config)
+
+def test_normalize_tag_value():
+
+    assert normalize_tag_value(" Paving Stones ") == "paving_stones"
+    assert normalize_tag_value("Yes ; No") == "yes;no"
+
+def test_resolver_rules():
+
+    resolver = make_resolver()
+
+    # Most conservative known token is used
+    assert resolver.resolve("surface", "asphalt;gravel") == 0.45
+    # Suffix stripping
+    assert resolver.resolve("surface", "paving_stones:30") == 0.8
+    assert resolver.resolve("surface", "sett_20cm") == 0.75
+    # Alias tables
+    assert resolver.resolve("surface", "cobblestones|asphalt") == 0.7
+    assert resolver.resolve("lighting", "On") == 1.0
+    # Unknown value
+    assert resolver.resolve("surface", "xyz") is None
+
+    # Repeated values are cached in learned mappings
+    assert resolver.resolve("surface", "asphalt;gravel") == 0.45
+    assert resolver.occurrences[("surface", "asphalt;gravel")] == 2
+    assert ("surface", "asphalt;gravel") in resolver.learned
+
+    assert resolver.resolution_rate() == 6 / 7
+    assert len(resolver.learned_records("cyclability")) == 5
+
+def test_resolver_plural_suffix():
+
+    # A single plural suffix is stripped
+    assert PLURAL_SUFFIX.sub("", "gravels") == "gravel"
+    assert PLURAL_SUFFIX.sub("", "grass") == "grass"
+
+    resolver = make_resolver()
+    assert resolver.resolve("surface", "grass;grass") == 0.3
+
+def test_resolver_seeded_with_learned_mappings():
+
+    metrics_config = make_resolver().metrics_config
+    records = [
+        {"feature_name": "surface", "raw_value": "asphalt-ish", "resolved_value": "gravel"},
+        {"feature_name": "surface", "raw_value": "old", "resolved_value": "removed_value"},
+        {"feature_name": "maxspeed", "raw_value": "fast", "resolved_value": "fast"}
+    ]
+    resolver = TagValueResolver(metrics_config, learned_records = records)
+
+    # Seeded values are scored with current mappings, stale resolutions are resolved again
+    assert resolver.resolve("surface", "asphalt-ish") == 0.45
+    assert resolver.resolve("surface", "old") is None
+    assert ("maxspeed", "fast") not in resolver.learned
+
+    # Only values seen in current run are stored again
+    assert [record["raw_value"] for record in resolver.learned_records("cyclability")] == ["asphalt-ish"]
+
+def test_compute_metrics_score_with_resolver():
+
+    resolver = make_resolver()
+
+    segment = CyclabilitySegment(
+        osm_id = "way/1",
+        name = "street",
+        geometry = LineString([(0, 0), (1, 1)]),
+        segment_length = 1.0,
+        bike_infrastructure = "lane",
+        oneway = "no",
+        maxspeed = 50,
+        surface = "asphalt;gravel",
+        lighting = "yes",
+        highway = "primary"
+    )
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+
+    # No interactive prompt: value is resolved by rules
+    _, components = compute_metrics_score_from_segment(segment,
+                                                       weights_config,
+                                                       resolver.metrics_config,
+                                                       cyclability_path,
+                                                       "cyclability",
+                                                       resolver)
+
+    assert components["surface"] == 0.45
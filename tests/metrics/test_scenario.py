@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+import pytest
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.compute_metrics import uncertainty_feature_weights
+from city_metrics.metrics.scenario import CityScenarioSnapshot, evaluate_scenario
+from city_metrics.services.metrics.loader import scenario_columns_for_engine
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def load_configs():
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+
+    return weights_config, metrics_config
+
+def test_scenario_matches_full_rescoring():
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    # Scored city network (baseline scores as stored - rounded)
+    segments = pd.DataFrame({"osm_id": ["way/1", "way/2", "way/3", "way/4"],
+                             "highway": ["primary", "residential", "residential", "secondary"],
+                             "bike_infrastructure": ["none", "lane", "none", "none"],
+                             "oneway": ["no", "yes", "no", "no"],
+                             "maxspeed": [50, 30, None, 70],
+                             "surface": ["asphalt", "asphalt", "gravel", "asphalt"],
+                             "lighting": ["yes", "no", "yes", "yes"],
+                             "segment_length": [100.0, 50.0, 200.0, 25.0],
+                             "missing_maxspeed": [False, False, True, False],
+                             "missing_surface": [False] * 4,
+                             "missing_lighting": [False, True, False, False]})
+    segments["total_score"] = np.round(engine.score(segments, cyclability_path)[0], 4)
+
+    snapshot = CityScenarioSnapshot.from_segments("city", "v1", engine, segments,
+                                                  uncertainty_feature_weights(weights_config, "cyclability"))
+    overrides = {"way/1": {"bike_infrastructure": "track"},
+                 "way/3": {"maxspeed": 30}}
+    result = evaluate_scenario(snapshot, overrides)
+
+    # Same city score as rescoring the whole network with overrides applied
+    modified = segments.copy()
+    modified.loc[0, "bike_infrastructure"] = "track"
+    modified.loc[2, "maxspeed"] = 30
+    scores = np.round(engine.score(modified, cyclability_path)[0], 4)
+    lengths = segments["segment_length"].to_numpy()
+    assert result.scenario_score == pytest.approx(lengths @ scores / lengths.sum())
+    assert result.baseline_score == pytest.approx(lengths @ segments["total_score"].to_numpy() / lengths.sum())
+    assert result.score_delta > 0
+
+    # Overridden maxspeed is observed: uncertainty decreases
+    assert result.scenario_uncertainty < result.baseline_uncertainty
+    assert set(result.segment_scores) == {"way/1", "way/3"}
+
+    # Snapshot is unchanged
+    assert snapshot.columns.loc["way/1", "bike_infrastructure"] == "none"
+    assert evaluate_scenario(snapshot, {"way/2": {}}).scenario_score == pytest.approx(result.baseline_score)
+
+    with pytest.raises(ValueError):
+        evaluate_scenario(snapshot, {"way/9": {"maxspeed": 30}})
+
+def test_scenario_of_stored_segments_with_missing_lighting():
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    # Segments as loaded from PostGIS (missing lighting stored as FALSE, imputed lighting in lit_imputed)
+    stored = pd.DataFrame({"osm_id": ["way/1", "way/2", "way/3"],
+                           "highway": ["residential"] * 3,
+                           "bike_infra": ["none"] * 3,
+                           "surface": ["asphalt"] * 3,
+                           "maxspeed": [30, 30, 30],
+                           "is_lit": [False, False, False],
+                           "is_oneway": [False] * 3,
+                           "enrichment": [None] * 3,
+                           "maxspeed_imputed": [None] * 3,
+                           "surface_imputed": [None] * 3,
+                           "lit_imputed": [None, None, "yes"],
+                           "segment_length": [100.0, 50.0, 25.0],
+                           "missing_maxspeed": [False] * 3,
+                           "missing_surface": [False] * 3,
+                           "missing_lighting": [False, True, True]})
+    segments = scenario_columns_for_engine(stored)
+    assert segments["lighting"].tolist() == ["no", "unknown", "yes"]
+
+    # Stored scores were computed from observed (or imputed) values
+    segments["total_score"] = np.round(engine.score(segments, cyclability_path)[0], 4)
+    snapshot = CityScenarioSnapshot.from_segments("city", "v1", engine, segments,
+                                                  uncertainty_feature_weights(weights_config, "cyclability"))
+
+    # Override equal to current value: no score change
+    result = evaluate_scenario(snapshot, {"way/2": {"surface": "asphalt"}, "way/3": {"surface": "asphalt"}})
+    assert result.score_delta == 0
+    assert result.scenario_uncertainty == result.baseline_uncertainty
+
+def test_scenario_override_of_split_way():
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+
+    # way/1 split at junctions in two sub-segments, way/2 not split
+    segments = pd.DataFrame({"osm_id": ["way/1-1", "way/1-2", "way/2"],
+                             "parent_osm_id": ["way/1", "way/1", "way/2"],
+                             "highway": ["primary"] * 3,
+                             "bike_infrastructure": ["none"] * 3,
+                             "oneway": ["no"] * 3,
+                             "maxspeed": [50, 50, 50],
+                             "surface": ["asphalt"] * 3,
+                             "lighting": ["yes"] * 3,
+                             "segment_length": [100.0, 50.0, 25.0],
+                             "missing_maxspeed": [False] * 3,
+                             "missing_surface": [False] * 3,
+                             "missing_lighting": [False] * 3})
+    segments["total_score"] = np.round(engine.score(segments, cyclability_path)[0], 4)
+    snapshot = CityScenarioSnapshot.from_segments("city", "v1", engine, segments,
+                                                  uncertainty_feature_weights(weights_config, "cyclability"))
+
+    # Parent OSM ID overrides all sub-segments (same result as listing them)
+    result = evaluate_scenario(snapshot, {"way/1": {"bike_infrastructure": "track"}, "way/2": {"maxspeed": 30}})
+    listed = evaluate_scenario(snapshot, {"way/1-1": {"bike_infrastructure": "track"},
+                                          "way/1-2": {"bike_infrastructure": "track"},
+                                          "way/2": {"maxspeed": 30}})
+    assert set(result.segment_scores) == {"way/1-1", "way/1-2", "way/2"}
+    assert result.scenario_score == pytest.approx(listed.scenario_score)
+
+    # Override of a sub-segment takes precedence over override of its way
+    result = evaluate_scenario(snapshot, {"way/1-2": {"bike_infrastructure": "none"}, "way/1": {"bike_infrastructure": "track"}})
+    assert result.segment_scores["way/1-2"][1] == result.segment_scores["way/1-2"][0]
+    assert result.segment_scores["way/1-1"][1] > result.segment_scores["way/1-1"][0]
+
+def test_snapshot_cache_loads_outside_lock(monkeypatch):
+
+    from city_metrics.services.metrics import scenario as scenario_service
+    from city_metrics.metrics.config.registry import config_registry
+
+    weights_config, metrics_config = load_configs()
+    engine = compile_metrics(metrics_config, weights_config, "cyclability")
+    segments = pd.DataFrame({"osm_id": ["way/1"],
+                             "highway": ["residential"],
+                             "bike_infrastructure": ["none"],
+                             "oneway": ["no"],
+                             "maxspeed": [30],
+                             "surface": ["asphalt"],
+                             "lighting": ["yes"],
+                             "segment_length": [100.0],
+                             "missing_maxspeed": [False],
+                             "missing_surface": [False],
+                             "missing_lighting": [False]})
+    segments["total_score"] = np.round(engine.score(segments, cyclability_path)[0], 4)
+    segments["metric_version"] = config_registry.get_version("cyclability", cyclability_path)
+
+    cache = scenario_service.ScenarioSnapshotCache()
+    loads = []
+
+    def load_segments(city_name):
+        # Cache lock is free while segments are loaded
+        assert not cache._lock.locked()
+        loads.append(city_name)
+        return segments
+
+    monkeypatch.setattr(scenario_service, "load_segments_for_scenarios", load_segments)
+
+    snapshot = cache.get("city", cyclability_path, weights_path)
+    assert cache.get("city", cyclability_path, weights_path) is snapshot
+    assert cache.get("city", cyclability_path, weights_path, refresh = True) is not snapshot
+    assert loads == ["city", "city"]
@@ -0,0 +1,81 @@
+from city_metrics.metrics.unknown_values import UnknownValueQueue, fallback_score, DEFAULT_FALLBACK_SCORE
+from city_metrics.metrics.resolver import TagValueResolver
+from city_metrics.metrics.compute_metrics import compute_metrics_score_from_segment
+from city_metrics.utils.config_helpers import read_config
+from city_metrics.domain.segment import CyclabilitySegment
+from shapely.geometry import LineString
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def test_fallback_score():
+
+    assert fallback_score({"fallback": 0.3, "mapping": {"unknown": 0.6}}) == 0.3
+    assert fallback_score({"mapping": {"unknown": 0.6}}) == 0.6
+    assert fallback_score({"mapping": {}}) == DEFAULT_FALLBACK_SCORE
+
+def test_non_interactive_scoring_queues_unknown_values(monkeypatch):
+
+    # Any prompt would fail the test
+    monkeypatch.setattr("builtins.input", lambda *args: (_ for _ in ()).throw(AssertionError("prompted")))
+
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+
+    resolver = TagValueResolver(metrics_config)
+    queue = UnknownValueQueue(max_samples = 2)
+
+    for i in range(3):
+        segment = CyclabilitySegment(
+            osm_id = f"way/{i}",
+            name = "street",
+            geometry = LineString([(0, 0), (1, 1)]),
+            segment_length = 1.0,
+            bike_infrastructure = "lane",
+            oneway = "no",
+            maxspeed = 50,
+            surface = "xyz",
+            lighting = "yes",
+            highway = "primary"
+        )
+
+        _, components = compute_metrics_score_from_segment(segment,
+                                                           weights_config,
+                                                           metrics_config,
+                                                           cyclability_path,
+                                                           "cyclability",
+                                                           resolver,
+                                                           queue)
+
+        assert components["surface"] == fallback_score(metrics_config["surface"])
+
+    # Value recorded once with occurrences and capped samples, segments flagged
+    records = queue.records("cyclability")
+    assert len(records) == 1
+    assert records[0]["feature_value"] == "xyz"
+    assert records[0]["occurrences"] == 3
+    assert records[0]["sample_osm_ids"] == ["way/0", "way/1"]
+
+    assert queue.segment_metadata("way/2") == {"needs_rescoring": True, "unresolved_features": ["surface"]}
+    assert queue.segment_metadata("way/9") == {}
+
+    # YAML mappings are left untouched
+    assert "xyz" not in metrics_config["surface"]["mapping"]
+
+def test_unknown_value_queue_merge():
+
+    queue, other = UnknownValueQueue(max_samples = 2), UnknownValueQueue()
+    queue.record("surface", "xyz", "way/0")
+    other.record("surface", "xyz", "way/1")
+    other.record("surface", "xyz", "way/2")
+    other.record("lighting", "abc", "way/1")
+
+    queue.merge(other)
+
+    records = {r["feature_value"]: r for r in queue.records("cyclability")}
+    assert records["xyz"]["occurrences"] == 3
+    assert records["xyz"]["sample_osm_ids"] == ["way/0", "way/1"]
+    assert queue.segment_metadata("way/1") == {"needs_rescoring": True, "unresolved_features": ["lighting", "surface"]}
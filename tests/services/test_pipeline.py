@@ -0,0 +1,63 @@
+import json
+import numpy as np
+from city_metrics.data.ingest.geojson_loader import geojson_to_gdf
+from city_metrics.data.normalize.segmentation import find_junction_keys
+from city_metrics.metrics.engine import compile_metrics
+from city_metrics.metrics.resolver import TagValueResolver
+from city_metrics.metrics.unknown_values import UnknownValueQueue
+from city_metrics.services.pipeline import (ChunkScoringContext, process_gdf_chunk, score_chunks_in_pool,
+                                            transform_gdf_chunk, unpack_scored_chunk)
+from city_metrics.utils.config_helpers import read_config
+
+# Paths to YAML configs
+weights_path = "src/city_metrics/metrics/config/weights.yaml"
+cyclability_path = "src/city_metrics/metrics/config/cyclability.yaml"
+
+def test_parallel_scoring_matches_serial(dev_geojson_path):
+
+    weights_config = read_config("weights", "yaml", weights_path)
+    weights_config.pop("version")
+    metrics_config = read_config("cyclability", "yaml", cyclability_path)
+    metrics_config.pop("version")
+    excellent_bike_infra = {k for k, v in metrics_config["bike_infrastructure"]["mapping"].items() if v == 1.0}
+
+    with open(dev_geojson_path) as f:
+        data = json.load(f)
+    for feature in data["features"]:
+        feature["properties"]["osm_id"] = feature["properties"].get("@id", feature.get("id"))
+
+    # Small chunks, transformed upfront with noding
+    gdf_chunks = [transform_gdf_chunk(chunk) for chunk in geojson_to_gdf(data, 4)]
+    context = ChunkScoringContext(weights_config,
+                                  {"cyclability": metrics_config},
+                                  {"cyclability": cyclability_path},
+                                  excellent_bike_infra,
+                                  transformed = True,
+                                  junction_keys = find_junction_keys(np.concatenate([chunk.geometry.values for chunk in gdf_chunks])),
+                                  engines = {"cyclability": compile_metrics(metrics_config, weights_config, "cyclability")})
+
+    # Serial reference
+    serial = []
+    for idx, chunk in enumerate(gdf_chunks, start = 1):
+        result = process_gdf_chunk(idx, chunk, context,
+                                   {"cyclability": TagValueResolver(metrics_config)},
+                                   {"cyclability": UnknownValueQueue()})
+        serial.append(result)
+
+    # Parallel results come back in chunk order
+    parallel = list(score_chunks_in_pool(gdf_chunks, context, workers = 2))
+    assert [idx for idx, _ in parallel] == list(range(1, len(gdf_chunks) + 1))
+
+    for serial_result, (_, result) in zip(serial, parallel):
+
+        # Empty chunks skipped in both modes
+        assert (serial_result is None) == (result is None)
+        if result is None:
+            continue
+
+        gdf_serial, scores_serial = serial_result
+        gdf_parallel = unpack_scored_chunk(result["chunk"])
+        assert gdf_parallel["osm_id"].tolist() == gdf_serial["osm_id"].tolist()
+        assert np.allclose(gdf_parallel["cyclability_metrics"], gdf_serial["cyclability_metrics"])
+        assert gdf_parallel.geometry.equals(gdf_serial.geometry)
+        assert result["metrics_features_scores"] == scores_serial
@@ -1,8 +1,13 @@
+import math
+import numpy as np
+import shapely
 from shapely import LineString, Point
-from city_metrics.validation.geometry import validate_gdf_linestrings
+from city_metrics.validation.geometry import validate_gdf_linestrings, has_distinct_coordinates
 import geopandas as gpd
+import pandas as pd
 
 from city_metrics.utils.geometry import bbox_from_geom, get_length, midpoint, distance, is_valid, fix_invalid, buffer_zone, coords
+from city_metrics.utils.geometry import geodesic_length, geodesic_lengths
 
 # Create simple Shapely object to perform test with
 line = LineString([(0, 0), (1, 0), (1, 1)])
@@ -28,4 +33,67 @@ def test_validate_gdf_linestrings_filters_invalid():
     validated = validate_gdf_linestrings(gdf)
     
     assert all(validated.geometry.type == "LineString")
-    assert all(validated.geometry.length > 0)
\ No newline at end of file
+    assert all(validated.geometry.length > 0)
+
+def test_geodesic_lengths_matches_single_geometry_lengths():
+
+    geoms = [
+        LineString([(10.0, 59.0), (10.1, 59.1), (10.2, 59.1)]),
+        LineString([(0, 0), (1, 1)]),
+        None,
+        LineString([(5, 5), (5, 6)])
+    ]
+
+    lengths = geodesic_lengths(geoms)
+
+    assert len(lengths) == len(geoms)
+    assert lengths[2] == 0.0
+    for geom, length in zip(geoms, lengths):
+        if geom is not None:
+            assert math.isclose(length, geodesic_length(geom), rel_tol = 1e-9)
+
+def test_validate_gdf_linestrings_drops_degenerate_and_repairs():
+
+    # Test GeoDataFrame (geographic CRS - no reprojection should be needed)
+    gdf = gpd.GeoDataFrame({
+        "osm_id": [1, 2, 3, 4],
+        "geometry": [
+            LineString([(10.0, 59.0), (10.1, 59.1)]),   # valid
+            LineString([(10.0, 59.0), (10.0, 59.0)]),   # degenerate (zero length)
+            None,                                       # missing geometry
+            Point(10.0, 59.0)                           # not a LineString
+        ]
+    }, crs = "EPSG:4326")
+
+    validated = validate_gdf_linestrings(gdf)
+    assert validated["osm_id"].tolist() == [1]
+
+    # Degenerate LineString cannot be repaired into a LineString - still dropped
+    repaired = validate_gdf_linestrings(gdf, repair = True)
+    assert repaired["osm_id"].tolist() == [1]
+    assert repaired.crs == gdf.crs
+
+    # LineString with a NaN vertex is invalid, but repaired (vertex removed) and kept
+    broken = shapely.linestrings([[10.0, 59.0], [np.nan, np.nan], [10.1, 59.1], [10.2, 59.1]])
+    gdf = pd.concat([gdf, gpd.GeoDataFrame({"osm_id": [5], "geometry": [broken]}, crs = gdf.crs)], ignore_index = True)
+    assert validate_gdf_linestrings(gdf)["osm_id"].tolist() == [1]
+
+    repaired = validate_gdf_linestrings(gdf, repair = True)
+    assert repaired["osm_id"].tolist() == [1, 5]
+    assert repaired.geometry.is_valid.all()
+    assert repaired.geometry.iloc[1].equals(LineString([(10.0, 59.0), (10.1, 59.1), (10.2, 59.1)]))
+
+def test_has_distinct_coordinates_checks_masked_rows_only():
+
+    geoms = np.array([
+        LineString([(0, 0), (1, 1)]),
+        LineString([(0, 0), (0, 0), (0, 0)]), # degenerate
+        LineString([(2, 2), (2, 2), (3, 2)]),
+        None
+    ], dtype = object)
+
+    assert has_distinct_coordinates(geoms).tolist() == [True, False, True, False]
+
+    # Rows dropped by mask are not checked
+    mask = np.array([True, True, False, True])
+    assert has_distinct_coordinates(geoms, mask).tolist() == [True, False, False, False]